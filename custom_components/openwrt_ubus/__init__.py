@@ -1,18 +1,24 @@
 """Inizializzazione integrazione OpenWrt Ubus."""
 import asyncio
 import logging
+import re
 from datetime import timedelta
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
-from .const import DOMAIN, UPDATE_INTERVAL
+from .const import DOMAIN, DATA_CLIENTS, UPDATE_INTERVAL
 from .coordinator import OpenWrtDataUpdateCoordinator
+from .services import async_setup_services, async_unload_services
 
 _LOGGER = logging.getLogger(__name__)
 
+# MAC in coda agli unique_id delle entità per client (tracker, kick, metriche)
+_CLIENT_UNIQUE_ID = re.compile(r"_([0-9a-f]{2}(?::[0-9a-f]{2}){5})$", re.IGNORECASE)
+
 PLATFORMS = [
     Platform.DEVICE_TRACKER,
     Platform.SENSOR,
@@ -33,11 +39,52 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = coordinator
     
+    # Modalità allowlist: via dai registri le entità dei client non più ammessi
+    _async_remove_untracked_clients(hass, entry, coordinator)
+    
     # Setup platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     
+    # Registra servizi
+    await async_setup_services(hass)
+    
+    # Ricarica su modifica opzioni
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
+    
     return True
 
+@callback
+def _async_remove_untracked_clients(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator: OpenWrtDataUpdateCoordinator
+) -> None:
+    """Rimuovi entità e dispositivi dei client che non hanno più entità proprie."""
+    device_registry = dr.async_get(hass)
+    entity_registry = er.async_get(hass)
+    for device in dr.async_entries_for_config_entry(device_registry, entry.entry_id):
+        macs = [
+            identifier[len("device_"):]
+            for domain, identifier in device.identifiers
+            if domain == DOMAIN and identifier.startswith("device_")
+        ]
+        if not macs or coordinator.tracks_client(macs[0]):
+            continue
+        for entity in er.async_entries_for_device(
+            entity_registry, device.id, include_disabled_entities=True
+        ):
+            if entity.config_entry_id == entry.entry_id:
+                entity_registry.async_remove(entity.entity_id)
+        device_registry.async_update_device(device.id, remove_config_entry_id=entry.entry_id)
+    
+    # I device tracker (ScannerEntity) non hanno un dispositivo: si riconoscono dallo unique_id
+    for entity in er.async_entries_for_config_entry(entity_registry, entry.entry_id):
+        match = _CLIENT_UNIQUE_ID.search(entity.unique_id)
+        if match and not coordinator.tracks_client(match.group(1).lower()):
+            entity_registry.async_remove(entity.entity_id)
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Ricarica integrazione dopo modifica opzioni."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload config entry."""
     
@@ -45,6 +92,15 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_close()
+        
+        # I client visti solo da questo router passano agli altri
+        coordinator.client_table.async_remove_entry(entry.entry_id)
+        if not hass.data[DOMAIN]:
+            coordinator.client_table.async_shutdown()
+            hass.data.pop(DATA_CLIENTS, None)
+        
+        async_unload_services(hass)
     
     return unload_ok
\ No newline at end of file
@@ -0,0 +1,591 @@
+"""Client HTTP/HTTPS per ubus JSON-RPC."""
+import json
+import logging
+import ssl
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.certs import where as ca_bundle
+
+from .const import (
+    REQUEST_TIMEOUT, REQUEST_POOL_SIZE, INTERFACE_STATS_FIELDS,
+    SNAPSHOT_OBJECT, SNAPSHOT_API_VERSION, SNAPSHOT_CLIENT_FIELDS, DHCP_LEASES_PATH,
+    PROC_STAT_PATH, ARP_TABLE_PATH
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Codici stato ubus
+UBUS_STATUS_OK = 0
+UBUS_STATUS_METHOD_NOT_FOUND = 3
+UBUS_STATUS_NOT_FOUND = 4
+UBUS_STATUS_PERMISSION_DENIED = 6
+
+# Codici errore JSON-RPC di uhttpd: oggetto inesistente, sessione non valida o ACL negata
+JSONRPC_OBJECT_NOT_FOUND = -32000
+JSONRPC_ACCESS_DENIED = -32002
+
+
+class UbusError(Exception):
+    """Errore ubus (stato non zero o errore JSON-RPC)."""
+
+
+class UbusNotFoundError(UbusError):
+    """Oggetto, metodo o file ubus non trovato."""
+
+
+class UbusAccessDeniedError(UbusError):
+    """Accesso negato: ACL mancante o sessione scaduta."""
+
+
+class _ResumingSSLContext(ssl.SSLContext):
+    """SSLContext che riusa l'ultima sessione TLS e conta gli handshake.
+
+    Con connessioni keep-alive gli handshake sono rari; quando una
+    connessione va riaperta la sessione salvata evita un handshake
+    completo sui router con CPU lente. Con TLS 1.3 il ticket arriva dopo
+    l'handshake, quindi la sessione si salva solo dopo aver letto una
+    risposta (vedi remember_session). Le CA sono caricate una volta sola.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        """Create context."""
+        return super().__new__(cls, ssl.PROTOCOL_TLS_CLIENT)
+
+    def __init__(self, verify: bool):
+        """Initialize context."""
+        super().__init__()
+        self._lock = threading.Lock()
+        self._tls_session = None
+        self.full_handshakes = 0
+        self.resumed_handshakes = 0
+        if verify:
+            self.load_verify_locations(ca_bundle())
+        else:
+            self.check_hostname = False
+            self.verify_mode = ssl.CERT_NONE
+
+    def wrap_socket(self, *args, **kwargs):
+        """Wrap socket riprendendo la sessione TLS precedente."""
+        with self._lock:
+            if self._tls_session is not None:
+                kwargs.setdefault("session", self._tls_session)
+        sock = super().wrap_socket(*args, **kwargs)
+        with self._lock:
+            if sock.session_reused:
+                self.resumed_handshakes += 1
+            else:
+                self.full_handshakes += 1
+        return sock
+
+    def remember_session(self, sock: Any) -> None:
+        """Salva la sessione di un socket che ha già ricevuto dati.
+
+        Subito dopo un handshake TLS 1.3 la sessione non ha ancora il
+        ticket e non sarebbe riutilizzabile.
+        """
+        session = getattr(sock, "session", None)
+        if session is None:
+            return
+        if not session.has_ticket and sock.version() == "TLSv1.3":
+            return
+        with self._lock:
+            self._tls_session = session
+
+
+class _TlsAdapter(HTTPAdapter):
+    """HTTPAdapter con SSLContext condiviso e pinning opzionale del certificato."""
+
+    def __init__(self, ssl_context: ssl.SSLContext, fingerprint: Optional[str], **kwargs):
+        """Initialize adapter."""
+        self._ssl_context = ssl_context
+        self._fingerprint = fingerprint
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Crea pool manager con contesto TLS e fingerprint."""
+        kwargs["ssl_context"] = self._ssl_context
+        if self._fingerprint:
+            kwargs["assert_fingerprint"] = self._fingerprint
+        super().init_poolmanager(*args, **kwargs)
+
+    def cert_verify(self, conn, url, verify, cert):
+        """Verifica con le CA già nel contesto condiviso.
+
+        Senza ca_certs urllib3 non ricarica il bundle a ogni nuova connessione.
+        """
+        super().cert_verify(conn, url, verify, cert)
+        conn.ca_certs = None
+        conn.ca_cert_dir = None
+
+    def build_response(self, req, resp):
+        """Costruisci la risposta salvando la sessione TLS (header già letti)."""
+        connection = getattr(resp, "connection", None)
+        if connection is not None and getattr(connection, "sock", None) is not None:
+            self._ssl_context.remember_session(connection.sock)
+        return super().build_response(req, resp)
+
+
+class UbusClient:
+    """Trasporto JSON-RPC verso /ubus con connessioni persistenti.
+
+    I metodi sono bloccanti: vanno eseguiti nell'executor di Home Assistant.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        use_https: bool = False,
+        verify_ssl: bool = True,
+        fingerprint: Optional[str] = None,
+        timeout: int = REQUEST_TIMEOUT,
+    ):
+        """Initialize client."""
+        self.hostname = hostname
+        self.use_https = use_https
+        self.timeout = timeout
+        self.url = f"{'https' if use_https else 'http'}://{hostname}/ubus"
+
+        # Con fingerprint il certificato (anche self-signed) è verificato
+        # confrontando l'hash, non con la catena di CA
+        fingerprint = fingerprint.replace(":", "").lower() if fingerprint else None
+        verify = verify_ssl and not fingerprint
+
+        self._session = requests.Session()
+        self._session.headers["Content-Type"] = "application/json"
+        self._session.verify = verify
+        self._ssl_context = None
+        if use_https:
+            self._ssl_context = _ResumingSSLContext(verify)
+            adapter = _TlsAdapter(
+                self._ssl_context, fingerprint,
+                pool_connections=1, pool_maxsize=REQUEST_POOL_SIZE,
+            )
+            self._session.mount("https://", adapter)
+        else:
+            self._session.mount(
+                "http://", HTTPAdapter(pool_connections=1, pool_maxsize=REQUEST_POOL_SIZE)
+            )
+
+    @property
+    def handshakes(self) -> Dict[str, int]:
+        """Contatori cumulativi degli handshake TLS."""
+        if self._ssl_context is None:
+            return {"full": 0, "resumed": 0}
+        return {
+            "full": self._ssl_context.full_handshakes,
+            "resumed": self._ssl_context.resumed_handshakes,
+        }
+
+    def post(self, method: str, params: list) -> Dict[str, Any]:
+        """Invia una richiesta JSON-RPC e ritorna la risposta decodificata."""
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": method,
+            "params": params,
+        }
+
+        try:
+            response = self._session.post(
+                self.url, data=json.dumps(payload), timeout=self.timeout
+            )
+        except requests.exceptions.SSLError as e:
+            raise Exception(f"Errore TLS: {e}")
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Errore richiesta: {e}")
+
+        if response.status_code != 200:
+            raise Exception(f"HTTP error: {response.status_code}")
+
+        return response.json()
+
+    def close(self) -> None:
+        """Chiudi le connessioni persistenti."""
+        self._session.close()
+
+
+REDACTED = "**REDACTED**"
+NULL_SESSION = "00000000000000000000000000000000"
+_REDACT_KEYS = {"ubus_rpc_session", "password"}
+
+
+def _redact(value: Any) -> Any:
+    """Rimuovi session id e password da una struttura JSON."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if key in _REDACT_KEYS else _redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+
+def _redact_params(method: str, params: list) -> list:
+    """Parametri JSON-RPC senza session id (né credenziali del login)."""
+    if method != "call" or not params:
+        return _redact(params)
+    session_id = params[0] if params[0] == NULL_SESSION else REDACTED
+    return [session_id, *_redact(params[1:])]
+
+
+def _request_key(method: str, params: list) -> str:
+    """Chiave per associare una richiesta alla sua risposta registrata."""
+    return json.dumps([method, _redact_params(method, params)], sort_keys=True)
+
+
+class CaptureTransport:
+    """Registra ogni richiesta/risposta ubus in un trace JSONL a rotazione.
+
+    Session id e password non vengono mai scritti.
+    """
+
+    def __init__(self, inner: UbusClient, path: str, max_bytes: int, backups: int):
+        """Initialize capture transport."""
+        self._inner = inner
+        self.hostname = inner.hostname
+        self.use_https = inner.use_https
+        self.path = path
+        self._logger = logging.getLogger(f"{__name__}.capture.{inner.hostname}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.DEBUG)
+        self._handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, delay=True
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger.addHandler(self._handler)
+
+    @property
+    def handshakes(self) -> Dict[str, int]:
+        """Contatori cumulativi degli handshake TLS."""
+        return self._inner.handshakes
+
+    def post(self, method: str, params: list) -> Dict[str, Any]:
+        """Invia la richiesta e registrala nel trace."""
+        record = {
+            "ts": time.time(),
+            "method": method,
+            "params": _redact_params(method, params),
+        }
+        start = time.perf_counter()
+        try:
+            response = self._inner.post(method, params)
+        except Exception as e:
+            record["error"] = str(e)
+            raise
+        else:
+            record["response"] = _redact(response)
+            return response
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self._logger.info(json.dumps(record, separators=(",", ":")))
+
+    def close(self) -> None:
+        """Chiudi trace e connessioni."""
+        self._logger.removeHandler(self._handler)
+        self._handler.close()
+        self._inner.close()
+
+
+class ReplayTransport:
+    """Ripropone offline un trace registrato da CaptureTransport.
+
+    Le risposte sono restituite nell'ordine di registrazione per ogni
+    richiesta identica; esaurite, si ripete l'ultima. Le richieste non
+    presenti nel trace ricevono un errore ubus "not found".
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], hostname: str = "replay"):
+        """Initialize replay transport."""
+        self.hostname = hostname
+        self.use_https = False
+        self.handshakes = {"full": 0, "resumed": 0}
+        self._responses: Dict[str, List[Dict[str, Any]]] = {}
+        self._position: Dict[str, int] = {}
+        for record in records:
+            if "response" in record:
+                key = json.dumps([record["method"], record["params"]], sort_keys=True)
+                self._responses.setdefault(key, []).append(record["response"])
+
+    @classmethod
+    def from_file(cls, *paths: str, hostname: str = "replay") -> "ReplayTransport":
+        """Carica uno o più file di trace (dal più vecchio al più recente)."""
+        records = []
+        for path in paths:
+            with open(path, encoding="utf-8") as trace:
+                records.extend(json.loads(line) for line in trace if line.strip())
+        return cls(records, hostname)
+
+    def post(self, method: str, params: list) -> Dict[str, Any]:
+        """Ritorna la risposta registrata per la richiesta."""
+        key = _request_key(method, params)
+        responses = self._responses.get(key)
+        if not responses:
+            # Login non registrato: sessione fittizia
+            if method == "call" and params[1:3] == ["session", "login"]:
+                return {"jsonrpc": "2.0", "id": 1, "result": [0, {"ubus_rpc_session": REDACTED}]}
+            return {"jsonrpc": "2.0", "id": 1, "result": [4]}
+
+        position = self._position.get(key, 0)
+        self._position[key] = position + 1
+        return responses[min(position, len(responses) - 1)]
+
+    def close(self) -> None:
+        """Nothing to close."""
+
+
+def ethers_hash(content: str) -> str:
+    """Hash FNV-1a a 32 bit di /etc/ethers, identico a quello del plugin rpcd."""
+    value = 0x811C9DC5
+    for byte in content.encode():
+        value = ((value ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return f"{value:08x}"
+
+
+def _pick(data: Optional[Dict[str, Any]], fields: List[str]) -> Dict[str, Any]:
+    """Sottoinsieme dei campi presenti e non nulli."""
+    data = data or {}
+    return {field: data[field] for field in fields if data.get(field) is not None}
+
+
+def _format_mac(mac: Optional[str]) -> str:
+    """MAC in minuscolo con separatori (odhcpd li omette)."""
+    mac = (mac or "").lower()
+    if ":" in mac or len(mac) != 12:
+        return mac
+    return ":".join(mac[i:i + 2] for i in range(0, 12, 2))
+
+
+def _duid_mac(duid: Optional[str]) -> Optional[str]:
+    """MAC di un DUID-LLT o DUID-LL Ethernet (gli altri tipi non lo contengono)."""
+    duid = (duid or "").lower()
+    if duid.startswith("00010001") and len(duid) == 28:
+        return _format_mac(duid[16:])
+    if duid.startswith("00030001") and len(duid) == 20:
+        return _format_mac(duid[8:])
+    return None
+
+
+def parse_dnsmasq_leases(content: str) -> Dict[str, Dict[str, Any]]:
+    """Lease IPv4 dal file di dnsmasq: scadenza mac ip hostname client-id.
+
+    Le righe IPv6 (duid e lease con IAID al posto del MAC) sono ignorate.
+    """
+    leases = {}
+    for line in content.strip().split("\n"):
+        fields = line.split(" ")
+        if len(fields) >= 4 and ":" in fields[1]:
+            leases[fields[1].lower()] = {
+                "ip": fields[2],
+                "hostname": fields[3] if fields[3] != "*" else None,
+                "expires": int(fields[0]),
+            }
+    return leases
+
+
+def parse_odhcpd_leases(
+    ipv4leases: Optional[Dict[str, Any]], ipv6leases: Optional[Dict[str, Any]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Lease da dhcp ipv4leases/ipv6leases di odhcpd.
+
+    I lease IPv6 sono associati al MAC ricavato dal DUID e aggiungono
+    gli indirizzi in ipv6 (e l'hostname se il lease IPv4 non lo ha).
+    """
+    leases = {}
+    for info in (ipv4leases or {}).get("device", {}).values():
+        for lease in info.get("leases", []):
+            leases[_format_mac(lease.get("mac"))] = {
+                "ip": lease.get("address"),
+                "hostname": lease.get("hostname"),
+                "expires": lease.get("valid"),
+            }
+
+    for info in (ipv6leases or {}).get("device", {}).values():
+        for lease in info.get("leases", []):
+            mac = _duid_mac(lease.get("duid"))
+            if mac is None:
+                continue
+            entry = leases.setdefault(
+                mac, {"ip": None, "hostname": None, "expires": lease.get("valid")}
+            )
+            entry["hostname"] = entry["hostname"] or lease.get("hostname") or None
+            addresses = entry.setdefault("ipv6", [])
+            for address in lease.get("ipv6-addr") or []:
+                if address.get("address") and address["address"] not in addresses:
+                    addresses.append(address["address"])
+    return leases
+
+
+class SnapshotStandIn:
+    """Emula in locale il plugin rpcd openwrt_ubus sopra un altro trasporto.
+
+    Le chiamate a openwrt_ubus.version/snapshot sono composte con le
+    stesse chiamate ubus singole del plugin (rpcd/openwrt_ubus.uc);
+    tutte le altre passano al trasporto interno. Con ReplayTransport
+    permette di provare offline il percorso snapshot del coordinator.
+    """
+
+    def __init__(self, inner: Any, version: int = SNAPSHOT_API_VERSION):
+        """Initialize stand-in."""
+        self._inner = inner
+        self._version = version
+        self.hostname = inner.hostname
+        self.use_https = inner.use_https
+
+    @property
+    def handshakes(self) -> Dict[str, int]:
+        """Contatori cumulativi degli handshake TLS."""
+        return self._inner.handshakes
+
+    def post(self, method: str, params: list) -> Dict[str, Any]:
+        """Rispondi alle chiamate del plugin, inoltra tutte le altre."""
+        if method != "call" or len(params) < 3 or params[1] != SNAPSHOT_OBJECT:
+            return self._inner.post(method, params)
+
+        session_id, _, plugin_method = params[:3]
+        args = params[3] if len(params) > 3 else {}
+        if plugin_method == "version":
+            result = {"version": self._version}
+        elif plugin_method == "snapshot":
+            try:
+                result = self._snapshot(session_id, args)
+            except UbusAccessDeniedError as e:
+                # Come uhttpd con sessione scaduta: fallisce l'intera chiamata
+                return {"jsonrpc": "2.0", "id": 1, "error": {"code": JSONRPC_ACCESS_DENIED, "message": str(e)}}
+        else:
+            return {"jsonrpc": "2.0", "id": 1, "result": [4]}
+        return {"jsonrpc": "2.0", "id": 1, "result": [0, result]}
+
+    def _try_call(self, session_id: str, object_name: str, method: str, args: dict = None) -> Any:
+        """Chiamata ubus singola; None se oggetto, metodo o file non esistono.
+
+        Accesso negato e altri errori vengono sollevati.
+        """
+        target = f"{object_name}.{method}"
+        response = self._inner.post("call", [session_id, object_name, method, args or {}])
+        error = response.get("error")
+        if error:
+            if error.get("code") == JSONRPC_OBJECT_NOT_FOUND:
+                return None
+            if error.get("code") == JSONRPC_ACCESS_DENIED:
+                raise UbusAccessDeniedError(f"Accesso negato a {target}: {error}")
+            raise UbusError(f"Errore ubus {target}: {error}")
+
+        result = response.get("result") or [UBUS_STATUS_OK]
+        if result[0] in (UBUS_STATUS_NOT_FOUND, UBUS_STATUS_METHOD_NOT_FOUND):
+            return None
+        if result[0] == UBUS_STATUS_PERMISSION_DENIED:
+            raise UbusAccessDeniedError(f"Accesso negato a {target}")
+        if result[0] != UBUS_STATUS_OK:
+            raise UbusError(f"Errore ubus {target}: stato {result[0]}")
+        return result[1] if len(result) > 1 else {}
+
+    def _call(self, session_id: str, object_name: str, method: str, args: dict = None) -> Any:
+        """Chiamata ubus singola obbligatoria."""
+        result = self._try_call(session_id, object_name, method, args)
+        if result is None:
+            raise UbusNotFoundError(f"{object_name}.{method} non trovato")
+        return result
+
+    def _snapshot(self, session_id: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Componi lo snapshot come il plugin rpcd."""
+        snapshot: Dict[str, Any] = {"version": self._version}
+        parts = {
+            "system": lambda: self._system(session_id),
+            "clients": lambda: self._clients(session_id),
+            "leases": lambda: self._leases(session_id),
+            "ethers": lambda: self._ethers(session_id, args.get("ethers_hash")),
+            "services": lambda: self._services(session_id, args.get("services")),
+            "devices": lambda: self._devices(session_id),
+            "cpu": lambda: self._cpu(session_id),
+            "hosts": lambda: self._hosts(session_id),
+        }
+        for name, build in parts.items():
+            try:
+                snapshot[name] = build()
+            except UbusAccessDeniedError:
+                raise
+            except Exception as e:
+                snapshot.setdefault("errors", {})[name] = str(e)
+        return snapshot
+
+    def _system(self, session_id: str) -> Dict[str, Any]:
+        """Board e info di sistema."""
+        return {
+            "board": _pick(self._call(session_id, "system", "board"), ["hostname", "model", "kernel"]),
+            "info": _pick(self._call(session_id, "system", "info"), ["uptime", "load", "memory"]),
+        }
+
+    def _clients(self, session_id: str) -> Dict[str, Any]:
+        """Client di tutti gli oggetti hostapd.*."""
+        objects = self._inner.post("list", ["hostapd.*"]).get("result") or {}
+        result = {}
+        for object_name in objects:
+            clients = (self._try_call(session_id, object_name, "get_clients") or {}).get("clients", {})
+            result[object_name[len("hostapd."):]] = {
+                "clients": {
+                    mac: _pick(client, SNAPSHOT_CLIENT_FIELDS) for mac, client in clients.items()
+                }
+            }
+        return result
+
+    def _leases(self, session_id: str) -> Dict[str, Any]:
+        """Lease DHCP da dnsmasq o, in assenza, da odhcpd."""
+        leases_file = self._try_call(session_id, "file", "read", {"path": DHCP_LEASES_PATH})
+        if leases_file is not None:
+            return parse_dnsmasq_leases(leases_file.get("data", ""))
+        return parse_odhcpd_leases(self._try_call(session_id, "dhcp", "ipv4leases"))
+
+    def _ethers(self, session_id: str, known_hash: Optional[str]) -> Dict[str, Any]:
+        """Hash di /etc/ethers, con il contenuto solo se cambiato."""
+        ethers = self._try_call(session_id, "file", "read", {"path": "/etc/ethers"})
+        if ethers is None:
+            return {"hash": None}
+        data = ethers.get("data", "")
+        digest = ethers_hash(data)
+        return {"hash": digest} if digest == known_hash else {"hash": digest, "data": data}
+
+    def _services(self, session_id: str, names: Optional[List[str]]) -> Dict[str, Any]:
+        """Istanze (running, pid) dei servizi richiesti."""
+        services = self._call(session_id, "service", "list")
+        return {
+            name: {
+                "instances": {
+                    instance_id: _pick(instance, ["running", "pid"])
+                    for instance_id, instance in (services[name].get("instances") or {}).items()
+                }
+            }
+            for name in names or []
+            if services.get(name)
+        }
+
+    def _devices(self, session_id: str) -> Dict[str, Any]:
+        """Stato e contatori delle interfacce."""
+        return {
+            name: {
+                "up": device.get("up"),
+                "statistics": _pick(device.get("statistics"), INTERFACE_STATS_FIELDS),
+            }
+            for name, device in self._call(session_id, "network.device", "status").items()
+        }
+
+    def _cpu(self, session_id: str) -> str:
+        """Righe cpu/cpuN di /proc/stat."""
+        content = self._call(session_id, "file", "read", {"path": PROC_STAT_PATH}).get("data", "")
+        return "\n".join(line for line in content.split("\n") if line.startswith("cpu"))
+
+    def _hosts(self, session_id: str) -> Dict[str, Any]:
+        """Host hints luci-rpc (se presenti) e tabella ARP."""
+        return {
+            "hints": self._try_call(session_id, "luci-rpc", "getHostHints") or {},
+            "arp": self._call(session_id, "file", "read", {"path": ARP_TABLE_PATH}).get("data", ""),
+        }
+
+    def close(self) -> None:
+        """Chiudi il trasporto interno."""
+        self._inner.close()
@@ -6,10 +6,10 @@ from homeassistant.components.button import ButtonEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
 from .coordinator import OpenWrtDataUpdateCoordinator
+from .entity import OpenWrtEntity, async_setup_client_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,18 +21,17 @@ async def async_setup_entry(
     """Setup button entities."""
     coordinator = hass.data[DOMAIN][config_entry.entry_id]
     
-    entities = []
-    
-    # Crea kick button per ogni dispositivo connesso  
-    if coordinator.data and "processed_devices" in coordinator.data:
-        for mac, device_info in coordinator.data["processed_devices"].items():
-            entities.append(OpenWrtKickButton(coordinator, mac, device_info))
-    
-    async_add_entities(entities)
+    # Kick button per ogni dispositivo wireless, anche se si collega dopo (i cablati non si disconnettono)
+    async_setup_client_entities(
+        hass, coordinator, config_entry, async_add_entities, "button",
+        lambda mac, device_info: [OpenWrtKickButton(coordinator, mac, device_info)],
+    )
 
-class OpenWrtKickButton(CoordinatorEntity, ButtonEntity):
+class OpenWrtKickButton(OpenWrtEntity, ButtonEntity):
     """Button per disconnettere dispositivo."""
     
+    _category = "wireless_info"
+    
     def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, mac: str, device_info: dict):
         """Initialize kick button."""
         super().__init__(coordinator)
@@ -56,6 +55,8 @@ class OpenWrtKickButton(CoordinatorEntity, ButtonEntity):
     @property
     def available(self) -> bool:
         """Return if entity is available."""
+        if not super().available:
+            return False
         if not self.coordinator.data or "processed_devices" not in self.coordinator.data:
             return False
         
@@ -0,0 +1,358 @@
+"""Tabella client condivisa tra tutti i router OpenWrt (mesh e multi-AP)."""
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    DATA_CLIENTS, ROAM_WINDOW, ROAM_SIGNAL_MARGIN, SIGNAL_CLIENT_UPDATED, SIGNAL_CLIENTS_SEEN, KICK_BAN_DURATION,
+    KICK_SETTLE_TIME,
+    PRESENCE_CONNECTED, PRESENCE_GRACE, PRESENCE_AWAY, PRESENCE_GRACE_PERIOD, PRESENCE_AWAY_TTL,
+    PRESENCE_MAX_CLIENTS, PRESENCE_PRUNE_INTERVAL
+)
+from .presence import PresenceMachine
+
+_LOGGER = logging.getLogger(__name__)
+
+# Campi del dispositivo mostrati dal tracker: un cambio va notificato
+PUBLISHED_DEVICE_FIELDS = ("interface", "display_name", "wireless", "ipv4", "ipv6")
+
+# (metriche pubblicate, dati del dispositivo) -> metriche da pubblicare
+MetricPublisher = Callable[[Dict[str, Optional[float]], Dict[str, Any]], Dict[str, Optional[float]]]
+
+
+class ClientSighting:
+    """Client visto da un router."""
+
+    __slots__ = ("entry_id", "hostname", "last_seen", "signal", "wireless", "device")
+
+    def __init__(self, entry_id: str, hostname: str, last_seen: float, device: Dict[str, Any]):
+        """Initialize sighting."""
+        self.entry_id = entry_id
+        self.hostname = hostname
+        self.last_seen = last_seen  # time.monotonic()
+        signal = device.get("signal")
+        self.signal = signal if isinstance(signal, (int, float)) else None
+        self.wireless = bool(device.get("wireless"))
+        self.device = device
+
+
+class MergedClient:
+    """Vista unificata di un client su tutti i router."""
+
+    __slots__ = ("mac", "current", "presence", "roam_count", "access_points", "published")
+
+    def __init__(self, mac: str):
+        """Initialize client."""
+        self.mac = mac
+        self.current: Optional[ClientSighting] = None  # ultimo AP, anche se disconnesso
+        self.presence = PRESENCE_AWAY
+        self.roam_count = 0
+        self.access_points: tuple = ()
+        self.published: Dict[str, Optional[float]] = {}  # metriche wireless con isteresi
+
+    @property
+    def connected(self) -> bool:
+        """Client presente (anche in grace dopo un poll mancato)."""
+        return self.presence in (PRESENCE_CONNECTED, PRESENCE_GRACE)
+
+    @property
+    def current_ap(self) -> Optional[str]:
+        """Hostname dell'AP corrente (o dell'ultimo visto)."""
+        return self.current.hostname if self.current else None
+
+    @property
+    def device(self) -> Dict[str, Any]:
+        """Dati del client dall'AP corrente."""
+        return self.current.device if self.current else {}
+
+
+class ClientTable:
+    """Client di tutti i router indicizzati per MAC.
+
+    Ogni coordinator sostituisce solo la propria porzione: il merge è
+    incrementale e tocca i soli MAC visti (o persi) da quel router, con
+    costo proporzionale ai suoi client e non al totale.
+
+    Ogni MAC ha un solo device tracker, creato dalla piattaforma del
+    router che lo vede e che lo accetta (allowlist); il tracker riceve
+    aggiornamenti solo per il proprio MAC. I client senza tracker restano
+    in tabella e sono consultabili con async_describe.
+
+    La presenza passa per PresenceMachine: le scadenze (grace, ban,
+    client away dimenticati) sono applicate periodicamente, così la
+    memoria resta limitata anche con MAC randomizzati.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize table."""
+        self.hass = hass
+        self.clients: Dict[str, MergedClient] = {}
+        self.presence = PresenceMachine(
+            PRESENCE_GRACE_PERIOD, KICK_BAN_DURATION, PRESENCE_AWAY_TTL, PRESENCE_MAX_CLIENTS,
+            KICK_SETTLE_TIME,
+        )
+        self._unsub_prune = async_track_time_interval(
+            hass, self._async_prune, timedelta(seconds=PRESENCE_PRUNE_INTERVAL)
+        )
+        self._sightings: Dict[str, Dict[str, ClientSighting]] = {}  # MAC -> entry -> sighting
+        self._by_entry: Dict[str, Set[str]] = {}  # entry -> MAC visti
+        self._adders: Dict[str, Callable[[List[str]], None]] = {}
+        self._filters: Dict[str, Callable[[str], bool]] = {}  # entry -> MAC con tracker ammesso
+        self._owners: Dict[str, str] = {}  # MAC -> entry che ha creato il tracker
+        self._publishers: Dict[str, MetricPublisher] = {}  # entry -> isteresi delle metriche
+
+    @callback
+    def async_update_entry(
+        self,
+        entry_id: str,
+        hostname: str,
+        devices: Dict[str, Any],
+        seen_at: float,
+        publish: Optional[MetricPublisher] = None,
+    ) -> None:
+        """Sostituisci i client visti da un router e aggiorna il merge.
+
+        publish applica l'isteresi del router alle metriche dei suoi client.
+        """
+        if publish is not None:
+            self._publishers[entry_id] = publish
+        previous = self._by_entry.get(entry_id, set())
+        current = set()
+        for mac, device in devices.items():
+            if not device.get("connected", False):
+                continue
+            current.add(mac)
+            self._sightings.setdefault(mac, {})[entry_id] = ClientSighting(
+                entry_id, hostname, seen_at, device
+            )
+
+        for mac in previous - current:
+            self._drop_sighting(mac, entry_id)
+
+        self._by_entry[entry_id] = current
+        self._async_merge(current | previous)
+        if current - previous:
+            # Le piattaforme del router creano le entità per client dei nuovi arrivati
+            async_dispatcher_send(self.hass, f"{SIGNAL_CLIENTS_SEEN}_{entry_id}", list(current - previous))
+
+    @callback
+    def async_remove_entry(self, entry_id: str) -> None:
+        """Rimuovi un router; i suoi client passano agli altri router."""
+        self._adders.pop(entry_id, None)
+        self._filters.pop(entry_id, None)
+        self._publishers.pop(entry_id, None)
+        macs = self._by_entry.pop(entry_id, set())
+        for mac in macs:
+            self._drop_sighting(mac, entry_id)
+
+        orphans = {mac for mac, owner in self._owners.items() if owner == entry_id}
+        for mac in orphans:
+            del self._owners[mac]
+
+        self._async_merge(macs | orphans)
+
+    @callback
+    def async_kick(self, mac: str) -> None:
+        """Segna un client come kicked fino alla scadenza del ban."""
+        client = self.clients.get(mac)
+        if client is None:
+            return
+        if self.presence.kick(mac, time.monotonic()):
+            client.presence = self.presence.state(mac)
+            async_dispatcher_send(self.hass, f"{SIGNAL_CLIENT_UPDATED}_{mac}")
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Ferma la pulizia periodica."""
+        self._unsub_prune()
+
+    @callback
+    def _async_prune(self, _now: Any = None) -> None:
+        """Applica grace, ban scaduti e dimentica i client away da troppo."""
+        changed, forgotten = self.presence.prune(time.monotonic())
+        for mac in changed:
+            client = self.clients.get(mac)
+            if client is not None:
+                client.presence = self.presence.state(mac)
+                async_dispatcher_send(self.hass, f"{SIGNAL_CLIENT_UPDATED}_{mac}")
+
+        for mac in forgotten:
+            # Il tracker vede che il client non è più in tabella e si rimuove
+            if mac in self._sightings or self.clients.pop(mac, None) is None:
+                continue
+            self._owners.pop(mac, None)
+            async_dispatcher_send(self.hass, f"{SIGNAL_CLIENT_UPDATED}_{mac}")
+
+        if forgotten:
+            _LOGGER.debug(f"Dimenticati {len(forgotten)} client away, {len(self.clients)} in tabella")
+
+    @callback
+    def async_register_platform(
+        self,
+        entry_id: str,
+        add_trackers: Callable[[List[str]], None],
+        accepts: Optional[Callable[[str], bool]] = None,
+    ) -> Callable[[], None]:
+        """Registra la piattaforma device_tracker di un router.
+
+        accepts(mac) limita i MAC per cui il router crea un tracker.
+        """
+        self._adders[entry_id] = add_trackers
+        self._filters[entry_id] = accepts or (lambda mac: True)
+        self._async_assign(self.clients)
+
+        @callback
+        def unregister() -> None:
+            self._adders.pop(entry_id, None)
+            self._filters.pop(entry_id, None)
+
+        return unregister
+
+    @callback
+    def async_describe(self, mac: Optional[str] = None, connected_only: bool = False) -> Dict[str, Any]:
+        """Tabella client serializzabile, anche per i client senza tracker."""
+        result = {}
+        for client_mac in [mac] if mac else list(self.clients):
+            client = self.clients.get(client_mac)
+            if client is None or (connected_only and not client.connected):
+                continue
+            device = client.device
+            result[client_mac] = {
+                "name": device.get("display_name", client_mac),
+                "presence": client.presence,
+                "current_ap": client.current_ap,
+                "access_points": list(client.access_points),
+                "roam_count": client.roam_count,
+                "interface": device.get("interface"),
+                "wireless": device.get("wireless", False),
+                "ipv4": device.get("ipv4", []),
+                "signal": client.current.signal if client.current else None,
+                "tracked": client_mac in self._owners,
+            }
+        return result
+
+    def _drop_sighting(self, mac: str, entry_id: str) -> None:
+        """Rimuovi l'avvistamento di un MAC da parte di un router."""
+        sightings = self._sightings.get(mac)
+        if sightings is None:
+            return
+        sightings.pop(entry_id, None)
+        if not sightings:
+            del self._sightings[mac]
+
+    @callback
+    def _async_merge(self, macs: Iterable[str]) -> None:
+        """Ricalcola i MAC indicati e notifica i tracker cambiati."""
+        now = time.monotonic()
+        for mac in macs:
+            client = self.clients.get(mac)
+            if client is None:
+                client = self.clients[mac] = MergedClient(mac)
+            if self._merge(client, self._sightings.get(mac), now):
+                async_dispatcher_send(self.hass, f"{SIGNAL_CLIENT_UPDATED}_{mac}")
+
+        self._async_assign(macs)
+
+    def _merge(self, client: MergedClient, sightings: Optional[Dict[str, ClientSighting]], now: float) -> bool:
+        """Scegli l'AP corrente: il più recente, poi il segnale migliore.
+
+        L'AP attuale resta finché lo vede entro la finestra e nessun altro
+        ha un segnale migliore di almeno ROAM_SIGNAL_MARGIN dB. Un client
+        che riappare su un altro AP durante la grace conta come roaming.
+
+        Gli avvistamenti dalla sola tabella ARP valgono solo se nessun AP
+        vede il client in wireless: il router principale vede in ARP anche
+        i client associati agli altri AP.
+        """
+        if not sightings:
+            changed = self.presence.lost(client.mac, now) or bool(client.access_points)
+            client.presence = self.presence.state(client.mac)
+            client.access_points = ()
+            return changed
+
+        newest = max(sighting.last_seen for sighting in sightings.values())
+        candidates = [
+            sighting for sighting in sightings.values()
+            if newest - sighting.last_seen <= ROAM_WINDOW
+        ]
+        candidates = [sighting for sighting in candidates if sighting.wireless] or candidates
+        best = max(
+            candidates,
+            key=lambda sighting: sighting.signal if sighting.signal is not None else float("-inf"),
+        )
+
+        previous = client.current
+        if previous is not None:
+            keep = sightings.get(previous.entry_id)
+            if keep in candidates and (
+                best.signal is None
+                or keep.signal is None
+                or best.signal - keep.signal < ROAM_SIGNAL_MARGIN
+            ):
+                best = keep
+
+        if (
+            client.connected and previous is not None and best.entry_id != previous.entry_id
+            and previous.wireless and best.wireless
+        ):
+            client.roam_count += 1
+            _LOGGER.debug(f"Roaming {client.mac}: {previous.hostname} -> {best.hostname}")
+
+        access_points = tuple(sorted(sighting.hostname for sighting in candidates))
+        publish = self._publishers.get(best.entry_id)
+        published = publish(client.published, best.device) if publish else {}
+        # Ogni ciclo crea nuovi avvistamenti: si confronta ciò che il tracker mostra
+        changed = (
+            self.presence.seen(client.mac, best.last_seen)
+            or previous is None
+            or best.entry_id != previous.entry_id
+            or access_points != client.access_points
+            or published != client.published
+            or any(best.device.get(key) != previous.device.get(key) for key in PUBLISHED_DEVICE_FIELDS)
+        )
+        client.current = best
+        client.presence = self.presence.state(client.mac)
+        client.access_points = access_points
+        client.published = published
+        return changed
+
+    @callback
+    def _async_assign(self, macs: Iterable[str]) -> None:
+        """Crea i tracker mancanti tramite la piattaforma di un router che li vede."""
+        additions: Dict[str, List[str]] = {}
+        for mac in macs:
+            if mac in self._owners:
+                continue
+            client = self.clients.get(mac)
+            entry_id = client.current.entry_id if client and client.current else None
+            if not self._accepts(entry_id, mac):
+                entry_id = next(
+                    (entry for entry in self._sightings.get(mac, {}) if self._accepts(entry, mac)),
+                    None,
+                )
+            if entry_id is None:
+                continue
+            self._owners[mac] = entry_id
+            additions.setdefault(entry_id, []).append(mac)
+
+        for entry_id, new_macs in additions.items():
+            self._adders[entry_id](new_macs)
+
+    def _accepts(self, entry_id: Optional[str], mac: str) -> bool:
+        """Ritorna True se il router ha la piattaforma attiva e ammette il MAC."""
+        accepts = self._filters.get(entry_id)
+        return accepts is not None and accepts(mac)
+
+
+@callback
+def async_get_client_table(hass: HomeAssistant) -> ClientTable:
+    """Ritorna (o crea) la tabella client condivisa."""
+    table = hass.data.get(DATA_CLIENTS)
+    if table is None:
+        table = hass.data[DATA_CLIENTS] = ClientTable(hass)
+    return table
@@ -1,24 +1,47 @@
 """Config flow per OpenWrt Ubus."""
 import asyncio
 import logging
+import re
 import voluptuous as vol
 from typing import Any, Dict, Optional
-import requests
-import json
 
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.const import CONF_USERNAME, CONF_PASSWORD
 from homeassistant.data_entry_flow import FlowResult
 import homeassistant.helpers.config_validation as cv
 
 from .const import (
     DOMAIN, CONF_HOSTNAME, CONF_WIRELESS_BACKEND, 
+    CONF_USE_HTTPS, CONF_VERIFY_SSL, CONF_CERT_FINGERPRINT,
     CONF_DHCP_BACKEND, CONF_MANAGED_SERVICES,
-    WIRELESS_BACKENDS, DHCP_BACKENDS, COMMON_SERVICES
+    WIRELESS_BACKENDS, DHCP_BACKENDS, COMMON_SERVICES,
+    DATA_HANDOFF, CONF_SIGNAL_HYSTERESIS, CONF_RATE_HYSTERESIS,
+    CONF_CLIENT_SENSORS, DEFAULT_SIGNAL_HYSTERESIS,
+    DEFAULT_RATE_HYSTERESIS, DEFAULT_CLIENT_SENSORS,
+    CONF_CAPTURE, DEFAULT_CAPTURE, CONF_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT, REQUEST_POOL_SIZE,
+    CONF_CLIENT_MODE, CONF_CLIENT_ALLOWLIST, CLIENT_MODES, DEFAULT_CLIENT_MODE
 )
+from .api import UbusClient
+from .coordinator import async_probe_capabilities
 
 _LOGGER = logging.getLogger(__name__)
 
+_MAC_ADDRESS = re.compile(r'^[0-9a-f]{2}(:[0-9a-f]{2}){5}$')
+
+def _parse_allowlist(text: str) -> list:
+    """MAC separati da virgole, spazi o a capo, normalizzati in minuscolo con ':'."""
+    macs = []
+    for mac in re.split(r'[\s,;]+', text.strip().lower()):
+        if not mac:
+            continue
+        mac = mac.replace('-', ':')
+        if not _MAC_ADDRESS.match(mac):
+            raise vol.Invalid(f"MAC non valido: {mac}")
+        if mac not in macs:
+            macs.append(mac)
+    return macs
+
 class OpenWrtUbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle config flow per OpenWrt Ubus."""
     
@@ -28,6 +51,31 @@ class OpenWrtUbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Initialize the config flow."""
         self.data = {}
         self.available_services = []
+        self.session_id = None
+        self.capabilities = {}
+        self.client = None
+    
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Get the options flow."""
+        return OpenWrtUbusOptionsFlow(config_entry)
+    
+    @callback
+    def async_remove(self) -> None:
+        """Chiudi il client non passato al coordinator (abort o flow abbandonato)."""
+        if self.client is not None:
+            client, self.client = self.client, None
+            self.hass.async_add_executor_job(client.close)
+    
+    async def _async_close_client(self) -> None:
+        """Chiudi connessioni e sessione del client del flow."""
+        if self.client is not None:
+            client, self.client = self.client, None
+            self.session_id = None
+            await self.hass.async_add_executor_job(client.close)
     
     async def async_step_user(
         self, user_input: Optional[Dict[str, Any]] = None
@@ -36,12 +84,13 @@ class OpenWrtUbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
         
         if user_input is not None:
-            # Test connessione e recupera servizi
+            # Test connessione e rileva backend e servizi
             try:
-                services = await self._test_connection(user_input)
-                if services:
+                capabilities = await self._test_connection(user_input)
+                if capabilities:
                     self.data.update(user_input)
-                    self.available_services = services
+                    self.capabilities = capabilities
+                    self.available_services = capabilities["services"] or COMMON_SERVICES
                     return await self.async_step_services()
                 else:
                     errors["base"] = "cannot_connect"
@@ -53,8 +102,9 @@ class OpenWrtUbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             vol.Required(CONF_HOSTNAME): str,
             vol.Required(CONF_USERNAME, default="root"): str,
             vol.Required(CONF_PASSWORD): str,
-            vol.Required(CONF_WIRELESS_BACKEND, default="hostapd"): vol.In(WIRELESS_BACKENDS),
-            vol.Required(CONF_DHCP_BACKEND, default="dnsmasq"): vol.In(DHCP_BACKENDS),
+            vol.Required(CONF_USE_HTTPS, default=False): bool,
+            vol.Required(CONF_VERIFY_SSL, default=True): bool,
+            vol.Optional(CONF_CERT_FINGERPRINT): str,
         })
         
         return self.async_show_form(
@@ -66,14 +116,26 @@ class OpenWrtUbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     async def async_step_services(
         self, user_input: Optional[Dict[str, Any]] = None
     ) -> FlowResult:
-        """Handle services selection."""
+        """Handle backend and services selection."""
         if user_input is not None:
+            self.data[CONF_WIRELESS_BACKEND] = user_input[CONF_WIRELESS_BACKEND]
+            self.data[CONF_DHCP_BACKEND] = user_input[CONF_DHCP_BACKEND]
             self.data[CONF_MANAGED_SERVICES] = user_input[CONF_MANAGED_SERVICES]
             
             # Create entry
             await self.async_set_unique_id(self.data[CONF_HOSTNAME])
             self._abort_if_unique_id_configured()
             
+            # Passa sessione e capacità al coordinator: il primo refresh
+            # salta login e rilevamento
+            self.hass.data.setdefault(DATA_HANDOFF, {})[self.data[CONF_HOSTNAME]] = {
+                "session_id": self.session_id,
+                "capabilities": self.capabilities,
+                "client": self.client,
+            }
+            # Ora appartiene al coordinator: async_remove non deve chiuderlo
+            self.client = None
+            
             return self.async_create_entry(
                 title=f"OpenWrt - {self.data[CONF_HOSTNAME]}",
                 data=self.data
@@ -82,7 +144,16 @@ class OpenWrtUbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         # Prepara lista servizi disponibili
         services_options = {service: service for service in self.available_services}
         
+        # Preseleziona i backend rilevati
         data_schema = vol.Schema({
+            vol.Required(
+                CONF_WIRELESS_BACKEND,
+                default=self.capabilities.get("wireless_backend", "hostapd")
+            ): vol.In(WIRELESS_BACKENDS),
+            vol.Required(
+                CONF_DHCP_BACKEND,
+                default=self.capabilities.get("dhcp_backend", "dnsmasq")
+            ): vol.In(DHCP_BACKENDS),
             vol.Required(CONF_MANAGED_SERVICES, default=list(self.available_services)): cv.multi_select(services_options)
         })
         
@@ -91,82 +162,117 @@ class OpenWrtUbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=data_schema
         )
     
-    async def _test_connection(self, config: Dict[str, Any]) -> list:
-        """Test connessione e recupera servizi disponibili."""
+    async def _test_connection(self, config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Test connessione e rileva in parallelo backend e servizi disponibili."""
         try:
-            hostname = config[CONF_HOSTNAME]
-            username = config[CONF_USERNAME]  
-            password = config[CONF_PASSWORD]
+            await self._async_close_client()
+            self.client = UbusClient(
+                config[CONF_HOSTNAME],
+                use_https=config.get(CONF_USE_HTTPS, False),
+                verify_ssl=config.get(CONF_VERIFY_SSL, True),
+                fingerprint=config.get(CONF_CERT_FINGERPRINT),
+            )
             
             # Test connessione ubus
-            session_id = await self._get_ubus_session(hostname, username, password)
+            session_id = await self._get_ubus_session(config[CONF_USERNAME], config[CONF_PASSWORD])
             if not session_id:
-                return []
+                await self._async_close_client()
+                return None
+            self.session_id = session_id
+            
+            async def call(object_name: str, method: str, params: dict) -> Any:
+                return await self._ubus_request("call", [session_id, object_name, method, params])
             
-            # Recupera lista servizi
-            services = await self._get_system_services(hostname, session_id)
-            return services
+            async def list_objects(pattern: str) -> Dict[str, Any]:
+                return await self._ubus_request("list", [pattern])
+            
+            return await async_probe_capabilities(call, list_objects)
             
         except Exception as e:
             _LOGGER.error(f"Test connessione fallito: {e}")
-            return []
+            await self._async_close_client()
+            return None
     
-    async def _get_ubus_session(self, hostname: str, username: str, password: str) -> Optional[str]:
-        """Ottieni session ID ubus."""
-        url = f"http://{hostname}/ubus"
+    async def _ubus_request(self, method: str, params: list) -> Any:
+        """Esegui richiesta JSON-RPC ubus."""
+        result = await self.hass.async_add_executor_job(self.client.post, method, params)
+        if result.get("error"):
+            raise Exception(f"Errore ubus: {result['error']}")
         
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "call",
-            "params": [
+        result = result.get("result")
+        if method == "call":
+            if not result or result[0] != 0:
+                raise Exception(f"Errore ubus: status {result[0] if result else None}")
+            return result[1] if len(result) > 1 else None
+        return result or {}
+    
+    async def _get_ubus_session(self, username: str, password: str) -> Optional[str]:
+        """Ottieni session ID ubus."""
+        try:
+            result = await self._ubus_request("call", [
                 "00000000000000000000000000000000",
                 "session",
                 "login",
                 {"username": username, "password": password}
-            ]
-        }
-        
-        try:
-            response = await self.hass.async_add_executor_job(
-                lambda: requests.post(url, data=json.dumps(payload), 
-                                     headers={'Content-Type': 'application/json'}, 
-                                     timeout=10)
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("result") and len(result["result"]) > 1:
-                    return result["result"][1].get("ubus_rpc_session")
+            ])
+            if result:
+                return result.get("ubus_rpc_session")
         except Exception as e:
             _LOGGER.error(f"Errore login ubus: {e}")
         
         return None
+
+
+class OpenWrtUbusOptionsFlow(config_entries.OptionsFlow):
+    """Handle options per OpenWrt Ubus."""
+    
+    def __init__(self, config_entry: config_entries.ConfigEntry):
+        """Initialize options flow."""
+        self._entry = config_entry
     
-    async def _get_system_services(self, hostname: str, session_id: str) -> list:
-        """Recupera lista servizi sistema."""
-        url = f"http://{hostname}/ubus"
+    async def async_step_init(
+        self, user_input: Optional[Dict[str, Any]] = None
+    ) -> FlowResult:
+        """Manage the options."""
+        errors = {}
+        options = self._entry.options
+        allowlist = ", ".join(options.get(CONF_CLIENT_ALLOWLIST, []))
         
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "call",
-            "params": [session_id, "service", "list", {}]
-        }
+        if user_input is not None:
+            allowlist = user_input.get(CONF_CLIENT_ALLOWLIST, "")
+            try:
+                user_input[CONF_CLIENT_ALLOWLIST] = _parse_allowlist(allowlist)
+            except vol.Invalid:
+                errors[CONF_CLIENT_ALLOWLIST] = "invalid_mac"
+            else:
+                return self.async_create_entry(title="", data=user_input)
         
-        try:
-            response = await self.hass.async_add_executor_job(
-                lambda: requests.post(url, data=json.dumps(payload), 
-                                     headers={'Content-Type': 'application/json'}, 
-                                     timeout=10)
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("result") and len(result["result"]) > 1:
-                    services_data = result["result"][1]
-                    return list(services_data.keys()) if services_data else COMMON_SERVICES
-        except Exception as e:
-            _LOGGER.error(f"Errore recupero servizi: {e}")
+        data_schema = vol.Schema({
+            vol.Required(
+                CONF_SIGNAL_HYSTERESIS,
+                default=options.get(CONF_SIGNAL_HYSTERESIS, DEFAULT_SIGNAL_HYSTERESIS)
+            ): vol.All(vol.Coerce(int), vol.Range(min=0, max=30)),
+            vol.Required(
+                CONF_RATE_HYSTERESIS,
+                default=options.get(CONF_RATE_HYSTERESIS, DEFAULT_RATE_HYSTERESIS)
+            ): vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+            vol.Required(
+                CONF_CLIENT_SENSORS,
+                default=options.get(CONF_CLIENT_SENSORS, DEFAULT_CLIENT_SENSORS)
+            ): bool,
+            vol.Required(
+                CONF_CAPTURE,
+                default=options.get(CONF_CAPTURE, DEFAULT_CAPTURE)
+            ): bool,
+            vol.Required(
+                CONF_MAX_IN_FLIGHT,
+                default=options.get(CONF_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT)
+            ): vol.All(vol.Coerce(int), vol.Range(min=1, max=REQUEST_POOL_SIZE)),
+            vol.Required(
+                CONF_CLIENT_MODE,
+                default=options.get(CONF_CLIENT_MODE, DEFAULT_CLIENT_MODE)
+            ): vol.In(CLIENT_MODES),
+            vol.Optional(CONF_CLIENT_ALLOWLIST, default=allowlist): str,
+        })
         
-        return COMMON_SERVICES
\ No newline at end of file
+        return self.async_show_form(step_id="init", data_schema=data_schema, errors=errors)
@@ -10,6 +10,35 @@ CONF_PASSWORD = "password"
 CONF_WIRELESS_BACKEND = "wireless_backend"
 CONF_DHCP_BACKEND = "dhcp_backend"
 CONF_MANAGED_SERVICES = "managed_services"
+CONF_USE_HTTPS = "use_https"
+CONF_VERIFY_SSL = "verify_ssl"
+CONF_CERT_FINGERPRINT = "cert_fingerprint"
+
+# Opzioni
+CONF_SIGNAL_HYSTERESIS = "signal_hysteresis"
+CONF_RATE_HYSTERESIS = "rate_hysteresis"
+CONF_CLIENT_SENSORS = "client_sensors"
+CONF_CAPTURE = "capture"
+CONF_MAX_IN_FLIGHT = "max_in_flight"
+CONF_CLIENT_MODE = "client_mode"
+CONF_CLIENT_ALLOWLIST = "client_allowlist"
+
+# Entità per client: tutti i client o solo quelli in allowlist (gli altri solo aggregati)
+CLIENT_MODE_ALL = "all"
+CLIENT_MODE_ALLOWLIST = "allowlist"
+CLIENT_MODES = [CLIENT_MODE_ALL, CLIENT_MODE_ALLOWLIST]
+
+DEFAULT_SIGNAL_HYSTERESIS = 3  # dBm
+DEFAULT_RATE_HYSTERESIS = 10  # %
+DEFAULT_CLIENT_SENSORS = False
+DEFAULT_CAPTURE = False
+DEFAULT_MAX_IN_FLIGHT = 2
+DEFAULT_CLIENT_MODE = CLIENT_MODE_ALL
+
+# Trace richieste ubus (modalità capture)
+CAPTURE_FILENAME = "openwrt_ubus_trace_{hostname}.jsonl"
+CAPTURE_MAX_BYTES = 5 * 1024 * 1024
+CAPTURE_BACKUPS = 3
 
 # Opzioni backend
 WIRELESS_BACKENDS = ["hostapd", "iwinfo", "none"]
@@ -18,7 +47,125 @@ DHCP_BACKENDS = ["odhcpd", "dnsmasq", "none"]
 # Timeout e intervalli
 UPDATE_INTERVAL = 30
 REQUEST_TIMEOUT = 10
+REQUEST_POOL_SIZE = 4  # connessioni keep-alive per router
+
+# Scheduler richieste: priorità (numero più basso = più urgente)
+PRIORITY_USER = 0  # kick, controllo servizi
+PRIORITY_PRESENCE = 1  # client, lease, ethers
+PRIORITY_STATS = 2  # sistema, interfacce, survey radio
+PRESENCE_CATEGORIES = {"wireless_info", "dhcp_leases", "ethers", "hosts"}
+SCHEDULER_WAIT_SAMPLES = 200
 KICK_BAN_DURATION = 60
+KICK_SETTLE_TIME = UPDATE_INTERVAL  # hostapd può elencare il client ancora per un poll dopo del_client
+CATEGORY_STALE_CYCLES = 3  # cicli mancati prima che le entità diventino non disponibili
+
+# Survey radio (canale, rumore, airtime): cambiano lentamente, cadenza più lunga
+RADIO_STATS_INTERVAL = 4 * UPDATE_INTERVAL
+RADIO_STATS_FIELDS = ["active_time", "busy_time", "rx_time", "tx_time"]
+
+# Categorie con cadenza diversa dal ciclo principale
+CATEGORY_INTERVALS = {"radio_stats": RADIO_STATS_INTERVAL}
+
+# Scala virgola fissa del load average in system info
+LOAD_SCALE = 65536
+
+# Utilizzo CPU da /proc/stat (campi dopo il nome, guest esclusi perché già in user)
+PROC_STAT_PATH = "/proc/stat"
+CPU_STAT_FIELDS = ["user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal"]
+
+# Statistiche traffico interfacce
+INTERFACE_STATS_SAMPLES = 10  # campioni per ring buffer (~5 minuti)
+INTERFACE_STATS_FIELDS = ["rx_bytes", "tx_bytes", "rx_packets", "tx_packets"]
+
+# Tracing e profiling ciclo di aggiornamento
+CYCLE_TIMINGS_SIZE = 20  # cicli conservati in memoria
+PROFILE_FILENAME = "openwrt_ubus_profile_{hostname}_{timestamp}.prof"
+DEFAULT_PROFILE_CYCLES = 5
+
+# Cache nomi dispositivi (LRU)
+NAME_CACHE_SIZE = 2048
+
+# Storico segnale/rate per client
+CLIENT_HISTORY_SAMPLES = 20  # campioni per client (~10 minuti)
+CLIENT_HISTORY_MAX_CLIENTS = 4096
+CLIENT_HISTORY_FIELDS = ["signal", "rx_rate", "tx_rate"]
+
+# Throughput per client dai contatori cumulativi hostapd: campo -> (gruppo, direzione)
+CLIENT_COUNTER_FIELDS = {
+    "rx_bytes": ("bytes", "rx"),
+    "tx_bytes": ("bytes", "tx"),
+    "rx_packets": ("packets", "rx"),
+    "tx_packets": ("packets", "tx"),
+    "rx_airtime": ("airtime", "rx"),  # µs, solo con airtime fairness
+    "tx_airtime": ("airtime", "tx"),
+}
+TOP_TALKERS_COUNT = 5
+
+# Conferma stato servizi dopo start/stop/restart
+SERVICE_CONFIRM_TIMEOUT = 20
+SERVICE_CONFIRM_TIMEOUTS = {
+    "network": 60,
+    "firewall": 30,
+    "dropbear": 5,
+}
+SERVICE_CONFIRM_BACKOFF_MIN = 0.25
+SERVICE_CONFIRM_BACKOFF_MAX = 2.0
+SERVICE_ACTIONS = ["start", "stop", "restart"]
+
+# Chiave hass.data per passare sessione e capacità dal config flow al coordinator
+DATA_HANDOFF = f"{DOMAIN}_handoff"
+
+# Opzione encryption di /etc/config/wireless (senza +cipher) -> nome mostrato
+UCI_ENCRYPTION_NAMES = {
+    "none": "Open",
+    "owe": "OWE",
+    "wep": "WEP",
+    "psk": "WPA-PSK",
+    "psk2": "WPA2-PSK",
+    "psk-mixed": "WPA/WPA2-PSK",
+    "sae": "WPA3-SAE",
+    "sae-mixed": "WPA2-PSK/WPA3-SAE",
+    "wpa": "WPA-EAP",
+    "wpa2": "WPA2-EAP",
+    "wpa3": "WPA3-EAP",
+    "wpa-mixed": "WPA/WPA2-EAP",
+    "wpa3-mixed": "WPA2/WPA3-EAP",
+}
+
+# Plugin rpcd opzionale (rpcd/openwrt_ubus.uc): snapshot in una sola chiamata
+SNAPSHOT_OBJECT = "openwrt_ubus"
+SNAPSHOT_API_VERSION = 1
+SNAPSHOT_CLIENT_FIELDS = ["signal", "rate", "bytes", "packets", "airtime", "authorized"]
+DHCP_LEASES_PATH = "/tmp/dhcp.leases"
+
+# Client cablati: host hints luci-rpc e tabella ARP del kernel
+ARP_TABLE_PATH = "/proc/net/arp"
+ARP_READ_MAX_BYTES = 4096  # rpcd file read legge i file /proc (dimensione 0) fino a 4 KiB
+ARP_FLAG_COMPLETE = 0x2
+NEIGHBOR_DEVICE_PREFIXES = ("br-",)  # bridge LAN: vicini su WAN e tunnel esclusi
+
+# Chiave hass.data per la tabella client condivisa tra tutti i router
+DATA_CLIENTS = f"{DOMAIN}_clients"
+
+# Roaming: AP che hanno visto il client entro la finestra sono candidati,
+# si cambia AP solo se il segnale migliora almeno del margine
+ROAM_WINDOW = UPDATE_INTERVAL
+ROAM_SIGNAL_MARGIN = 6  # dB
+
+# Presenza client: un poll mancato resta in grace, gli away sono dimenticati dopo il TTL
+PRESENCE_CONNECTED = "connected"
+PRESENCE_GRACE = "grace"
+PRESENCE_AWAY = "away"
+PRESENCE_KICKED = "kicked"
+PRESENCE_GRACE_PERIOD = 2 * UPDATE_INTERVAL
+PRESENCE_AWAY_TTL = 24 * 3600
+PRESENCE_MAX_CLIENTS = 4096
+PRESENCE_PRUNE_INTERVAL = UPDATE_INTERVAL
+
+# Segnali dispatcher
+SIGNAL_SERVICE_UPDATED = f"{DOMAIN}_service_updated"
+SIGNAL_CLIENT_UPDATED = f"{DOMAIN}_client_updated"
+SIGNAL_CLIENTS_SEEN = f"{DOMAIN}_clients_seen"  # + _{entry_id}: MAC nuovi per il router
 
 # Servizi di sistema comuni
 COMMON_SERVICES = [
@@ -1,30 +1,188 @@
 """Data Update Coordinator per OpenWrt Ubus."""
 import asyncio
+import cProfile
 import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from datetime import timedelta, datetime
-from typing import Any, Dict, List, Optional
-import requests
-import json
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 import re
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.const import CONF_USERNAME, CONF_PASSWORD
 
 from .const import (
-    DOMAIN, UPDATE_INTERVAL, REQUEST_TIMEOUT,
-    CONF_HOSTNAME, CONF_WIRELESS_BACKEND, CONF_DHCP_BACKEND,
-    CONF_MANAGED_SERVICES, KICK_BAN_DURATION
+    DOMAIN, UPDATE_INTERVAL,
+    CONF_HOSTNAME, CONF_USE_HTTPS, CONF_VERIFY_SSL, CONF_CERT_FINGERPRINT, CONF_WIRELESS_BACKEND, CONF_DHCP_BACKEND,
+    CONF_MANAGED_SERVICES, KICK_BAN_DURATION, DATA_HANDOFF,
+    CONF_SIGNAL_HYSTERESIS, CONF_RATE_HYSTERESIS, CONF_CLIENT_SENSORS,
+    DEFAULT_SIGNAL_HYSTERESIS, DEFAULT_RATE_HYSTERESIS, DEFAULT_CLIENT_SENSORS,
+    CONF_CAPTURE, DEFAULT_CAPTURE, CAPTURE_FILENAME, CAPTURE_MAX_BYTES, CAPTURE_BACKUPS,
+    SERVICE_CONFIRM_TIMEOUT, SERVICE_CONFIRM_TIMEOUTS,
+    SERVICE_CONFIRM_BACKOFF_MIN, SERVICE_CONFIRM_BACKOFF_MAX,
+    SERVICE_ACTIONS, SIGNAL_SERVICE_UPDATED,
+    LOAD_SCALE, INTERFACE_STATS_SAMPLES, INTERFACE_STATS_FIELDS,
+    CLIENT_HISTORY_SAMPLES, CLIENT_HISTORY_MAX_CLIENTS, CLIENT_HISTORY_FIELDS,
+    NAME_CACHE_SIZE, CYCLE_TIMINGS_SIZE, PROFILE_FILENAME,
+    CATEGORY_STALE_CYCLES, CATEGORY_INTERVALS, RADIO_STATS_INTERVAL, RADIO_STATS_FIELDS,
+    SNAPSHOT_OBJECT, SNAPSHOT_API_VERSION, PROC_STAT_PATH, CPU_STAT_FIELDS,
+    CONF_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT, PRIORITY_PRESENCE, PRIORITY_STATS,
+    PRESENCE_CATEGORIES, ARP_TABLE_PATH, ARP_READ_MAX_BYTES, ARP_FLAG_COMPLETE, NEIGHBOR_DEVICE_PREFIXES,
+    CLIENT_COUNTER_FIELDS, TOP_TALKERS_COUNT,
+    CONF_CLIENT_MODE, CONF_CLIENT_ALLOWLIST, DEFAULT_CLIENT_MODE, CLIENT_MODE_ALL,
+    DHCP_LEASES_PATH, UCI_ENCRYPTION_NAMES
 )
+from .api import (
+    CaptureTransport, UbusClient, UbusError, UbusNotFoundError, UbusAccessDeniedError,
+    UBUS_STATUS_OK, UBUS_STATUS_METHOD_NOT_FOUND, UBUS_STATUS_NOT_FOUND, UBUS_STATUS_PERMISSION_DENIED,
+    JSONRPC_OBJECT_NOT_FOUND, JSONRPC_ACCESS_DENIED, parse_dnsmasq_leases, parse_odhcpd_leases
+)
+from .clients import async_get_client_table
+from .scheduler import RequestScheduler, request_priority, user_request
+from .ringbuffer import BoundedBufferMap, CounterRingBuffer, GaugeRingBuffer
+from .throughput import ClientRateTable
 
 _LOGGER = logging.getLogger(__name__)
 
+# Caratteri non validi (anche ripetuti) in un entity ID
+_SLUG_INVALID = re.compile(r'[^a-z0-9]+')
+
+@contextmanager
+def _span(spans: Dict[str, float], name: str):
+    """Misura la durata di una fase del ciclo in millisecondi."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans[name] = round((time.perf_counter() - start) * 1000, 2)
+
+def _jsonrpc_error(error: Dict[str, Any], target: str) -> UbusError:
+    """Errore tipizzato per un errore JSON-RPC di uhttpd."""
+    code = error.get("code")
+    if code == JSONRPC_OBJECT_NOT_FOUND:
+        return UbusNotFoundError(f"{target} non trovato: {error}")
+    if code == JSONRPC_ACCESS_DENIED:
+        return UbusAccessDeniedError(f"Accesso negato a {target}: {error}")
+    return UbusError(f"Errore ubus {target}: {error}")
+
+class CategoryState:
+    """Esito dei fetch di una categoria di dati."""
+    
+    __slots__ = ("value", "ok", "last_success", "last_error", "failures")
+    
+    def __init__(self):
+        """Initialize state."""
+        self.value = None
+        self.ok = False
+        self.last_success = None  # time.monotonic()
+        self.last_error = None
+        self.failures = 0
+    
+    def record_success(self, value: Any) -> None:
+        """Registra un fetch riuscito."""
+        self.value = value
+        self.ok = True
+        self.last_success = time.monotonic()
+        self.last_error = None
+        self.failures = 0
+    
+    def record_failure(self, error: Exception) -> None:
+        """Registra un fetch fallito, mantenendo l'ultimo valore valido."""
+        self.ok = False
+        self.last_error = error
+        self.failures += 1
+    
+    def age(self) -> Optional[float]:
+        """Secondi dall'ultimo fetch riuscito."""
+        if self.last_success is None:
+            return None
+        return time.monotonic() - self.last_success
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Stato serializzabile per entità e diagnostics."""
+        age = self.age()
+        return {
+            "ok": self.ok,
+            "age": round(age, 1) if age is not None else None,
+            "failures": self.failures,
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
+
+async def async_probe_capabilities(
+    call: Callable[..., Awaitable[Any]],
+    list_objects: Callable[[str], Awaitable[Dict[str, Any]]],
+) -> Dict[str, Any]:
+    """Rileva in parallelo backend wireless/DHCP e servizi disponibili.
+    
+    call(object, method, params) e list_objects(pattern) sono le primitive
+    ubus della sessione già autenticata.
+    """
+    async def _probe(coro) -> Any:
+        try:
+            return await coro
+        except Exception as e:
+            _LOGGER.debug(f"Probe fallito: {e}")
+            return None
+    
+    services, hostapd, iwinfo, odhcpd, snapshot = await asyncio.gather(
+        _probe(call("service", "list", {})),
+        _probe(list_objects("hostapd.*")),
+        _probe(call("iwinfo", "devices", {})),
+        _probe(call("dhcp", "ipv4leases", {})),
+        _probe(call(SNAPSHOT_OBJECT, "version", {})),
+    )
+    
+    services = services or {}
+    capabilities = {
+        "services": list(services),
+        "hostapd": bool(hostapd),
+        "iwinfo": bool(iwinfo and iwinfo.get("devices")),
+        "dnsmasq": "dnsmasq" in services,
+        "odhcpd": odhcpd is not None or "odhcpd" in services,
+        "snapshot": None,
+    }
+    
+    # Plugin rpcd: usato solo se la versione del formato è compatibile
+    if snapshot is not None:
+        version = snapshot.get("version")
+        if version == SNAPSHOT_API_VERSION:
+            capabilities["snapshot"] = version
+        else:
+            _LOGGER.warning(
+                f"Plugin {SNAPSHOT_OBJECT} versione {version} non supportata "
+                f"(attesa {SNAPSHOT_API_VERSION}), uso chiamate singole"
+            )
+    
+    if capabilities["hostapd"]:
+        capabilities["wireless_backend"] = "hostapd"
+    elif capabilities["iwinfo"]:
+        capabilities["wireless_backend"] = "iwinfo"
+    else:
+        capabilities["wireless_backend"] = "none"
+    
+    if capabilities["dnsmasq"]:
+        capabilities["dhcp_backend"] = "dnsmasq"
+    elif capabilities["odhcpd"]:
+        capabilities["dhcp_backend"] = "odhcpd"
+    else:
+        capabilities["dhcp_backend"] = "none"
+    
+    return capabilities
+
 class OpenWrtDataUpdateCoordinator(DataUpdateCoordinator):
     """Coordinator per gestire aggiornamenti dati OpenWrt."""
     
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
-        """Initialize coordinator."""
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, client: Any = None):
+        """Initialize coordinator.
+        
+        client permette di usare un trasporto alternativo, ad esempio
+        ReplayTransport per riprodurre offline un trace registrato.
+        """
         self.hass = hass
         self.entry = entry
         self.hostname = entry.data[CONF_HOSTNAME]
@@ -34,9 +192,63 @@ class OpenWrtDataUpdateCoordinator(DataUpdateCoordinator):
         self.dhcp_backend = entry.data[CONF_DHCP_BACKEND]
         self.managed_services = entry.data[CONF_MANAGED_SERVICES]
         
+        # Opzioni
+        self.signal_hysteresis = entry.options.get(CONF_SIGNAL_HYSTERESIS, DEFAULT_SIGNAL_HYSTERESIS)
+        self.rate_hysteresis = entry.options.get(CONF_RATE_HYSTERESIS, DEFAULT_RATE_HYSTERESIS)
+        self.client_sensors = entry.options.get(CONF_CLIENT_SENSORS, DEFAULT_CLIENT_SENSORS)
+        self.client_mode = entry.options.get(CONF_CLIENT_MODE, DEFAULT_CLIENT_MODE)
+        self.client_allowlist = {mac.lower() for mac in entry.options.get(CONF_CLIENT_ALLOWLIST, [])}
+        
+        # Richieste in corso limitate per router, in ordine di priorità
+        self.scheduler = RequestScheduler(
+            entry.options.get(CONF_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT)
+        )
+        
         self.session_id = None
-        self.kicked_devices = {}  # MAC -> timestamp
+        self.capabilities = None
+        self.client = client
         self.ethers_map = {}  # MAC -> nome da /etc/ethers
+        self._ethers_content = None
+        self._ethers_version = 0
+        self._ethers_hash = None
+        # (mac, interfaccia, versione ethers, hostname lease o hint) -> nomi risolti
+        self._name_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._interface_buffers: Dict[str, CounterRingBuffer] = {}
+        self._last_uptime = None
+        self.client_history = BoundedBufferMap(
+            lambda: GaugeRingBuffer(CLIENT_HISTORY_FIELDS, CLIENT_HISTORY_SAMPLES),
+            CLIENT_HISTORY_MAX_CLIENTS,
+        )
+        # Contatori byte/pacchetti/airtime dei client, uno slot per MAC
+        self.client_rates = ClientRateTable(CLIENT_COUNTER_FIELDS)
+        
+        # Tempi per fase degli ultimi cicli e profiling on demand
+        self.cycle_timings = deque(maxlen=CYCLE_TIMINGS_SIZE)
+        
+        # Stato per categoria di dati (ultimo valore valido, staleness)
+        self.categories: Dict[str, CategoryState] = {}
+        self._interface_stats: Dict[str, Any] = {}
+        
+        # Indice MAC -> indirizzi, nome e vicino ARP (host hints + tabella ARP)
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+        self._arp_truncated_logged = False
+        
+        # Ultimo campione /proc/stat per CPU e numero di core rilevati
+        self._cpu_samples: Dict[str, List[int]] = {}
+        self._cpu_usage: Dict[str, Any] = {}
+        self.cpu_cores = 1
+        
+        # Survey radio: ultimo tentativo e contatori airtime per radio
+        self._radio_stats_at = None
+        self._radio_samples: Dict[str, List[int]] = {}
+        self._radio_stats: Dict[str, Any] = {}
+        
+        # Tabella client condivisa tra tutti i router
+        self.client_table = async_get_client_table(hass)
+        self._clients_seen_at = None
+        self._pending_cycle = None
+        self._profiler = None
+        self._profile_cycles_left = 0
         
         super().__init__(
             hass,
@@ -44,40 +256,383 @@ class OpenWrtDataUpdateCoordinator(DataUpdateCoordinator):
             name=DOMAIN,
             update_interval=timedelta(seconds=UPDATE_INTERVAL)
         )
+        
+        # Sessione e capacità già validate dal config flow
+        handoff = hass.data.get(DATA_HANDOFF, {}).pop(self.hostname, None)
+        if handoff:
+            self.session_id = handoff.get("session_id")
+            self.capabilities = handoff.get("capabilities")
+            self.client = self.client or handoff.get("client")
+        
+        # Client con connessioni keep-alive (HTTP o HTTPS)
+        if self.client is None:
+            self.client = UbusClient(
+                self.hostname,
+                use_https=entry.data.get(CONF_USE_HTTPS, False),
+                verify_ssl=entry.data.get(CONF_VERIFY_SSL, True),
+                fingerprint=entry.data.get(CONF_CERT_FINGERPRINT),
+            )
+        
+        # Registra richieste e risposte in un trace JSONL a rotazione
+        if entry.options.get(CONF_CAPTURE, DEFAULT_CAPTURE):
+            self.client = CaptureTransport(
+                self.client,
+                hass.config.path(CAPTURE_FILENAME.format(hostname=self.hostname)),
+                CAPTURE_MAX_BYTES,
+                CAPTURE_BACKUPS,
+            )
     
     async def _async_update_data(self) -> Dict[str, Any]:
         """Fetch data da OpenWrt."""
+        handshakes = self.client.handshakes
+        spans: Dict[str, float] = {}
+        cycle_start = time.perf_counter()
+        if self._profiler is not None:
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Un altro profiler è già attivo sul thread
+                pass
+        
         try:
             # Ensure session
-            if not self.session_id:
-                self.session_id = await self._get_session()
+            with _span(spans, "session"):
                 if not self.session_id:
-                    raise UpdateFailed("Non posso ottenere session ubus")
+                    self.session_id = await self._get_session()
+                    if not self.session_id:
+                        raise UpdateFailed("Non posso ottenere session ubus")
             
-            # Fetch all data
-            data = {
-                "system_info": await self._get_system_info(),
-                "wireless_info": await self._get_wireless_info(),
-                "connected_devices": await self._get_connected_devices(),
-                "dhcp_leases": await self._get_dhcp_leases(),
-                "services_status": await self._get_services_status(),
-                "wireless_networks": await self._get_wireless_networks(),
-            }
+            # Rileva capacità router (saltato se passate dal config flow)
+            if self.capabilities is None:
+                with _span(spans, "probe"):
+                    self.capabilities = await async_probe_capabilities(
+                        self._ubus_call, self._ubus_list
+                    )
+            
+            # Fetch all data: ogni categoria fallisce in modo indipendente
+            # e mantiene l'ultimo valore valido
+            with _span(spans, "fetch"):
+                data = await self._fetch_categories(await self._get_fetchers())
+                if data is None:
+                    # Tutto negato: sessione scaduta, nuovo login e un solo nuovo tentativo
+                    _LOGGER.debug(f"Sessione scaduta su {self.hostname}, nuovo login")
+                    self.session_id = await self._get_session()
+                    if not self.session_id:
+                        raise UpdateFailed("Non posso ottenere session ubus")
+                    data = await self._fetch_categories(await self._get_fetchers())
+                if data is None:
+                    raise UbusAccessDeniedError("Accesso negato a tutte le categorie")
+                # Host con dati stale: i client cablati non risultano più visti
+                hosts = data.pop("hosts")
+                self._hosts = {} if self.is_stale("hosts") else hosts
+                data["connected_devices"] = self._get_connected_devices(
+                    data["wireless_info"], self._hosts
+                )
+                network_devices = data.pop("network_devices")
+                cpu_stats = data.pop("cpu_stats")
+                radio_surveys = data.pop("radio_stats", None)
+                data.pop("ethers")
+            
+            with _span(spans, "cpu_usage"):
+                # Come per le interfacce: solo con un campione nuovo
+                if self.categories["cpu_stats"].ok:
+                    self._cpu_usage = self._update_cpu_usage(cpu_stats)
+                data["cpu_usage"] = self._cpu_usage
+                self._apply_load_percent(data["system_info"])
+            
+            with _span(spans, "radio_stats"):
+                # Solo nei cicli in cui il survey è stato letto
+                if radio_surveys is not None and self.categories["radio_stats"].ok:
+                    self._radio_stats = self._update_radio_stats(radio_surveys)
+                data["radio_stats"] = self._radio_stats
+            
+            with _span(spans, "interface_stats"):
+                # Solo con contatori nuovi: quelli stale falserebbero i tassi
+                if self.categories["network_devices"].ok:
+                    self._interface_stats = self._update_interface_stats(
+                        network_devices,
+                        data["system_info"].get("uptime")
+                    )
+                data["interface_stats"] = self._interface_stats
             
             # Process device names
-            await self._load_ethers_map()
-            data["processed_devices"] = self._process_device_names(
-                data["connected_devices"], 
-                data["dhcp_leases"]
-            )
+            with _span(spans, "device_names"):
+                data["processed_devices"] = self._process_device_names(
+                    data["connected_devices"], 
+                    data["dhcp_leases"],
+                    self._hosts
+                )
+            
+            with _span(spans, "client_history"):
+                self._record_client_history(data["processed_devices"])
+            
+            with _span(spans, "client_rates"):
+                # Solo con contatori nuovi: quelli stale darebbero tassi nulli
+                if self.categories["wireless_info"].ok:
+                    self._update_client_rates(data["processed_devices"])
+                data["client_throughput"] = self._client_throughput(data["processed_devices"])
+            
+            data["client_summary"] = self._client_summary(data["processed_devices"])
+            
+            # Handshake TLS eseguiti in questo ciclo
+            data["transport"] = self._transport_stats(handshakes)
+            data["scheduler"] = self.scheduler.metrics()
+            data["categories"] = {
+                name: state.as_dict() for name, state in self.categories.items()
+            }
             
             return data
             
         except Exception as e:
             _LOGGER.error(f"Errore aggiornamento dati: {e}")
-            # Resetiamo session in caso di errore
+            # Resetiamo session: nessuna categoria è riuscita
             self.session_id = None
+            # Dopo errori consecutivi le entità non vengono aggiornate:
+            # i client di questo router vanno comunque rilasciati
+            self._async_publish_clients()
             raise UpdateFailed(f"Errore comunicazione OpenWrt: {e}")
+        
+        finally:
+            # Completato in async_update_listeners con il fan-out verso le entità
+            self._pending_cycle = {
+                "timestamp": datetime.now().isoformat(),
+                "phases": spans,
+                "update_ms": round((time.perf_counter() - cycle_start) * 1000, 2),
+            }
+            # Qui e non nel fan-out: dopo un errore i listener non vengono chiamati
+            if self._profiler is not None:
+                self._profiler.disable()
+                self._profile_cycles_left -= 1
+                if self._profile_cycles_left <= 0:
+                    profiler, self._profiler = self._profiler, None
+                    self.hass.async_create_task(self._async_save_profile(profiler))
+    
+    async def _get_fetchers(self) -> Dict[str, Callable[[], Awaitable[Any]]]:
+        """Fetcher per categoria: dallo snapshot del plugin rpcd se disponibile."""
+        fetchers = {
+            "system_info": self._get_system_info,
+            "wireless_info": self._get_wireless_info,
+            "dhcp_leases": self._get_dhcp_leases,
+            "services_status": self._get_services_status,
+            "wireless_networks": self._get_wireless_networks,
+            "network_devices": self._get_network_devices,
+            "ethers": self._load_ethers_map,
+            "cpu_stats": self._get_cpu_stats,
+            "hosts": self._get_hosts,
+        }
+        
+        # Survey radio a cadenza più lunga, fuori dallo snapshot
+        if self._radio_stats_due():
+            fetchers["radio_stats"] = self._get_radio_stats
+        
+        # Lo snapshot contiene i client: priorità presenza
+        with request_priority(PRIORITY_PRESENCE):
+            snapshot = await self._get_snapshot()
+        if snapshot is None:
+            return fetchers
+        
+        fetchers.update({
+            "system_info": partial(self._from_snapshot, snapshot, "system", self._snapshot_system),
+            "dhcp_leases": partial(self._from_snapshot, snapshot, "leases", dict),
+            "services_status": partial(self._from_snapshot, snapshot, "services", self._services_status),
+            "network_devices": partial(self._from_snapshot, snapshot, "devices", dict),
+            "ethers": partial(self._from_snapshot, snapshot, "ethers", self._snapshot_ethers),
+        })
+        # Plugin senza le parti cpu o hosts (versione precedente): chiamate singole
+        if self._snapshot_has(snapshot, "cpu"):
+            fetchers["cpu_stats"] = partial(
+                self._from_snapshot, snapshot, "cpu", self._parse_proc_stat
+            )
+        if self._snapshot_has(snapshot, "hosts"):
+            fetchers["hosts"] = partial(
+                self._from_snapshot, snapshot, "hosts", self._snapshot_hosts
+            )
+        # Il plugin legge i client solo da hostapd
+        if self.wireless_backend == "hostapd":
+            fetchers["wireless_info"] = partial(
+                self._from_snapshot, snapshot, "clients", self._hostapd_interfaces
+            )
+        return fetchers
+    
+    async def _get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Snapshot dal plugin rpcd; None se assente o non utilizzabile."""
+        if not (self.capabilities or {}).get("snapshot"):
+            return None
+        
+        try:
+            snapshot = await self._ubus_call(SNAPSHOT_OBJECT, "snapshot", {
+                "services": self.managed_services,
+                "ethers_hash": self._ethers_hash,
+            })
+        except UbusNotFoundError:
+            _LOGGER.info(f"Plugin {SNAPSHOT_OBJECT} non più presente su {self.hostname}, uso chiamate singole")
+            self.capabilities["snapshot"] = None
+            return None
+        except Exception as e:
+            # Fallback alle chiamate singole solo per questo ciclo
+            _LOGGER.debug(f"Snapshot non disponibile su {self.hostname}: {e}")
+            return None
+        
+        version = (snapshot or {}).get("version")
+        if version != SNAPSHOT_API_VERSION:
+            _LOGGER.warning(
+                f"Plugin {SNAPSHOT_OBJECT} aggiornato alla versione {version} su {self.hostname}, "
+                f"non supportata: uso chiamate singole"
+            )
+            self.capabilities["snapshot"] = None
+            return None
+        
+        return snapshot
+    
+    @staticmethod
+    def _snapshot_has(snapshot: Dict[str, Any], part: str) -> bool:
+        """Ritorna True se il plugin produce la parte (anche se fallita)."""
+        return part in snapshot or part in (snapshot.get("errors") or {})
+    
+    @staticmethod
+    async def _from_snapshot(snapshot: Dict[str, Any], part: str, convert: Callable[[Any], Any]) -> Any:
+        """Estrai una parte dello snapshot; gli errori del plugin restano per categoria."""
+        errors = snapshot.get("errors") or {}
+        if part in errors:
+            raise UbusError(f"Snapshot {part}: {errors[part]}")
+        if part not in snapshot:
+            raise UbusError(f"Snapshot {part} mancante")
+        return convert(snapshot[part])
+    
+    def _snapshot_system(self, system: Dict[str, Any]) -> Dict[str, Any]:
+        """Info sistema dalla parte system dello snapshot."""
+        return self._system_info(system.get("board"), system.get("info"))
+    
+    def _snapshot_hosts(self, hosts: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Indice host dalla parte hosts dello snapshot."""
+        return self._host_index(hosts.get("hints") or {}, hosts.get("arp") or "")
+    
+    def _snapshot_ethers(self, ethers: Dict[str, Any]) -> Dict[str, str]:
+        """Aggiorna /etc/ethers dallo snapshot (contenuto presente solo se cambiato)."""
+        if ethers.get("hash") is None:
+            self._apply_ethers(None)
+        elif "data" in ethers:
+            self._apply_ethers(ethers["data"])
+        self._ethers_hash = ethers.get("hash")
+        return self.ethers_map
+    
+    async def _fetch_category(self, name: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Esegui il fetch di una categoria; in errore ritorna l'ultimo valore valido."""
+        state = self.categories.setdefault(name, CategoryState())
+        priority = PRIORITY_PRESENCE if name in PRESENCE_CATEGORIES else PRIORITY_STATS
+        try:
+            with request_priority(priority):
+                value = await fetch()
+        except Exception as e:
+            if state.failures == 0:
+                _LOGGER.warning(f"Errore {name} su {self.hostname}: {e}")
+            else:
+                _LOGGER.debug(f"Errore {name} su {self.hostname}: {e}")
+            state.record_failure(e)
+            return state.value if state.value is not None else {}
+        
+        if state.failures:
+            _LOGGER.info(f"Categoria {name} su {self.hostname} di nuovo disponibile")
+        state.record_success(value)
+        return value
+    
+    async def _fetch_categories(self, fetchers: Dict[str, Callable[[], Awaitable[Any]]]) -> Optional[Dict[str, Any]]:
+        """Esegui in parallelo il fetch delle categorie.
+        
+        Il ciclo fallisce solo se tutte le categorie falliscono; se tutte
+        hanno accesso negato ritorna None (sessione da rinnovare).
+        """
+        values = await asyncio.gather(
+            *(self._fetch_category(name, fetch) for name, fetch in fetchers.items())
+        )
+        states = [self.categories[name] for name in fetchers]
+        if any(state.ok for state in states):
+            return dict(zip(fetchers, values))
+        
+        if all(isinstance(state.last_error, UbusAccessDeniedError) for state in states):
+            return None
+        errors = {type(state.last_error).__name__ for state in states}
+        raise UbusError(f"Tutte le categorie fallite ({', '.join(sorted(errors))})")
+    
+    def category_age(self, name: str) -> Optional[float]:
+        """Secondi dall'ultimo fetch riuscito di una categoria."""
+        state = self.categories.get(name)
+        return state.age() if state else None
+    
+    def is_stale(self, name: str) -> bool:
+        """Ritorna True se la categoria non è aggiornata da troppo tempo."""
+        age = self.category_age(name)
+        interval = CATEGORY_INTERVALS.get(name, UPDATE_INTERVAL)
+        return age is None or age > CATEGORY_STALE_CYCLES * interval
+    
+    @callback
+    def async_update_listeners(self) -> None:
+        """Aggiorna le entità misurando il fan-out del ciclo."""
+        start = time.perf_counter()
+        self._async_publish_clients()
+        super().async_update_listeners()
+        
+        cycle, self._pending_cycle = self._pending_cycle, None
+        if cycle is None:
+            return
+        
+        cycle["phases"]["entities"] = round((time.perf_counter() - start) * 1000, 2)
+        cycle["total_ms"] = round(cycle["update_ms"] + cycle["phases"]["entities"], 2)
+        self.cycle_timings.append(cycle)
+    
+    @callback
+    def _async_publish_clients(self) -> None:
+        """Pubblica i client di questo router nella tabella condivisa.
+        
+        Solo con dati wireless nuovi; con dati stale il router non vede
+        più nessun client e gli altri AP possono prenderli in carico.
+        """
+        state = self.categories.get("wireless_info")
+        if state is None:
+            return
+        
+        if self.is_stale("wireless_info"):
+            if self._clients_seen_at is not None:
+                self._clients_seen_at = None
+                self.client_table.async_update_entry(
+                    self.entry.entry_id, self.hostname, {}, time.monotonic(), self.publish_client_metrics
+                )
+            return
+        
+        if state.last_success == self._clients_seen_at:
+            return
+        self._clients_seen_at = state.last_success
+        self.client_table.async_update_entry(
+            self.entry.entry_id,
+            self.hostname,
+            (self.data or {}).get("processed_devices", {}),
+            state.last_success,
+            self.publish_client_metrics,
+        )
+    
+    def async_start_profile(self, cycles: int) -> None:
+        """Esegui cProfile sui prossimi cycles cicli di aggiornamento."""
+        if self._profiler is not None:
+            _LOGGER.warning(f"Profiling già in corso su {self.hostname}")
+            return
+        self._profiler = cProfile.Profile()
+        self._profile_cycles_left = cycles
+        _LOGGER.info(f"Profiling dei prossimi {cycles} cicli su {self.hostname}")
+    
+    async def _async_save_profile(self, profiler: cProfile.Profile) -> None:
+        """Salva le statistiche cProfile nella cartella di configurazione."""
+        path = self.hass.config.path(PROFILE_FILENAME.format(
+            hostname=self.hostname,
+            timestamp=datetime.now().strftime("%Y%m%d%H%M%S"),
+        ))
+        await self.hass.async_add_executor_job(profiler.dump_stats, path)
+        _LOGGER.info(f"Statistiche profiling salvate in {path}")
+    
+    async def _ubus_post(self, method: str, params: list) -> Dict[str, Any]:
+        """Invia richiesta JSON-RPC tramite il client persistente."""
+        return await self.scheduler.run(
+            lambda: self.hass.async_add_executor_job(self.client.post, method, params)
+        )
     
     async def _ubus_call(self, object_name: str, method: str, params: dict = None) -> Any:
         """Esegui chiamata ubus."""
@@ -86,158 +641,319 @@ class OpenWrtDataUpdateCoordinator(DataUpdateCoordinator):
             if not self.session_id:
                 raise Exception("Session ubus non disponibile")
         
-        url = f"http://{self.hostname}/ubus"
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "call",
-            "params": [self.session_id, object_name, method, params or {}]
-        }
+        result = await self._ubus_post(
+            "call", [self.session_id, object_name, method, params or {}]
+        )
+        return self._parse_call_result(result, f"{object_name}.{method}")
+    
+    @staticmethod
+    def _parse_call_result(result: Dict[str, Any], target: str) -> Any:
+        """Estrai dati da una risposta call, sollevando errori tipizzati."""
+        error = result.get("error")
+        if error:
+            raise _jsonrpc_error(error, target)
         
-        try:
-            response = await self.hass.async_add_executor_job(
-                lambda: requests.post(url, data=json.dumps(payload), 
-                                     headers={'Content-Type': 'application/json'}, 
-                                     timeout=REQUEST_TIMEOUT)
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("result") and len(result["result"]) > 1:
-                    return result["result"][1]
-                elif result.get("error"):
-                    raise Exception(f"Errore ubus: {result['error']}")
-            else:
-                raise Exception(f"HTTP error: {response.status_code}")
-                
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Errore richiesta: {e}")
+        response = result.get("result") or [UBUS_STATUS_OK]
+        status = response[0]
+        if status in (UBUS_STATUS_NOT_FOUND, UBUS_STATUS_METHOD_NOT_FOUND):
+            raise UbusNotFoundError(f"{target} non trovato")
+        if status == UBUS_STATUS_PERMISSION_DENIED:
+            raise UbusAccessDeniedError(f"Accesso negato a {target}")
+        if status != UBUS_STATUS_OK:
+            raise UbusError(f"Errore ubus {target}: stato {status}")
         
-        return None
+        return response[1] if len(response) > 1 else None
+    
+    async def _ubus_list(self, pattern: str) -> Dict[str, Any]:
+        """Elenca oggetti ubus che corrispondono a pattern."""
+        result = await self._ubus_post("list", [pattern])
+        if result.get("error"):
+            raise _jsonrpc_error(result["error"], f"list {pattern}")
+        return result.get("result") or {}
     
     async def _get_session(self) -> Optional[str]:
         """Ottieni session ID."""
-        url = f"http://{self.hostname}/ubus"
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "call",
-            "params": [
+        try:
+            result = await self._ubus_post("call", [
                 "00000000000000000000000000000000",
                 "session",
                 "login",
                 {"username": self.username, "password": self.password}
-            ]
-        }
-        
-        try:
-            response = await self.hass.async_add_executor_job(
-                lambda: requests.post(url, data=json.dumps(payload), 
-                                     headers={'Content-Type': 'application/json'}, 
-                                     timeout=REQUEST_TIMEOUT)
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("result") and len(result["result"]) > 1:
-                    return result["result"][1].get("ubus_rpc_session")
+            ])
+            if result.get("result") and len(result["result"]) > 1:
+                return result["result"][1].get("ubus_rpc_session")
         except Exception as e:
             _LOGGER.error(f"Errore login: {e}")
         
         return None
     
+    def _transport_stats(self, start: Dict[str, int]) -> Dict[str, Any]:
+        """Statistiche trasporto per il ciclo corrente."""
+        current = self.client.handshakes
+        return {
+            "https": self.client.use_https,
+            "handshakes": current["full"] - start["full"],
+            "resumed_handshakes": current["resumed"] - start["resumed"],
+            "total_handshakes": current["full"] + current["resumed"],
+        }
+    
+    async def async_close(self) -> None:
+        """Chiudi connessioni verso il router."""
+        await self.hass.async_add_executor_job(self.client.close)
+    
     async def _get_system_info(self) -> Dict[str, Any]:
         """Ottieni info sistema."""
-        try:
-            board_info = await self._ubus_call("system", "board") or {}
-            system_info = await self._ubus_call("system", "info") or {}
+        board_info, system_info = await asyncio.gather(
+            self._ubus_call("system", "board"),
+            self._ubus_call("system", "info"),
+        )
+        return self._system_info(board_info, system_info)
+    
+    def _system_info(self, board_info: Optional[Dict], system_info: Optional[Dict]) -> Dict[str, Any]:
+        """Costruisci info sistema da system board e system info."""
+        board_info = board_info or {}
+        system_info = system_info or {}
+        
+        return {
+            "hostname": board_info.get("hostname", "OpenWrt"),
+            "model": board_info.get("model", "Unknown"),
+            "kernel": board_info.get("kernel", "Unknown"),
+            "uptime": system_info.get("uptime", 0),
+            "load": system_info.get("load", [0, 0, 0]),
+            "memory": self._get_memory(system_info.get("memory", {})),
+        }
+    
+    def _apply_load_percent(self, system_info: Dict[str, Any]) -> None:
+        """Load average in percentuale per core, con i core letti da /proc/stat."""
+        # ubus riporta il load average in virgola fissa (x65536)
+        load_info = system_info.get("load") or [0, 0, 0]
+        for load, period in zip(load_info, ("1min", "5min", "15min")):
+            system_info[f"load_{period}"] = self._load_percent(load, self.cpu_cores)
+    
+    @staticmethod
+    def _load_percent(load: int, cpu_cores: int) -> float:
+        """Converti load average in virgola fissa in percentuale per core."""
+        if not load:
+            return 0
+        return round(load / LOAD_SCALE / cpu_cores * 100, 1)
+    
+    async def _get_cpu_stats(self) -> Dict[str, List[int]]:
+        """Leggi i contatori CPU da /proc/stat."""
+        proc_stat = await self._ubus_call("file", "read", {"path": PROC_STAT_PATH}) or {}
+        return self._parse_proc_stat(proc_stat.get("data", ""))
+    
+    @staticmethod
+    def _parse_proc_stat(content: str) -> Dict[str, List[int]]:
+        """Contatori (in jiffies) delle righe cpu e cpuN di /proc/stat."""
+        counters = {}
+        for line in content.split("\n"):
+            if not line.startswith("cpu"):
+                continue
+            fields = line.split()
+            values = [int(value) for value in fields[1:len(CPU_STAT_FIELDS) + 1]]
+            values.extend([0] * (len(CPU_STAT_FIELDS) - len(values)))
+            counters[fields[0]] = values
+        if "cpu" not in counters:
+            raise UbusError(f"{PROC_STAT_PATH} senza righe cpu")
+        return counters
+    
+    def _update_cpu_usage(self, counters: Dict[str, List[int]]) -> Dict[str, Any]:
+        """Utilizzo CPU totale e per core dalla differenza con il campione precedente.
+        
+        busy è la quota di tempo non idle/iowait; softirq è la quota
+        spesa nei softirq, dove finisce il carico di forwarding dei pacchetti.
+        """
+        idle = CPU_STAT_FIELDS.index("idle")
+        iowait = CPU_STAT_FIELDS.index("iowait")
+        usage = {}
+        for name, values in counters.items():
+            previous = self._cpu_samples.get(name)
+            usage[name] = None
+            if previous is None:
+                continue
             
-            # Calcola percentuali CPU load
-            load_info = system_info.get("load", [0, 0, 0])
-            cpu_cores = 1  # Assumiamo 1 core se non specificato
+            deltas = [value - old for value, old in zip(values, previous)]
+            total = sum(deltas)
+            # Contatori diminuiti: reboot del router, si riparte dal nuovo campione
+            if total <= 0 or min(deltas) < 0:
+                continue
             
-            return {
-                "hostname": board_info.get("hostname", "OpenWrt"),
-                "model": board_info.get("model", "Unknown"),
-                "kernel": board_info.get("kernel", "Unknown"),
-                "uptime": system_info.get("uptime", 0),
-                "load_1min": round((load_info[0] / cpu_cores) * 100, 1) if load_info[0] else 0,
-                "load_5min": round((load_info[1] / cpu_cores) * 100, 1) if load_info[1] else 0,
-                "load_15min": round((load_info[2] / cpu_cores) * 100, 1) if load_info[2] else 0,
-                "memory": self._format_memory(system_info.get("memory", {})),
+            shares = {
+                field: round(delta / total * 100, 1)
+                for field, delta in zip(CPU_STAT_FIELDS, deltas)
             }
-        except Exception as e:
-            _LOGGER.error(f"Errore system info: {e}")
-            return {}
+            shares["busy"] = round((total - deltas[idle] - deltas[iowait]) / total * 100, 1)
+            usage[name] = shares
+        
+        # Solo i core presenti (hotplug)
+        self._cpu_samples = counters
+        self.cpu_cores = max(len(counters) - 1, 1)
+        
+        total_usage = usage.pop("cpu")
+        return {"total": total_usage, "cores": usage}
     
-    def _format_memory(self, memory_info: Dict) -> Dict[str, str]:
-        """Format memory info in human readable format."""
+    @staticmethod
+    def _get_memory(memory_info: Dict) -> Dict[str, int]:
+        """Memoria in byte, con dettaglio usata/buffer/cache."""
         if not memory_info:
             return {}
         
-        def format_bytes(bytes_val):
-            if bytes_val > 1024**3:
-                return f"{bytes_val / 1024**3:.1f} GB"
-            elif bytes_val > 1024**2:
-                return f"{bytes_val / 1024**2:.1f} MB"
-            else:
-                return f"{bytes_val / 1024:.1f} KB"
-        
-        return {
-            "total": format_bytes(memory_info.get("total", 0)),
-            "free": format_bytes(memory_info.get("free", 0)),
-            "available": format_bytes(memory_info.get("available", 0)),
+        memory = {
+            key: memory_info.get(key, 0)
+            for key in ("total", "free", "available", "shared", "buffered", "cached")
         }
+        memory["used"] = max(
+            memory["total"] - memory["free"] - memory["buffered"] - memory["cached"], 0
+        )
+        return memory
     
     async def _get_wireless_info(self) -> Dict[str, Any]:
         """Ottieni info wireless."""
-        if self.wireless_backend == "none":
-            return {}
-        
-        try:
-            if self.wireless_backend == "hostapd":
-                return await self._get_hostapd_info()
-            elif self.wireless_backend == "iwinfo":
-                return await self._get_iwinfo()
-        except Exception as e:
-            _LOGGER.error(f"Errore wireless info: {e}")
+        if self.wireless_backend == "hostapd":
+            return await self._get_hostapd_info()
+        elif self.wireless_backend == "iwinfo":
+            return await self._get_iwinfo()
         
         return {}
     
     async def _get_hostapd_info(self) -> Dict[str, Any]:
-        """Ottieni info da hostapd."""
-        try:
-            interfaces = await self._ubus_call("hostapd", "get_clients") or {}
-            wireless_info = {}
-            
-            for iface, data in interfaces.items():
-                clients = data.get("clients", {})
-                wireless_info[iface] = {
-                    "interface": iface,
-                    "clients": clients,
-                    "client_count": len(clients)
-                }
-            
-            return wireless_info
-        except Exception as e:
-            _LOGGER.error(f"Errore hostapd: {e}")
-            return {}
+        """Ottieni info da hostapd: un oggetto hostapd.<ifname> per interfaccia."""
+        objects = list(await self._ubus_list("hostapd.*"))
+        results = await asyncio.gather(
+            *(self._ubus_call(object_name, "get_clients") for object_name in objects),
+            return_exceptions=True,
+        )
+        
+        interfaces = {}
+        for object_name, result in zip(objects, results):
+            if isinstance(result, UbusNotFoundError):
+                # Interfaccia rimossa tra list e call
+                continue
+            if isinstance(result, Exception):
+                raise result
+            interfaces[object_name[len("hostapd."):]] = result or {}
+        return self._hostapd_interfaces(interfaces)
+    
+    @staticmethod
+    def _hostapd_interfaces(interfaces: Dict[str, Any]) -> Dict[str, Any]:
+        """Client per interfaccia nel formato wireless_info."""
+        wireless_info = {}
+        
+        for iface, data in interfaces.items():
+            clients = data.get("clients", {})
+            wireless_info[iface] = {
+                "interface": iface,
+                "clients": clients,
+                "client_count": len(clients)
+            }
+        
+        return wireless_info
     
     async def _get_iwinfo(self) -> Dict[str, Any]:
-        """Ottieni info da iwinfo."""
-        try:
-            # Implementazione iwinfo
-            return {}
-        except Exception as e:
-            _LOGGER.error(f"Errore iwinfo: {e}")
-            return {}
+        """Ottieni info da iwinfo: assoclist di ogni device wireless."""
+        devices = (await self._ubus_call("iwinfo", "devices") or {}).get("devices", [])
+        results = await asyncio.gather(
+            *(self._ubus_call("iwinfo", "assoclist", {"device": device}) for device in devices),
+            return_exceptions=True,
+        )
+        
+        interfaces = {}
+        for device, result in zip(devices, results):
+            if isinstance(result, UbusNotFoundError):
+                # Interfaccia rimossa tra devices e assoclist
+                continue
+            if isinstance(result, Exception):
+                raise result
+            interfaces[device] = {"clients": self._iwinfo_clients((result or {}).get("results", []))}
+        return self._hostapd_interfaces(interfaces)
+    
+    @staticmethod
+    def _iwinfo_clients(stations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Stazioni di assoclist nel formato client di hostapd (rate in kbit/s)."""
+        clients = {}
+        for station in stations:
+            mac = (station.get("mac") or "").lower()
+            if not mac:
+                continue
+            rx = station.get("rx") or {}
+            tx = station.get("tx") or {}
+            clients[mac] = {
+                "signal": station.get("signal"),
+                "rate": {"rx": rx.get("rate"), "tx": tx.get("rate")},
+                "packets": {"rx": rx.get("packets"), "tx": tx.get("packets")},
+                "inactive": station.get("inactive"),
+            }
+        return clients
+    
+    async def _get_hosts(self) -> Dict[str, Dict[str, Any]]:
+        """Host hints luci-rpc e tabella ARP, una sola lettura per ciclo.
+        
+        Gli hint (MAC -> IPv4/IPv6/nome) sono opzionali: senza luci-rpc
+        restano i vicini ARP.
+        """
+        hints, arp = await asyncio.gather(
+            self._ubus_call("luci-rpc", "getHostHints"),
+            self._ubus_call("file", "read", {"path": ARP_TABLE_PATH}),
+            return_exceptions=True,
+        )
+        if isinstance(arp, Exception):
+            raise arp
+        if isinstance(hints, Exception):
+            _LOGGER.debug(f"Host hints non disponibili su {self.hostname}: {hints}")
+            hints = None
+        
+        data = (arp or {}).get("data", "")
+        if len(data.encode()) >= ARP_READ_MAX_BYTES or (data and not data.endswith("\n")):
+            # Lettura troncata: l'ultima riga può essere incompleta
+            data = data[:data.rfind("\n") + 1]
+            log = _LOGGER.debug if self._arp_truncated_logged else _LOGGER.warning
+            self._arp_truncated_logged = True
+            log(
+                f"Tabella ARP di {self.hostname} troncata a {ARP_READ_MAX_BYTES} byte da file read: "
+                f"alcuni client cablati possono mancare (il plugin rpcd {SNAPSHOT_OBJECT} la legge per intero)"
+            )
+        return self._host_index(hints or {}, data)
+    
+    @staticmethod
+    def _host_index(hints: Dict[str, Any], arp: str) -> Dict[str, Dict[str, Any]]:
+        """Indice MAC -> indirizzi, nome e interfaccia del vicino ARP.
+        
+        neighbor è valorizzato solo per le voci ARP complete (MAC risolto).
+        """
+        index = {}
+        for mac, hint in hints.items():
+            index[mac.lower()] = {
+                "ipv4": list(hint.get("ipaddrs") or []),
+                "ipv6": list(hint.get("ip6addrs") or []),
+                "hostname": hint.get("name"),
+                "neighbor": None,
+            }
+        
+        # IP address, HW type, Flags, HW address, Mask, Device (prima riga intestazione)
+        for line in arp.split("\n")[1:]:
+            fields = line.split()
+            if len(fields) < 6:
+                continue
+            ip, _, flags, mac, _, device = fields[:6]
+            mac = mac.lower()
+            try:
+                complete = int(flags, 16) & ARP_FLAG_COMPLETE
+            except ValueError:
+                continue
+            if not complete or mac == "00:00:00:00:00:00":
+                continue
+            host = index.setdefault(mac, {"ipv4": [], "ipv6": [], "hostname": None, "neighbor": None})
+            host["neighbor"] = device
+            if ip not in host["ipv4"]:
+                host["ipv4"].append(ip)
+        
+        return index
     
-    async def _get_connected_devices(self) -> Dict[str, Any]:
+    def _get_connected_devices(self, wireless_info: Dict[str, Any], hosts: Dict[str, Any]) -> Dict[str, Any]:
         """Ottieni dispositivi connessi."""
         devices = {}
         
         # Da wireless
-        wireless_info = await self._get_wireless_info()
         for iface, data in wireless_info.items():
             for mac, client_info in data.get("clients", {}).items():
                 devices[mac] = {
@@ -248,97 +964,285 @@ class OpenWrtDataUpdateCoordinator(DataUpdateCoordinator):
                     **client_info
                 }
         
+        # Da tabella ARP: vicini sui bridge LAN non associati in wireless
+        # a questo router (cablati o client di altri AP)
+        for mac, host in hosts.items():
+            neighbor = host["neighbor"]
+            if mac in devices or not neighbor or not neighbor.startswith(NEIGHBOR_DEVICE_PREFIXES):
+                continue
+            devices[mac] = {
+                "mac": mac,
+                "interface": neighbor,
+                "connected": True,
+                "wireless": False,
+            }
+        
         return devices
     
     async def _get_dhcp_leases(self) -> Dict[str, Any]:
         """Ottieni DHCP leases."""
-        if self.dhcp_backend == "none":
-            return {}
-        
-        try:
-            if self.dhcp_backend == "dnsmasq":
-                return await self._get_dnsmasq_leases()
-            elif self.dhcp_backend == "odhcpd":
-                return await self._get_odhcpd_leases()
-        except Exception as e:
-            _LOGGER.error(f"Errore DHCP leases: {e}")
+        if self.dhcp_backend == "dnsmasq":
+            return await self._get_dnsmasq_leases()
+        elif self.dhcp_backend == "odhcpd":
+            return await self._get_odhcpd_leases()
         
         return {}
     
     async def _get_dnsmasq_leases(self) -> Dict[str, Any]:
-        """Ottieni lease dnsmasq."""
+        """Ottieni lease dnsmasq; file assente = nessun lease ancora assegnato."""
         try:
-            # Leggi file leases dnsmasq
-            leases = await self._ubus_call("file", "read", {"path": "/var/lib/dhcp/dhcpd.leases"})
-            # Parse leases file - implementazione semplificata
-            return {}
-        except Exception:
+            leases = await self._ubus_call("file", "read", {"path": DHCP_LEASES_PATH})
+        except UbusNotFoundError:
             return {}
+        return parse_dnsmasq_leases((leases or {}).get("data", ""))
     
     async def _get_odhcpd_leases(self) -> Dict[str, Any]:
-        """Ottieni lease odhcpd."""
-        try:
-            # Implementazione odhcpd
-            return {}
-        except Exception:
-            return {}
+        """Ottieni lease odhcpd IPv4 e IPv6."""
+        ipv4leases, ipv6leases = await asyncio.gather(
+            self._ubus_call("dhcp", "ipv4leases"),
+            self._ubus_call("dhcp", "ipv6leases"),
+        )
+        return parse_odhcpd_leases(ipv4leases, ipv6leases)
     
     async def _get_services_status(self) -> Dict[str, Any]:
         """Ottieni stato servizi."""
-        try:
-            services = await self._ubus_call("service", "list") or {}
-            status = {}
-            
-            for service_name in self.managed_services:
-                if service_name in services:
-                    service_data = services[service_name]
-                    # Determina se il servizio è running
-                    is_running = bool(service_data.get("instances", {}).get("instance1", {}).get("pid"))
-                    status[service_name] = {
-                        "name": service_name,
-                        "running": is_running,
-                        "data": service_data
-                    }
-            
-            return status
-        except Exception as e:
-            _LOGGER.error(f"Errore services status: {e}")
-            return {}
+        services = await self._ubus_call("service", "list") or {}
+        return self._services_status(services)
+    
+    def _services_status(self, services: Dict[str, Any]) -> Dict[str, Any]:
+        """Stato dei servizi gestiti da output di service list."""
+        status = {}
+        
+        for service_name in self.managed_services:
+            if service_name in services:
+                status[service_name] = self._service_status(service_name, services[service_name])
+        
+        return status
+    
+    @staticmethod
+    def _service_status(service_name: str, service_data: Dict) -> Dict[str, Any]:
+        """Costruisci stato servizio da output di service list."""
+        instances = (service_data or {}).get("instances", {})
+        # Determina se il servizio è running
+        is_running = any(
+            instance.get("running", bool(instance.get("pid")))
+            for instance in instances.values()
+        )
+        return {
+            "name": service_name,
+            "running": is_running,
+            "data": service_data or {},
+        }
+    
+    @staticmethod
+    def _service_pids(status: Dict[str, Any]) -> set:
+        """PID delle istanze di un servizio."""
+        instances = status.get("data", {}).get("instances", {})
+        return {instance["pid"] for instance in instances.values() if instance.get("pid")}
+    
+    async def _get_service_status(self, service_name: str) -> Dict[str, Any]:
+        """Ottieni stato di un solo servizio."""
+        services = await self._ubus_call("service", "list", {"name": service_name}) or {}
+        return self._service_status(service_name, services.get(service_name))
     
     async def _get_wireless_networks(self) -> Dict[str, Any]:
         """Ottieni info reti wireless."""
-        try:
-            # Ottieni info interfacce wireless
-            network_status = await self._ubus_call("network.wireless", "status") or {}
-            networks = {}
+        network_status = await self._ubus_call("network.wireless", "status") or {}
+        return self._wireless_networks(network_status)
+    
+    def _wireless_networks(self, network_status: Dict[str, Any]) -> Dict[str, Any]:
+        """Reti per interfaccia da network.wireless status.
+        
+        interfaces è una lista (ifname assente finché la radio non è su,
+        si usa la sezione UCI); lo stato up è della radio, non della rete.
+        """
+        networks = {}
+        
+        for radio, radio_data in network_status.items():
+            for iface_data in radio_data.get("interfaces") or []:
+                config = iface_data.get("config", {})
+                ifname = iface_data.get("ifname") or iface_data.get("section")
+                if not ifname:
+                    continue
+                
+                networks[ifname] = {
+                    "interface": ifname,
+                    "radio": radio,
+                    "ssid": config.get("ssid", "N/A"),
+                    "mode": config.get("mode", "ap"),
+                    "encryption": self._format_encryption(config.get("encryption", {})),
+                    "channel": radio_data.get("config", {}).get("channel", "auto"),
+                    "txpower": radio_data.get("config", {}).get("txpower", "auto"),
+                    "disabled": config.get("disabled", False),
+                    "up": bool(radio_data.get("up")) and bool(iface_data.get("ifname")),
+                }
+        
+        return networks
+    
+    def _radio_stats_due(self) -> bool:
+        """Ritorna True se è ora di rileggere il survey delle radio."""
+        if self.wireless_backend == "none":
+            return False
+        if self._radio_stats_at is None:
+            return True
+        # Mezzo ciclo di tolleranza per il jitter del polling
+        elapsed = time.monotonic() - self._radio_stats_at
+        return elapsed >= RADIO_STATS_INTERVAL - UPDATE_INTERVAL / 2
+    
+    async def _get_radio_stats(self) -> Dict[str, Any]:
+        """Leggi info e survey iwinfo di ogni radio (un'interfaccia attiva per radio)."""
+        self._radio_stats_at = time.monotonic()
+        
+        networks = self.categories["wireless_networks"].value if "wireless_networks" in self.categories else None
+        if not networks:
+            networks = await self._get_wireless_networks()
+        wireless_info = self.categories["wireless_info"].value if "wireless_info" in self.categories else None
+        radios = self._radio_interfaces(networks, wireless_info)
+        
+        results = await asyncio.gather(*(
+            self._get_radio_survey(ifname) for ifname in radios.values()
+        ))
+        return dict(zip(radios, results))
+    
+    @staticmethod
+    def _radio_interfaces(networks: Dict[str, Any], wireless_info: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Un'interfaccia attiva per radio.
+        
+        Se disponibili si preferiscono le interfacce già viste da hostapd.*
+        o iwinfo devices (wireless_info), che esistono di sicuro.
+        """
+        radios = {}
+        for ifname, network in networks.items():
+            if not network.get("up") or network["radio"] in radios:
+                continue
+            if wireless_info and ifname not in wireless_info:
+                continue
+            radios[network["radio"]] = ifname
+        
+        # Interfacce up non ancora viste dal backend wireless
+        for ifname, network in networks.items():
+            if network.get("up") and network["radio"] not in radios:
+                radios[network["radio"]] = ifname
+        return radios
+    
+    async def _get_radio_survey(self, ifname: str) -> Dict[str, Any]:
+        """Info e survey del canale in uso per un'interfaccia.
+        
+        Senza survey iwinfo (driver o ACL) usa canale e frequenza da
+        hostapd get_status.
+        """
+        info, survey = await asyncio.gather(
+            self._ubus_call("iwinfo", "info", {"device": ifname}),
+            self._ubus_call("iwinfo", "survey", {"device": ifname}),
+            return_exceptions=True,
+        )
+        if isinstance(info, Exception):
+            if self.wireless_backend != "hostapd":
+                raise info
+            info = await self._ubus_call(f"hostapd.{ifname}", "get_status") or {}
+            info = {"channel": info.get("channel"), "frequency": info.get("freq")}
+        info = info or {}
+        
+        # Survey: una voce per frequenza, contatori cumulativi in ms
+        frequency = info.get("frequency")
+        current = None
+        if not isinstance(survey, Exception):
+            for entry in (survey or {}).get("results", []):
+                if entry.get("mhz") == frequency:
+                    current = entry
+                    break
+        
+        return {
+            "interface": ifname,
+            "channel": info.get("channel"),
+            "frequency": frequency,
+            "noise": (current or {}).get("noise", info.get("noise")),
+            "txpower": info.get("txpower"),
+            "survey": [(current or {}).get(field) for field in RADIO_STATS_FIELDS] if current else None,
+        }
+    
+    def _update_radio_stats(self, surveys: Dict[str, Any]) -> Dict[str, Any]:
+        """Canale, rumore e quote di airtime dai delta dei contatori survey."""
+        stats = {}
+        for radio, survey in surveys.items():
+            counters = survey.get("survey")
+            previous = self._radio_samples.get(radio)
+            stats[radio] = {
+                **{key: value for key, value in survey.items() if key != "survey"},
+                "busy": None,
+                "rx_airtime": None,
+                "tx_airtime": None,
+            }
+            if counters is None or None in counters:
+                self._radio_samples.pop(radio, None)
+                continue
+            self._radio_samples[radio] = counters
+            if previous is None:
+                continue
             
-            for radio, radio_data in network_status.items():
-                for iface_name, iface_data in radio_data.get("interfaces", {}).items():
-                    config = iface_data.get("config", {})
-                    ifname = iface_data.get("ifname", iface_name)
-                    
-                    networks[ifname] = {
-                        "interface": ifname,
-                        "radio": radio,
-                        "ssid": config.get("ssid", "N/A"),
-                        "mode": config.get("mode", "ap"),
-                        "encryption": self._format_encryption(config.get("encryption", {})),
-                        "channel": radio_data.get("config", {}).get("channel", "auto"),
-                        "txpower": radio_data.get("config", {}).get("txpower", "auto"),
-                        "disabled": config.get("disabled", False),
-                        "up": iface_data.get("up", False),
-                    }
+            active, busy, rx, tx = (new - old for new, old in zip(counters, previous))
+            # Contatori azzerati (cambio canale, reload driver): nuovo campione di partenza
+            if active <= 0 or min(busy, rx, tx) < 0:
+                continue
+            stats[radio]["busy"] = round(min(busy / active * 100, 100), 1)
+            stats[radio]["rx_airtime"] = round(min(rx / active * 100, 100), 1)
+            stats[radio]["tx_airtime"] = round(min(tx / active * 100, 100), 1)
+        
+        # Rimuovi campioni di radio sparite
+        for radio in set(self._radio_samples) - set(surveys):
+            del self._radio_samples[radio]
+        
+        return stats
+    
+    async def _get_network_devices(self) -> Dict[str, Any]:
+        """Ottieni contatori interfacce da network.device status."""
+        return await self._ubus_call("network.device", "status") or {}
+    
+    def _update_interface_stats(self, devices: Dict[str, Any], uptime: Optional[int]) -> Dict[str, Any]:
+        """Aggiorna i ring buffer dei contatori e calcola i tassi per interfaccia."""
+        # Uptime diminuito: il router è stato riavviato, i contatori ripartono
+        if uptime is not None and self._last_uptime is not None and uptime < self._last_uptime:
+            _LOGGER.debug("Reboot router rilevato, azzero statistiche interfacce")
+            for buffer in self._interface_buffers.values():
+                buffer.clear()
+        if uptime is not None:
+            self._last_uptime = uptime
+        
+        now = time.monotonic()
+        stats = {}
+        for name, device in devices.items():
+            counters = device.get("statistics")
+            if not counters or name == "lo":
+                continue
             
-            return networks
-        except Exception as e:
-            _LOGGER.error(f"Errore wireless networks: {e}")
-            return {}
+            buffer = self._interface_buffers.get(name)
+            if buffer is None:
+                buffer = self._interface_buffers[name] = CounterRingBuffer(
+                    INTERFACE_STATS_FIELDS, INTERFACE_STATS_SAMPLES
+                )
+            buffer.append(now, [counters.get(field, 0) for field in INTERFACE_STATS_FIELDS])
+            
+            stats[name] = {"up": device.get("up", False)}
+            for field in INTERFACE_STATS_FIELDS:
+                stats[name][field] = buffer.rate(field)
+                stats[name][f"{field}_avg"] = buffer.average_rate(field)
+        
+        # Rimuovi buffer di interfacce sparite
+        for name in set(self._interface_buffers) - set(stats):
+            del self._interface_buffers[name]
+        
+        return stats
     
-    def _format_encryption(self, encryption: Dict) -> str:
-        """Formatta info crittografia."""
+    def _format_encryption(self, encryption: Any) -> str:
+        """Formatta info crittografia (opzione UCI o dettaglio iwinfo)."""
         if not encryption:
             return "Open"
         
+        # network.wireless status riporta l'opzione UCI, es. "psk2+ccmp"
+        if isinstance(encryption, str):
+            suite = encryption.split("+")[0]
+            return UCI_ENCRYPTION_NAMES.get(suite, suite.upper())
+        
         enabled = encryption.get("enabled", False)
         if not enabled:
             return "Open"
@@ -355,120 +1259,390 @@ class OpenWrtDataUpdateCoordinator(DataUpdateCoordinator):
         else:
             return "Encrypted"
     
-    async def _load_ethers_map(self):
+    async def _load_ethers_map(self) -> Dict[str, str]:
         """Carica mappatura MAC->nome da /etc/ethers."""
         try:
             ethers_content = await self._ubus_call("file", "read", {"path": "/etc/ethers"})
-            if ethers_content and ethers_content.get("data"):
-                content = ethers_content["data"]
-                for line in content.split('\n'):
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            mac = parts[0].lower()
-                            name = ' '.join(parts[1:])
-                            self.ethers_map[mac] = name
-        except Exception as e:
-            _LOGGER.debug(f"Non posso leggere /etc/ethers: {e}")
+        except UbusNotFoundError:
+            # /etc/ethers non presente: nessun nome configurato
+            ethers_content = None
+        self._apply_ethers((ethers_content or {}).get("data"))
+        
+        return self.ethers_map
     
-    def _process_device_names(self, devices: Dict, dhcp_leases: Dict) -> Dict[str, Any]:
-        """Processa nomi dispositivi con priorità ethers -> DHCP -> MAC."""
+    def _apply_ethers(self, content: Optional[str]) -> None:
+        """Ricostruisci la mappatura MAC->nome se /etc/ethers è cambiato.
+        
+        La mappa è ricostruita da zero: le voci rimosse dal file spariscono.
+        """
+        content = content or None
+        if content == self._ethers_content:
+            return
+        self._ethers_content = content
+        self._ethers_version += 1
+        ethers_map = {}
+        for line in (content or "").split('\n'):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                parts = line.split()
+                if len(parts) >= 2:
+                    mac = parts[0].lower()
+                    name = ' '.join(parts[1:])
+                    ethers_map[mac] = name
+        self.ethers_map = ethers_map
+    
+    def _process_device_names(self, devices: Dict, dhcp_leases: Dict, hosts: Dict) -> Dict[str, Any]:
+        """Processa nomi dispositivi con priorità ethers -> DHCP -> host hints -> MAC.
+        
+        I nomi risolti sono in cache LRU e ricalcolati solo se cambiano
+        interfaccia, /etc/ethers o hostname del lease (o dell'hint).
+        """
         processed = {}
+        cache = self._name_cache
         
         for mac, device_info in devices.items():
-            mac_lower = mac.lower()
-            
-            # Priorità nomi: ethers -> DHCP hostname -> MAC
-            display_name = mac
-            if mac_lower in self.ethers_map:
-                display_name = self.ethers_map[mac_lower]
-            elif mac in dhcp_leases and dhcp_leases[mac].get("hostname"):
-                display_name = dhcp_leases[mac]["hostname"]
-            
-            # Aggiungi interfaccia al nome se disponibile
             interface = device_info.get("interface", "unknown")
-            full_name = f"{display_name} ({interface})"
+            host = hosts.get(mac) or {}
+            lease = dhcp_leases.get(mac) or {}
+            hostname = lease.get("hostname") or host.get("hostname")
+            key = (mac, interface, self._ethers_version, hostname)
             
+            names = cache.get(key)
+            if names is None:
+                names = cache[key] = self._resolve_names(mac, interface, hostname)
+                if len(cache) > NAME_CACHE_SIZE:
+                    cache.popitem(last=False)
+            else:
+                cache.move_to_end(key)
+            
+            display_name, full_name, entity_id = names
             processed[mac] = {
                 **device_info,
+                "ipv4": host.get("ipv4", []),
+                "ipv6": list(dict.fromkeys(host.get("ipv6", []) + lease.get("ipv6", []))),
                 "display_name": display_name,
                 "full_display_name": full_name,
-                "entity_id": f"{DOMAIN}.{self._slugify(full_name)}",
+                "entity_id": entity_id,
             }
         
         return processed
     
+    def _resolve_names(self, mac: str, interface: str, hostname: Optional[str]) -> tuple:
+        """Calcola nome, nome completo ed entity ID di un dispositivo."""
+        # Priorità nomi: ethers -> hostname (lease DHCP o host hint) -> MAC
+        display_name = mac
+        if mac.lower() in self.ethers_map:
+            display_name = self.ethers_map[mac.lower()]
+        elif hostname:
+            display_name = hostname
+        
+        # Aggiungi interfaccia al nome se disponibile
+        full_name = f"{display_name} ({interface})"
+        return display_name, full_name, f"{DOMAIN}.{self._slugify(full_name)}"
+    
+    @staticmethod
+    def client_metrics(device: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        """Estrai segnale e rate rx/tx di un client (hostapd o iwinfo)."""
+        rate = device.get("rate") if isinstance(device.get("rate"), dict) else {}
+        values = {
+            "signal": device.get("signal"),
+            "rx_rate": device.get("rx_rate", rate.get("rx")),
+            "tx_rate": device.get("tx_rate", rate.get("tx")),
+        }
+        return {
+            key: value if isinstance(value, (int, float)) else None
+            for key, value in values.items()
+        }
+    
+    def gate_client_metric(self, metric: str, published: Optional[float], value: Optional[float]) -> Optional[float]:
+        """Applica isteresi a una metrica client: ritorna il valore da pubblicare.
+        
+        Il segnale cambia solo oltre signal_hysteresis dBm, i rate solo oltre
+        rate_hysteresis % rispetto all'ultimo valore pubblicato.
+        """
+        if value is None or published is None:
+            return value
+        
+        if metric == "signal":
+            return value if abs(value - published) >= self.signal_hysteresis else published
+        
+        if published == 0:
+            return value
+        changed = abs(value - published) / abs(published) * 100 >= self.rate_hysteresis
+        return value if changed else published
+    
+    def publish_client_metrics(self, published: Dict[str, Optional[float]], device: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        """Metriche wireless da pubblicare per un client, con isteresi."""
+        if not device.get("wireless"):
+            return {}
+        return {
+            metric: self.gate_client_metric(metric, published.get(metric), value)
+            for metric, value in self.client_metrics(device).items()
+        }
+    
+    def _record_client_history(self, devices: Dict[str, Any]) -> None:
+        """Aggiungi un campione allo storico di ogni client wireless."""
+        now = time.monotonic()
+        for mac, device in devices.items():
+            if device.get("wireless"):
+                metrics = self.client_metrics(device)
+                self.client_history.buffer(mac.lower()).append(
+                    now, [metrics[field] for field in CLIENT_HISTORY_FIELDS]
+                )
+    
+    def get_client_history(self, mac: str = None) -> Dict[str, Any]:
+        """Min/avg/max e trend di segnale e rate per uno o tutti i client."""
+        macs = [mac.lower()] if mac else self.client_history.keys()
+        history = {}
+        for client_mac in macs:
+            buffer = self.client_history.get(client_mac)
+            if buffer is None:
+                continue
+            history[client_mac] = {
+                field: buffer.stats(field) for field in CLIENT_HISTORY_FIELDS
+            }
+        return history
+    
+    @staticmethod
+    def _client_counters(device: Dict[str, Any]) -> List[Optional[float]]:
+        """Contatori cumulativi di un client hostapd (None se assenti)."""
+        values = []
+        for group, direction in CLIENT_COUNTER_FIELDS.values():
+            counters = device.get(group)
+            value = counters.get(direction) if isinstance(counters, dict) else None
+            values.append(value if isinstance(value, (int, float)) else None)
+        return values
+    
+    def _update_client_rates(self, devices: Dict[str, Any]) -> None:
+        """Nuovo campione dei contatori di tutti i client wireless."""
+        self.client_rates.update(time.monotonic(), {
+            mac: self._client_counters(device)
+            for mac, device in devices.items()
+            if device.get("wireless")
+        })
+    
+    @staticmethod
+    def _format_client_rates(rates: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+        """Arrotonda i tassi; l'airtime (µs al secondo) diventa percentuale."""
+        formatted = {}
+        for field, value in rates.items():
+            if value is None:
+                formatted[field] = None
+            elif field.endswith("_airtime"):
+                formatted[field] = round(value / 10000, 2)
+            else:
+                formatted[field] = round(value, 1)
+        return formatted
+    
+    def _client_throughput(self, devices: Dict[str, Any]) -> Dict[str, Any]:
+        """Traffico totale dei client e i TOP_TALKERS_COUNT più attivi."""
+        fields = ["rx_bytes", "tx_bytes"]
+        totals = self.client_rates.totals(fields)
+        top_talkers = []
+        for mac, total in self.client_rates.top(TOP_TALKERS_COUNT, fields):
+            rates = self._format_client_rates(self.client_rates.rates(mac))
+            top_talkers.append({
+                "mac": mac,
+                "name": devices.get(mac, {}).get("display_name", mac),
+                "rx_bytes": rates["rx_bytes"],
+                "tx_bytes": rates["tx_bytes"],
+                "total": round(total, 1),
+            })
+        return {
+            "rx_bytes": round(totals["rx_bytes"], 1),
+            "tx_bytes": round(totals["tx_bytes"], 1),
+            "clients": len(self.client_rates),
+            "top_talkers": top_talkers,
+        }
+    
+    def get_client_rates(self, mac: str = None) -> Dict[str, Any]:
+        """Byte e pacchetti al secondo e airtime (%) per uno o tutti i client."""
+        macs = [mac.lower()] if mac else self.client_rates.macs()
+        rates = {}
+        for client_mac in macs:
+            client_rates = self.client_rates.rates(client_mac)
+            if client_rates is not None:
+                rates[client_mac] = self._format_client_rates(client_rates)
+        return rates
+    
+    def tracks_client(self, mac: str) -> bool:
+        """Ritorna True se il client ha entità proprie (tracker, kick, sensori)."""
+        return self.client_mode == CLIENT_MODE_ALL or mac.lower() in self.client_allowlist
+    
+    def _client_summary(self, devices: Dict[str, Any]) -> Dict[str, Any]:
+        """Conteggi aggregati dei client connessi, anche di quelli senza entità."""
+        summary = {
+            "total": len(devices),
+            "wireless": 0,
+            "wired": 0,
+            "tracked": 0,
+            "untracked": 0,
+            "interfaces": {},
+        }
+        for mac, device in devices.items():
+            summary["wireless" if device.get("wireless") else "wired"] += 1
+            summary["tracked" if self.tracks_client(mac) else "untracked"] += 1
+            interface = device.get("interface", "unknown")
+            summary["interfaces"][interface] = summary["interfaces"].get(interface, 0) + 1
+        return summary
+    
     def _slugify(self, text: str) -> str:
         """Convert text to valid entity ID."""
-        # Rimuovi caratteri speciali e sostituisci con underscore
-        text = re.sub(r'[^a-zA-Z0-9_]', '_', text.lower())
-        # Rimuovi underscore multipli
-        text = re.sub(r'_+', '_', text)
+        # Sostituisci caratteri speciali e underscore multipli con un underscore
+        text = _SLUG_INVALID.sub('_', text.lower())
         # Rimuovi underscore iniziali/finali
         return text.strip('_')
     
+    def _client_interfaces(self) -> Dict[str, List[str]]:
+        """Indice MAC -> interfacce su cui il client risulta associato."""
+        index: Dict[str, List[str]] = {}
+        wireless_info = (self.data or {}).get("wireless_info", {})
+        for iface, data in wireless_info.items():
+            for mac in data.get("clients", {}):
+                index.setdefault(mac.lower(), []).append(iface)
+        return index
+    
+    async def _del_client(self, mac: str, interface: str) -> None:
+        """Invia del_client all'oggetto hostapd dell'interfaccia."""
+        await self._ubus_call(f"hostapd.{interface}", "del_client", {
+            "addr": mac,
+            "deauth": True,
+            "reason": 5,  # BSS terminating
+            "ban_time": KICK_BAN_DURATION * 1000  # ms
+        })
+    
     async def kick_device(self, mac: str, interface: str = None) -> bool:
         """Disconnetti dispositivo."""
-        try:
-            if self.wireless_backend == "hostapd":
-                # Se interface specificata, disconnetti solo da quella
-                if interface:
-                    result = await self._ubus_call("hostapd", "del_client", {
-                        "addr": mac,
-                        "interface": interface,
-                        "deauth": True,
-                        "reason": 5,  # BSS terminating
-                        "ban_time": KICK_BAN_DURATION * 1000  # ms
-                    })
-                else:
-                    # Disconnetti da tutte le interfacce
-                    wireless_info = self.data.get("wireless_info", {})
-                    for iface in wireless_info.keys():
-                        await self._ubus_call("hostapd", "del_client", {
-                            "addr": mac,
-                            "interface": iface, 
-                            "deauth": True,
-                            "reason": 5,
-                            "ban_time": KICK_BAN_DURATION * 1000
-                        })
-                
-                # Traccia dispositivo kickato
-                self.kicked_devices[mac] = datetime.now()
-                
-                # Forza aggiornamento dopo kick
-                await self.async_request_refresh()
-                
-                return True
-                
-        except Exception as e:
-            _LOGGER.error(f"Errore kick dispositivo {mac}: {e}")
+        results = await self.kick_devices([mac], interface)
+        return results.get(mac, False)
+    
+    @user_request
+    async def kick_devices(self, macs: List[str], interface: str = None) -> Dict[str, bool]:
+        """Disconnetti più dispositivi in parallelo.
+        
+        del_client viene inviato solo alle interfacce a cui ogni MAC è
+        associato (o a quella indicata), poi si aggiornano solo i client
+        wireless invece di eseguire un ciclo completo.
+        """
+        results = {mac: False for mac in macs}
+        if self.wireless_backend != "hostapd":
+            # Con più router il kick per MAC arriva a tutti: niente errore per quelli senza hostapd
+            _LOGGER.debug(f"Kick non supportato con backend {self.wireless_backend} su {self.hostname}")
+            return results
+        
+        index = self._client_interfaces()
+        targets = []
+        for mac in macs:
+            interfaces = [interface] if interface else index.get(mac.lower(), [])
+            if not interfaces:
+                _LOGGER.debug(f"Dispositivo {mac} non associato, niente da disconnettere")
+            targets.extend((mac, iface) for iface in interfaces)
+        
+        if not targets:
+            return results
         
-        return False
+        outcomes = await asyncio.gather(
+            *(self._del_client(mac, iface) for mac, iface in targets),
+            return_exceptions=True,
+        )
+        
+        for (mac, iface), outcome in zip(targets, outcomes):
+            if isinstance(outcome, Exception):
+                _LOGGER.error(f"Errore kick dispositivo {mac} su {iface}: {outcome}")
+                continue
+            results[mac] = True
+            # Kicked fino alla scadenza del ban
+            self.client_table.async_kick(mac.lower())
+        
+        if any(results.values()):
+            await self.async_refresh_wireless_clients()
+        
+        return results
+    
+    async def async_refresh_wireless_clients(self) -> None:
+        """Aggiorna solo lo stato dei client wireless."""
+        if not self.data:
+            await self.async_request_refresh()
+            return
+        
+        wireless_info = await self._fetch_category("wireless_info", self._get_wireless_info)
+        data = dict(self.data)
+        data["wireless_info"] = wireless_info
+        data["connected_devices"] = self._get_connected_devices(wireless_info, self._hosts)
+        data["processed_devices"] = self._process_device_names(
+            data["connected_devices"],
+            data.get("dhcp_leases", {}),
+            self._hosts
+        )
+        data["client_summary"] = self._client_summary(data["processed_devices"])
+        data["categories"] = {
+            name: state.as_dict() for name, state in self.categories.items()
+        }
+        self.async_set_updated_data(data)
     
+    async def _confirm_service_state(self, service_name: str, action: str, previous_pids: set) -> tuple:
+        """Interroga il solo servizio con backoff fino allo stato atteso o al timeout."""
+        expected_running = action != "stop"
+        timeout = SERVICE_CONFIRM_TIMEOUTS.get(service_name, SERVICE_CONFIRM_TIMEOUT)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = SERVICE_CONFIRM_BACKOFF_MIN
+        status = None
+        
+        while True:
+            await asyncio.sleep(min(delay, max(deadline - loop.time(), 0)))
+            try:
+                status = await self._get_service_status(service_name)
+            except Exception as e:
+                _LOGGER.debug(f"Errore lettura stato {service_name}: {e}")
+            else:
+                confirmed = status["running"] == expected_running
+                if confirmed and action == "restart" and previous_pids:
+                    # Dopo un restart il PID deve essere cambiato
+                    confirmed = self._service_pids(status) != previous_pids
+                if confirmed:
+                    return True, status
+            
+            if loop.time() >= deadline:
+                return False, status
+            delay = min(delay * 2, SERVICE_CONFIRM_BACKOFF_MAX)
+    
+    @user_request
     async def control_service(self, service_name: str, action: str) -> bool:
-        """Controlla servizio (start/stop/restart)."""
+        """Controlla servizio (start/stop/restart) e attendi conferma dello stato."""
         if service_name not in self.managed_services:
             _LOGGER.error(f"Servizio {service_name} non gestito")
             return False
         
+        if action not in SERVICE_ACTIONS:
+            _LOGGER.error(f"Azione {action} non supportata")
+            return False
+        
+        services_status = (self.data or {}).get("services_status", {})
+        previous_pids = self._service_pids(services_status.get(service_name, {}))
+        
         try:
-            if action == "restart":
-                await self._ubus_call("service", "restart", {"name": service_name})
-            elif action == "start": 
-                await self._ubus_call("service", "start", {"name": service_name})
-            elif action == "stop":
-                await self._ubus_call("service", "stop", {"name": service_name})
-            else:
-                _LOGGER.error(f"Azione {action} non supportata")
-                return False
-            
-            # Forza aggiornamento dopo controllo servizio
-            await asyncio.sleep(2)  # Aspetta che il servizio si avvii/fermi
-            await self.async_request_refresh()
-            
-            return True
-            
+            await self._ubus_call("service", action, {"name": service_name})
         except Exception as e:
             _LOGGER.error(f"Errore controllo servizio {service_name} {action}: {e}")
-            return False
\ No newline at end of file
+            return False
+        
+        confirmed, status = await self._confirm_service_state(service_name, action, previous_pids)
+        if not confirmed:
+            _LOGGER.warning(f"Servizio {service_name} non confermato dopo {action}")
+        
+        if status is not None and self.data is not None:
+            # Aggiorna solo lo switch del servizio, senza refresh completo
+            self.data["services_status"] = {**services_status, service_name: status}
+            async_dispatcher_send(
+                self.hass, f"{SIGNAL_SERVICE_UPDATED}_{self.entry.entry_id}_{service_name}"
+            )
+        
+        return confirmed
+    
+    async def control_services(self, service_names: List[str], action: str) -> Dict[str, bool]:
+        """Controlla più servizi in parallelo."""
+        results = await asyncio.gather(
+            *(self.control_service(name, action) for name in service_names)
+        )
+        return dict(zip(service_names, results))
@@ -1,15 +1,16 @@
 """Device tracker per OpenWrt Ubus."""
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 from homeassistant.components.device_tracker import SourceType
 from homeassistant.components.device_tracker.config_entry import ScannerEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .clients import MergedClient
+from .const import DOMAIN, SIGNAL_CLIENT_UPDATED
 from .coordinator import OpenWrtDataUpdateCoordinator
 
 _LOGGER = logging.getLogger(__name__)
@@ -21,38 +22,71 @@ async def async_setup_entry(
 ) -> None:
     """Setup device tracker entities."""
     coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    table = coordinator.client_table
     
-    entities = []
+    # Un solo tracker per MAC su tutti i router: la tabella client chiede
+    # a questo router di creare i tracker dei client che vede per primo
+    @callback
+    def async_add_trackers(macs: List[str]) -> None:
+        async_add_entities(
+            OpenWrtDeviceTracker(coordinator, table.clients[mac]) for mac in macs
+        )
     
-    # Crea device tracker per ogni dispositivo connesso
-    if coordinator.data and "processed_devices" in coordinator.data:
-        for mac, device_info in coordinator.data["processed_devices"].items():
-            entities.append(OpenWrtDeviceTracker(coordinator, mac, device_info))
-    
-    async_add_entities(entities)
+    config_entry.async_on_unload(
+        table.async_register_platform(
+            config_entry.entry_id, async_add_trackers, coordinator.tracks_client
+        )
+    )
 
-class OpenWrtDeviceTracker(CoordinatorEntity, ScannerEntity):
-    """Device tracker per dispositivi OpenWrt."""
+class OpenWrtDeviceTracker(ScannerEntity):
+    """Device tracker per dispositivi OpenWrt, unico su tutti i router."""
+    
+    _attr_should_poll = False
+    
+    # Attributi volatili: non salvati nel recorder
+    _unrecorded_attributes = frozenset({"signal_strength", "rx_rate", "tx_rate"})
     
-    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, mac: str, device_info: Dict[str, Any]):
+    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, client: MergedClient):
         """Initialize device tracker."""
-        super().__init__(coordinator)
-        self._mac = mac
-        self._device_info = device_info
+        self.coordinator = coordinator
+        self._client = client
+        self._mac = client.mac
+        device_info = client.device
         
         # Entity info
-        self._attr_unique_id = f"{DOMAIN}_{mac}"
-        self._attr_name = device_info["full_display_name"]
+        self._attr_unique_id = f"{DOMAIN}_{client.mac}"
+        self._attr_name = device_info.get("display_name", client.mac)
         
         # Device info
         self._attr_device_info = {
-            "identifiers": {(DOMAIN, f"device_{mac}")},
-            "name": device_info["display_name"],
+            "identifiers": {(DOMAIN, f"device_{client.mac}")},
+            "name": device_info.get("display_name", client.mac),
             "manufacturer": "Unknown",
             "model": "Network Device",
             "via_device": (DOMAIN, coordinator.hostname),
         }
     
+    async def async_added_to_hass(self) -> None:
+        """Ricevi aggiornamenti solo per questo MAC."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                f"{SIGNAL_CLIENT_UPDATED}_{self._mac}",
+                self._handle_client_update,
+            )
+        )
+    
+    @callback
+    def _handle_client_update(self) -> None:
+        """Handle updated data from the client table."""
+        # Client dimenticato (away da troppo tempo): rimuovi l'entità,
+        # verrà ricreata se il MAC riappare
+        if self.coordinator.client_table.clients.get(self._mac) is not self._client:
+            self.hass.async_create_task(self.async_remove(force_remove=True))
+            return
+        self.async_write_ha_state()
+    
     @property
     def source_type(self) -> SourceType:
         """Return source type."""
@@ -61,34 +95,45 @@ class OpenWrtDeviceTracker(CoordinatorEntity, ScannerEntity):
     @property
     def is_connected(self) -> bool:
         """Return connection status."""
-        if not self.coordinator.data or "processed_devices" not in self.coordinator.data:
-            return False
-        
-        device = self.coordinator.data["processed_devices"].get(self._mac)
-        return device.get("connected", False) if device else False
+        return self._client.connected
+    
+    @property
+    def ip_address(self) -> Optional[str]:
+        """Primo indirizzo IPv4 noto (host hints o tabella ARP)."""
+        addresses = self._client.device.get("ipv4")
+        return addresses[0] if addresses else None
+    
+    @property
+    def mac_address(self) -> str:
+        """Return MAC address."""
+        return self._mac
     
     @property
     def extra_state_attributes(self) -> Dict[str, Any]:
         """Return extra attributes."""
-        if not self.coordinator.data or "processed_devices" not in self.coordinator.data:
-            return {}
-        
-        device = self.coordinator.data["processed_devices"].get(self._mac, {})
+        device = self._client.device
         
         attrs = {
             "mac_address": self._mac,
+            "presence": self._client.presence,
+            "current_ap": self._client.current_ap,
+            "access_points": list(self._client.access_points),
+            "roam_count": self._client.roam_count,
             "interface": device.get("interface"),
             "display_name": device.get("display_name"),
             "wireless": device.get("wireless", False),
+            "ipv6": device.get("ipv6", []),
         }
         
-        # Aggiungi info wireless se disponibili
-        if device.get("wireless"):
-            if "signal" in device:
-                attrs["signal_strength"] = device["signal"]
-            if "rx_rate" in device:
-                attrs["rx_rate"] = device["rx_rate"]
-            if "tx_rate" in device:
-                attrs["tx_rate"] = device["tx_rate"]
+        # Aggiungi info wireless se disponibili (spostate nei sensori dedicati
+        # se abilitati nelle opzioni); isteresi applicata dalla tabella client
+        published = self._client.published
+        if device.get("wireless") and not self.coordinator.client_sensors:
+            if published.get("signal") is not None:
+                attrs["signal_strength"] = published["signal"]
+            if published.get("rx_rate") is not None:
+                attrs["rx_rate"] = published["rx_rate"]
+            if published.get("tx_rate") is not None:
+                attrs["tx_rate"] = published["tx_rate"]
         
         return attrs
\ No newline at end of file
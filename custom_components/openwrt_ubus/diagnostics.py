@@ -0,0 +1,30 @@
+"""Diagnostics per OpenWrt Ubus."""
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return diagnostics per config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    data = coordinator.data or {}
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "system_info": data.get("system_info", {}),
+        "client_history": coordinator.get_client_history(),
+        "cycle_timings": list(coordinator.cycle_timings),
+        "scheduler": coordinator.scheduler.metrics(reset=False),
+        "categories": {
+            name: state.as_dict() for name, state in coordinator.categories.items()
+        },
+    }
@@ -0,0 +1,77 @@
+"""Entità base per OpenWrt Ubus."""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN, SIGNAL_CLIENTS_SEEN
+
+
+class OpenWrtEntity(CoordinatorEntity):
+    """Entità base: la disponibilità segue la categoria di dati usata.
+
+    Un errore su una sola categoria (es. ACL negata su service list) rende
+    non disponibili solo le entità che ne dipendono, e solo quando
+    l'ultimo valore valido è troppo vecchio.
+    """
+
+    _category: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        if not super().available:
+            return False
+        return self._category is None or not self.coordinator.is_stale(self._category)
+
+
+@callback
+def async_setup_client_entities(
+    hass: HomeAssistant,
+    coordinator: Any,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+    platform: str,
+    build: Callable[[str, Dict[str, Any]], List[Entity]],
+) -> None:
+    """Crea le entità per client ora e per ogni client che si collega dopo.
+
+    Solo client wireless ammessi da coordinator.tracks_client. Un'entità con
+    lo stesso unique_id già registrata da un altro router non viene creata.
+    """
+    registry = er.async_get(hass)
+    known: Set[str] = set()
+
+    @callback
+    def async_add_clients(macs: Iterable[str]) -> None:
+        devices = (coordinator.data or {}).get("processed_devices", {})
+        entities = []
+        for mac in macs:
+            device_info = devices.get(mac)
+            if (
+                mac in known
+                or not device_info
+                or not device_info.get("wireless")
+                or not coordinator.tracks_client(mac)
+            ):
+                continue
+            known.add(mac)
+            for entity in build(mac, device_info):
+                entity_id = registry.async_get_entity_id(platform, DOMAIN, entity.unique_id)
+                registered = registry.async_get(entity_id) if entity_id else None
+                if registered is None or registered.config_entry_id == config_entry.entry_id:
+                    entities.append(entity)
+        if entities:
+            async_add_entities(entities)
+
+    async_add_clients(list((coordinator.data or {}).get("processed_devices", {})))
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, f"{SIGNAL_CLIENTS_SEEN}_{config_entry.entry_id}", async_add_clients
+        )
+    )
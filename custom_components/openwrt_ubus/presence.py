@@ -0,0 +1,167 @@
+"""Stato di presenza dei client con scadenze e memoria limitata."""
+from collections import OrderedDict
+from typing import Any, List, Optional, Set, Tuple
+
+from .const import PRESENCE_CONNECTED, PRESENCE_GRACE, PRESENCE_AWAY, PRESENCE_KICKED
+
+
+class TTLStore:
+    """Mappa chiave -> valore con TTL uniforme e numero massimo di chiavi.
+
+    Il TTL è uguale per tutte le chiavi, quindi l'ordine di inserimento
+    coincide con l'ordine di scadenza: la pulizia tocca solo le chiavi
+    scadute e, oltre max_keys, si scarta la più vecchia (ritornata da set).
+    """
+
+    __slots__ = ("ttl", "max_keys", "_items")
+
+    def __init__(self, ttl: float, max_keys: int):
+        """Initialize store."""
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        """Numero di chiavi (anche scadute non ancora rimosse)."""
+        return len(self._items)
+
+    def __contains__(self, key: str) -> bool:
+        """Return if key is stored."""
+        return key in self._items
+
+    def set(self, key: str, now: float, value: Any = None) -> Optional[str]:
+        """Inserisci o rinnova una chiave con scadenza now + ttl.
+
+        Ritorna la chiave scartata per far posto oltre max_keys.
+        """
+        self._items.pop(key, None)
+        self._items[key] = (now + self.ttl, value)
+        if len(self._items) > self.max_keys:
+            return self._items.popitem(last=False)[0]
+        return None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Valore della chiave."""
+        item = self._items.get(key)
+        return item[1] if item else default
+
+    def expires(self, key: str) -> Optional[float]:
+        """Scadenza della chiave (time.monotonic())."""
+        item = self._items.get(key)
+        return item[0] if item else None
+
+    def pop(self, key: str) -> bool:
+        """Rimuovi una chiave; ritorna True se era presente."""
+        return self._items.pop(key, None) is not None
+
+    def prune(self, now: float) -> List[str]:
+        """Rimuovi e ritorna le chiavi scadute."""
+        expired = []
+        while self._items:
+            key, (expires, _) = next(iter(self._items.items()))
+            if expires > now:
+                break
+            del self._items[key]
+            expired.append(key)
+        return expired
+
+
+class PresenceMachine:
+    """Presenza per MAC: connected -> grace -> away, più kicked.
+
+    Un client non più visto resta in grace per il periodo di tolleranza,
+    così un singolo poll mancato non genera un falso "away". Un client
+    disconnesso con kick resta kicked fino alla scadenza del ban, o finché
+    non viene rivisto dopo settle secondi dal kick (prima gli AP possono
+    ancora elencarlo). I client away vengono dimenticati dopo away_ttl.
+
+    Oltre max_keys il MAC più vecchio in grace o kicked passa subito ad
+    away e quello più vecchio in away viene dimenticato: entrambi sono
+    riportati dal prune successivo.
+    """
+
+    def __init__(self, grace: float, ban: float, away_ttl: float, max_keys: int, settle: float = 0.0):
+        """Initialize presence machine."""
+        self.settle = settle
+        self._connected: Set[str] = set()
+        self._grace = TTLStore(grace, max_keys)
+        self._kicked = TTLStore(ban, max_keys)
+        self._away = TTLStore(away_ttl, max_keys)
+        self._evicted_changed: List[str] = []  # scartati da grace/kicked, ora away
+        self._evicted_forgotten: List[str] = []  # scartati da away
+
+    def state(self, mac: str) -> str:
+        """Stato di presenza di un MAC."""
+        if mac in self._connected:
+            return PRESENCE_CONNECTED
+        if mac in self._kicked:
+            return PRESENCE_KICKED
+        if mac in self._grace:
+            return PRESENCE_GRACE
+        return PRESENCE_AWAY
+
+    def seen(self, mac: str, seen_at: float) -> bool:
+        """Client visto da almeno un AP all'istante seen_at; ritorna True se lo stato cambia.
+
+        Gli avvistamenti entro settle secondi dal kick sono ignorati.
+        """
+        if mac in self._connected:
+            return False
+        kicked_at = self._kicked.get(mac)
+        if kicked_at is not None and seen_at < kicked_at + self.settle:
+            return False
+        self._grace.pop(mac)
+        self._kicked.pop(mac)
+        self._away.pop(mac)
+        self._connected.add(mac)
+        return True
+
+    def lost(self, mac: str, now: float) -> bool:
+        """Client non più visto da nessun AP: inizia il periodo di grace."""
+        if mac not in self._connected:
+            return False
+        self._connected.discard(mac)
+        self._evicted(self._grace.set(mac, now), now)
+        return True
+
+    def kick(self, mac: str, now: float) -> bool:
+        """Client disconnesso con ban: kicked fino alla scadenza."""
+        previous = self.state(mac)
+        self._connected.discard(mac)
+        self._grace.pop(mac)
+        self._away.pop(mac)
+        self._evicted(self._kicked.set(mac, now, now), now)
+        return previous != PRESENCE_KICKED
+
+    def _evicted(self, mac: Optional[str], now: float) -> None:
+        """MAC scartato da grace o kicked per capacità: passa ad away."""
+        if mac is None or self.state(mac) != PRESENCE_AWAY:
+            return
+        self._evicted_changed.append(mac)
+        self._set_away(mac, now)
+
+    def _set_away(self, mac: str, now: float) -> None:
+        """Porta un MAC in away; quello scartato per capacità va dimenticato."""
+        evicted = self._away.set(mac, now)
+        if evicted is not None:
+            self._evicted_forgotten.append(evicted)
+
+    def prune(self, now: float) -> Tuple[List[str], List[str]]:
+        """Applica le scadenze.
+
+        Ritorna i MAC passati ad away (grace o ban scaduti, o scartati per
+        capacità) e quelli dimenticati perché away da più di away_ttl o
+        scartati da away per capacità.
+        """
+        changed, self._evicted_changed = self._evicted_changed, []
+        for mac in self._grace.prune(now) + self._kicked.prune(now):
+            if self.state(mac) == PRESENCE_AWAY:
+                self._set_away(mac, now)
+                changed.append(mac)
+
+        forgotten, self._evicted_forgotten = self._evicted_forgotten, []
+        forgotten = [
+            mac for mac in dict.fromkeys(forgotten)
+            if self.state(mac) == PRESENCE_AWAY and mac not in self._away
+        ]
+        return changed, forgotten + self._away.prune(now)
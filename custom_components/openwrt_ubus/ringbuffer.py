@@ -0,0 +1,204 @@
+"""Ring buffer a dimensione fissa basati su array per OpenWrt Ubus."""
+from array import array
+from collections import OrderedDict
+from math import isnan, nan as NAN
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+COUNTER_32BIT = 2**32
+
+
+class CounterRingBuffer:
+    """Ultimi N campioni di un gruppo di contatori monotoni.
+
+    I campioni sono salvati in array preallocati, quindi la memoria resta
+    costante qualunque sia l'uptime. I valori vengono resi monotoni al
+    momento dell'inserimento: un contatore a 32 bit che riparte da zero
+    nella metà alta del range viene trattato come wrap, ogni altra
+    diminuzione come reset del contatore.
+    """
+
+    __slots__ = ("fields", "capacity", "_times", "_values", "_raw", "_head", "_size")
+
+    def __init__(self, fields: Sequence[str], capacity: int):
+        """Initialize ring buffer."""
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self._times = array("d", [0.0]) * capacity
+        self._values = array("d", [0.0]) * (capacity * len(self.fields))
+        self._raw = array("d", [0.0]) * len(self.fields)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Numero di campioni presenti."""
+        return self._size
+
+    def clear(self) -> None:
+        """Scarta tutti i campioni (es. dopo un reboot del router)."""
+        self._head = 0
+        self._size = 0
+
+    def _slot(self, age: int) -> int:
+        """Indice del campione con età age (0 = più recente)."""
+        return (self._head - 1 - age) % self.capacity
+
+    def append(self, timestamp: float, raw_values: Sequence[float]) -> None:
+        """Aggiungi un campione di contatori grezzi."""
+        width = len(self.fields)
+        slot = self._head
+        base = slot * width
+
+        if self._size:
+            prev_base = self._slot(0) * width
+            for i in range(width):
+                raw = float(raw_values[i])
+                delta = raw - self._raw[i]
+                if delta < 0:
+                    if self._raw[i] >= COUNTER_32BIT / 2 and self._raw[i] < COUNTER_32BIT:
+                        delta += COUNTER_32BIT
+                    else:
+                        delta = raw
+                self._values[base + i] = self._values[prev_base + i] + delta
+                self._raw[i] = raw
+        else:
+            for i in range(width):
+                self._raw[i] = float(raw_values[i])
+                self._values[base + i] = 0.0
+
+        self._times[slot] = timestamp
+        self._head = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def _rate_between(self, index: int, newer: int, older: int) -> Optional[float]:
+        """Tasso al secondo tra due campioni (per età)."""
+        width = len(self.fields)
+        new_slot = self._slot(newer)
+        old_slot = self._slot(older)
+        elapsed = self._times[new_slot] - self._times[old_slot]
+        if elapsed <= 0:
+            return None
+        delta = self._values[new_slot * width + index] - self._values[old_slot * width + index]
+        return delta / elapsed
+
+    def rate(self, field: str) -> Optional[float]:
+        """Tasso istantaneo tra gli ultimi due campioni."""
+        if self._size < 2:
+            return None
+        return self._rate_between(self.fields.index(field), 0, 1)
+
+    def average_rate(self, field: str, samples: Optional[int] = None) -> Optional[float]:
+        """Media mobile del tasso sugli ultimi samples campioni (default tutti)."""
+        count = self._size if samples is None else min(samples, self._size)
+        if count < 2:
+            return None
+        return self._rate_between(self.fields.index(field), 0, count - 1)
+
+
+class GaugeRingBuffer:
+    """Ultimi N campioni di un gruppo di grandezze istantanee (es. segnale).
+
+    Usa array compatti a 32 bit per i valori, adatti a migliaia di client.
+    """
+
+    __slots__ = ("fields", "capacity", "_times", "_values", "_head", "_size")
+
+    def __init__(self, fields: Sequence[str], capacity: int):
+        """Initialize ring buffer."""
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self._times = array("d", [0.0]) * capacity
+        self._values = array("f", [NAN]) * (capacity * len(self.fields))
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Numero di campioni presenti."""
+        return self._size
+
+    def append(self, timestamp: float, values: Sequence[Optional[float]]) -> None:
+        """Aggiungi un campione; None indica valore non disponibile."""
+        width = len(self.fields)
+        base = self._head * width
+        for i in range(width):
+            value = values[i]
+            self._values[base + i] = NAN if value is None else value
+        self._times[self._head] = timestamp
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def _series(self, index: int) -> List[Tuple[float, float]]:
+        """Coppie (timestamp, valore) dalla più vecchia, senza valori mancanti."""
+        width = len(self.fields)
+        series = []
+        for age in range(self._size - 1, -1, -1):
+            slot = (self._head - 1 - age) % self.capacity
+            value = self._values[slot * width + index]
+            if not isnan(value):
+                series.append((self._times[slot], value))
+        return series
+
+    def stats(self, field: str) -> Optional[Dict[str, float]]:
+        """Min/avg/max e trend (variazione al minuto) di una grandezza."""
+        series = self._series(self.fields.index(field))
+        if not series:
+            return None
+
+        values = [value for _, value in series]
+        result = {
+            "min": round(min(values), 1),
+            "avg": round(sum(values) / len(values), 1),
+            "max": round(max(values), 1),
+            "last": round(values[-1], 1),
+            "samples": len(values),
+            "trend": 0.0,
+        }
+
+        # Pendenza ai minimi quadrati
+        if len(series) >= 2:
+            t0 = series[0][0]
+            times = [t - t0 for t, _ in series]
+            mean_t = sum(times) / len(times)
+            mean_v = sum(values) / len(values)
+            var_t = sum((t - mean_t) ** 2 for t in times)
+            if var_t > 0:
+                cov = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values))
+                result["trend"] = round(cov / var_t * 60, 2)
+
+        return result
+
+
+class BoundedBufferMap:
+    """Mappa chiave -> ring buffer con numero massimo di chiavi (LRU)."""
+
+    def __init__(self, factory: Callable[[], Any], max_keys: int):
+        """Initialize map."""
+        self._factory = factory
+        self._max_keys = max_keys
+        self._buffers: "OrderedDict[str, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        """Numero di chiavi presenti."""
+        return len(self._buffers)
+
+    def __contains__(self, key: str) -> bool:
+        """Return if key is tracked."""
+        return key in self._buffers
+
+    def get(self, key: str) -> Optional[Any]:
+        """Ritorna il buffer per key senza crearlo."""
+        return self._buffers.get(key)
+
+    def keys(self) -> List[str]:
+        """Chiavi presenti."""
+        return list(self._buffers)
+
+    def buffer(self, key: str) -> Any:
+        """Ritorna (o crea) il buffer per key, espellendo il meno recente."""
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = self._factory()
+            if len(self._buffers) > self._max_keys:
+                self._buffers.popitem(last=False)
+        else:
+            self._buffers.move_to_end(key)
+        return buffer
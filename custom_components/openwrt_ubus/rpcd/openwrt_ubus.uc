@@ -0,0 +1,245 @@
+// Plugin rpcd per l'integrazione Home Assistant openwrt_ubus.
+//
+// Espone l'oggetto ubus "openwrt_ubus" con:
+//   version  -> { version }
+//   snapshot -> client hostapd, lease DHCP, hash /etc/ethers, stato
+//               servizi, contatori interfacce, righe cpu di /proc/stat,
+//               host hints luci-rpc e tabella ARP in una sola chiamata
+//
+// Installazione sul router (richiede rpcd-mod-ucode):
+//   cp openwrt_ubus.uc /usr/share/rpcd/ucode/openwrt_ubus.uc
+//   cp openwrt_ubus.json /usr/share/rpcd/acl.d/openwrt_ubus.json
+//   /etc/init.d/rpcd restart
+//
+// Il formato è versionato: cambi incompatibili incrementano API_VERSION
+// e l'integrazione torna alle chiamate singole finché non è aggiornata.
+
+'use strict';
+
+import { connect } from 'ubus';
+import { readfile } from 'fs';
+
+const API_VERSION = 1;
+
+const CLIENT_FIELDS = [ 'signal', 'rate', 'bytes', 'packets', 'airtime', 'authorized' ];
+const STAT_FIELDS = [ 'rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets' ];
+
+let bus;
+
+function ubus() {
+	if (!bus)
+		bus = connect();
+
+	return bus;
+}
+
+function try_call(object, method, args) {
+	return ubus().call(object, method, args ?? {});
+}
+
+function call(object, method, args) {
+	let result = try_call(object, method, args);
+
+	if (result == null)
+		die(sprintf('%s.%s: %s', object, method, ubus().error()));
+
+	return result;
+}
+
+function pick(obj, fields) {
+	let out = {};
+
+	for (let field in fields)
+		if (obj?.[field] != null)
+			out[field] = obj[field];
+
+	return out;
+}
+
+// FNV-1a a 32 bit, identico a api.ethers_hash()
+function fnv1a(data) {
+	let hash = 0x811c9dc5;
+
+	for (let i = 0; i < length(data); i++)
+		hash = ((hash ^ ord(data, i)) * 0x01000193) & 0xffffffff;
+
+	return sprintf('%08x', hash);
+}
+
+function format_mac(mac) {
+	mac = lc(mac ?? '');
+
+	if (index(mac, ':') >= 0 || length(mac) != 12)
+		return mac;
+
+	let parts = [];
+	for (let i = 0; i < 12; i += 2)
+		push(parts, substr(mac, i, 2));
+
+	return join(':', parts);
+}
+
+function system() {
+	return {
+		board: pick(call('system', 'board'), [ 'hostname', 'model', 'kernel' ]),
+		info: pick(call('system', 'info'), [ 'uptime', 'load', 'memory' ])
+	};
+}
+
+function clients() {
+	let result = {};
+
+	for (let object in (ubus().list('hostapd.*') ?? [])) {
+		let list = {};
+
+		for (let mac, client in (try_call(object, 'get_clients')?.clients ?? {}))
+			list[mac] = pick(client, CLIENT_FIELDS);
+
+		result[substr(object, 8)] = { clients: list };
+	}
+
+	return result;
+}
+
+function leases() {
+	let result = {};
+	let data = readfile('/tmp/dhcp.leases');
+
+	// dnsmasq: scadenza mac ip hostname client-id (righe IPv6 senza MAC ignorate)
+	if (data != null) {
+		for (let line in split(trim(data), '\n')) {
+			let fields = split(line, ' ');
+
+			if (length(fields) >= 4 && index(fields[1], ':') >= 0)
+				result[lc(fields[1])] = {
+					ip: fields[2],
+					hostname: (fields[3] != '*') ? fields[3] : null,
+					expires: +fields[0]
+				};
+		}
+
+		return result;
+	}
+
+	// odhcpd
+	for (let device, info in (try_call('dhcp', 'ipv4leases')?.device ?? {}))
+		for (let lease in (info?.leases ?? []))
+			result[format_mac(lease.mac)] = {
+				ip: lease.address,
+				hostname: lease.hostname,
+				expires: lease.valid
+			};
+
+	return result;
+}
+
+function ethers(known_hash) {
+	let data = readfile('/etc/ethers');
+
+	if (data == null)
+		return { hash: null };
+
+	let hash = fnv1a(data);
+
+	// Contenuto inviato solo se cambiato rispetto a quello già noto
+	return (hash == known_hash) ? { hash: hash } : { hash: hash, data: data };
+}
+
+function services(names) {
+	let all = call('service', 'list');
+	let result = {};
+
+	for (let name in (names ?? [])) {
+		if (!all[name])
+			continue;
+
+		let instances = {};
+		for (let id, instance in (all[name].instances ?? {}))
+			instances[id] = pick(instance, [ 'running', 'pid' ]);
+
+		result[name] = { instances: instances };
+	}
+
+	return result;
+}
+
+function devices() {
+	let result = {};
+
+	for (let name, device in call('network.device', 'status'))
+		result[name] = {
+			up: device.up,
+			statistics: pick(device.statistics, STAT_FIELDS)
+		};
+
+	return result;
+}
+
+// Solo le righe cpu/cpuN: il calcolo dell'utilizzo è fatto dall'integrazione
+function cpu() {
+	let data = readfile('/proc/stat');
+
+	if (data == null)
+		die('/proc/stat non leggibile');
+
+	let lines = [];
+	for (let line in split(data, '\n'))
+		if (substr(line, 0, 3) == 'cpu')
+			push(lines, line);
+
+	return join('\n', lines);
+}
+
+// Host hints (se luci-rpc è installato) e tabella ARP grezza, indicizzati dall'integrazione
+function hosts() {
+	let arp = readfile('/proc/net/arp');
+
+	if (arp == null)
+		die('/proc/net/arp non leggibile');
+
+	return {
+		hints: try_call('luci-rpc', 'getHostHints') ?? {},
+		arp: arp
+	};
+}
+
+// Ogni parte fallisce in modo indipendente e viene riportata in errors
+function part(snapshot, name, fn) {
+	try {
+		snapshot[name] = fn();
+	}
+	catch (e) {
+		if (!snapshot.errors)
+			snapshot.errors = {};
+
+		snapshot.errors[name] = e.message;
+	}
+}
+
+return {
+	openwrt_ubus: {
+		version: {
+			call: function() {
+				return { version: API_VERSION };
+			}
+		},
+
+		snapshot: {
+			args: { services: [], ethers_hash: '' },
+			call: function(req) {
+				let snapshot = { version: API_VERSION };
+
+				part(snapshot, 'system', system);
+				part(snapshot, 'clients', clients);
+				part(snapshot, 'leases', leases);
+				part(snapshot, 'ethers', () => ethers(req.args.ethers_hash));
+				part(snapshot, 'services', () => services(req.args.services));
+				part(snapshot, 'devices', devices);
+				part(snapshot, 'cpu', cpu);
+				part(snapshot, 'hosts', hosts);
+
+				return snapshot;
+			}
+		}
+	}
+};
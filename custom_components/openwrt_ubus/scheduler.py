@@ -0,0 +1,134 @@
+"""Scheduler delle richieste ubus per router, con priorità."""
+import asyncio
+import functools
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from .const import (
+    PRIORITY_USER, PRIORITY_PRESENCE, PRIORITY_STATS, SCHEDULER_WAIT_SAMPLES
+)
+
+PRIORITY_NAMES = {
+    PRIORITY_USER: "user",
+    PRIORITY_PRESENCE: "presence",
+    PRIORITY_STATS: "stats",
+}
+
+# Priorità delle richieste del task corrente (ereditata dai task figli)
+_priority: ContextVar[int] = ContextVar("openwrt_ubus_priority", default=PRIORITY_STATS)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Esegui le richieste del blocco con almeno la priorità indicata.
+
+    La priorità non viene mai abbassata: un refresh avviato da un'azione
+    utente resta a priorità utente.
+    """
+    token = _priority.set(min(priority, _priority.get()))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def user_request(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Decoratore: le richieste del metodo hanno priorità utente."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with request_priority(PRIORITY_USER):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+class RequestScheduler:
+    """Limita le richieste in corso verso un router e le ordina per priorità.
+
+    rpcd sui router piccoli serializza le richieste: oltre max_in_flight
+    le richieste attendono in coda e, a ogni slot libero, passa la più
+    prioritaria (azioni utente, poi presenza, poi statistiche), così
+    un'azione utente non attende la fine di un ciclo in background.
+    """
+
+    def __init__(self, max_in_flight: int):
+        """Initialize scheduler."""
+        self.max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._peak_queue_depth = 0
+        self._waits = {
+            priority: deque(maxlen=SCHEDULER_WAIT_SAMPLES) for priority in PRIORITY_NAMES
+        }
+        self._requests = dict.fromkeys(PRIORITY_NAMES, 0)
+
+    @property
+    def queue_depth(self) -> int:
+        """Richieste in attesa."""
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    async def run(self, request: Callable[[], Awaitable[Any]]) -> Any:
+        """Esegui request quando c'è uno slot libero."""
+        priority = _priority.get()
+        start = time.monotonic()
+        await self._acquire(priority)
+        self._waits[priority].append(time.monotonic() - start)
+        self._requests[priority] += 1
+        try:
+            return await request()
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int) -> None:
+        """Attendi uno slot (passato direttamente da _release)."""
+        if self._in_flight < self.max_in_flight and not self.queue_depth:
+            self._in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        self._peak_queue_depth = max(self._peak_queue_depth, self.queue_depth)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Slot già assegnato ma richiesta annullata: va restituito
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        """Libera uno slot passandolo alla richiesta in coda più prioritaria."""
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def metrics(self, reset: bool = True) -> Dict[str, Any]:
+        """Profondità coda e attese per priorità (picco azzerato a ogni lettura)."""
+        waits = {}
+        for priority, name in PRIORITY_NAMES.items():
+            samples = self._waits[priority]
+            waits[name] = {
+                "requests": self._requests[priority],
+                "avg_wait_ms": round(sum(samples) / len(samples) * 1000, 1) if samples else None,
+                "max_wait_ms": round(max(samples) * 1000, 1) if samples else None,
+            }
+
+        metrics = {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self._peak_queue_depth,
+            "priorities": waits,
+        }
+        if reset:
+            self._peak_queue_depth = self.queue_depth
+        return metrics
@@ -4,16 +4,33 @@ from typing import Any, Dict
 
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.const import PERCENTAGE, UnitOfTime
+from homeassistant.const import (
+    PERCENTAGE,
+    SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+    UnitOfDataRate,
+    UnitOfInformation,
+    UnitOfTime,
+)
 
-from .const import DOMAIN, MANUFACTURER
+from .const import DOMAIN, MANUFACTURER, CPU_STAT_FIELDS, CLIENT_MODE_ALLOWLIST
 from .coordinator import OpenWrtDataUpdateCoordinator
+from .entity import OpenWrtEntity, async_setup_client_entities
+from .scheduler import PRIORITY_NAMES
 
 _LOGGER = logging.getLogger(__name__)
 
+# Metriche radio: (nome, unità, icona)
+RADIO_METRICS = {
+    "channel": ("Channel", None, "mdi:wifi-cog"),
+    "noise": ("Noise", SIGNAL_STRENGTH_DECIBELS_MILLIWATT, "mdi:waveform"),
+    "busy": ("Channel Busy", PERCENTAGE, "mdi:chart-donut"),
+    "rx_airtime": ("RX Airtime", PERCENTAGE, "mdi:download"),
+    "tx_airtime": ("TX Airtime", PERCENTAGE, "mdi:upload"),
+}
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -30,11 +47,30 @@ async def async_setup_entry(
         OpenWrtCpuLoadSensor(coordinator, "1min"),
         OpenWrtCpuLoadSensor(coordinator, "5min"), 
         OpenWrtCpuLoadSensor(coordinator, "15min"),
+        OpenWrtCpuUsageSensor(coordinator, None, "busy"),
+        OpenWrtCpuUsageSensor(coordinator, None, "softirq"),
         OpenWrtMemorySensor(coordinator, "total"),
         OpenWrtMemorySensor(coordinator, "free"),
         OpenWrtMemorySensor(coordinator, "available"),
+        OpenWrtMemorySensor(coordinator, "used"),
+        OpenWrtMemorySensor(coordinator, "buffered"),
+        OpenWrtMemorySensor(coordinator, "cached"),
     ])
     
+    # Utilizzo per core (i core sono noti dal primo campione /proc/stat)
+    if coordinator.data and "cpu_usage" in coordinator.data:
+        for core in coordinator.data["cpu_usage"].get("cores", {}):
+            entities.append(OpenWrtCpuUsageSensor(coordinator, core, "busy"))
+    
+    # Coda e attese dello scheduler richieste
+    entities.append(OpenWrtSchedulerQueueSensor(coordinator))
+    for priority in PRIORITY_NAMES.values():
+        entities.append(OpenWrtSchedulerWaitSensor(coordinator, priority))
+    
+    # Handshake TLS per ciclo (solo HTTPS)
+    if coordinator.client.use_https:
+        entities.append(OpenWrtHandshakesSensor(coordinator))
+    
     # Sensori per ogni interfaccia wireless
     if coordinator.data and "wireless_networks" in coordinator.data:
         for interface, network_info in coordinator.data["wireless_networks"].items():
@@ -43,11 +79,44 @@ async def async_setup_entry(
                 OpenWrtConnectedDevicesSensor(coordinator, interface),
             ])
     
+    # Sensori traffico per ogni interfaccia di rete
+    if coordinator.data and "interface_stats" in coordinator.data:
+        for device in coordinator.data["interface_stats"]:
+            for metric in ("rx_bytes", "tx_bytes", "rx_packets", "tx_packets"):
+                entities.append(OpenWrtInterfaceRateSensor(coordinator, device, metric))
+    
+    # Sensori canale, rumore e airtime per radio
+    if coordinator.data and "radio_stats" in coordinator.data:
+        for radio in coordinator.data["radio_stats"]:
+            for metric in RADIO_METRICS:
+                entities.append(OpenWrtRadioSensor(coordinator, radio, metric))
+    
+    # Client connessi in aggregato (in modalità allowlist anche quelli senza entità)
+    entities.append(OpenWrtClientCountSensor(coordinator, "total"))
+    if coordinator.client_mode == CLIENT_MODE_ALLOWLIST:
+        entities.append(OpenWrtClientCountSensor(coordinator, "untracked"))
+    
+    # Traffico complessivo dei client con i più attivi negli attributi
+    if coordinator.wireless_backend != "none":
+        entities.append(OpenWrtClientThroughputSensor(coordinator))
+    
     async_add_entities(entities)
+    
+    # Sensori dedicati segnale/rate per client (opzionali), anche per i client che si collegano dopo
+    if coordinator.client_sensors:
+        async_setup_client_entities(
+            hass, coordinator, config_entry, async_add_entities, "sensor",
+            lambda mac, device_info: [
+                OpenWrtClientMetricSensor(coordinator, mac, device_info, metric)
+                for metric in ("signal", "rx_rate", "tx_rate")
+            ],
+        )
 
-class OpenWrtBaseSensor(CoordinatorEntity, SensorEntity):
+class OpenWrtBaseSensor(OpenWrtEntity, SensorEntity):
     """Base sensor per OpenWrt."""
     
+    _category = "system_info"
+    
     def __init__(self, coordinator: OpenWrtDataUpdateCoordinator):
         """Initialize base sensor."""
         super().__init__(coordinator)
@@ -101,6 +170,51 @@ class OpenWrtCpuLoadSensor(OpenWrtBaseSensor):
             return 0
         return self.coordinator.data["system_info"].get(f"load_{self._period}", 0)
 
+class OpenWrtCpuUsageSensor(OpenWrtBaseSensor):
+    """Sensor per utilizzo CPU reale (totale o per core) da /proc/stat."""
+    
+    _category = "cpu_stats"
+    
+    # Dettaglio per stato CPU: cambia a ogni ciclo, non salvato nel recorder
+    _unrecorded_attributes = frozenset(CPU_STAT_FIELDS)
+    
+    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, core: str | None, metric: str):
+        """Initialize CPU usage sensor."""
+        super().__init__(coordinator)
+        self._core = core
+        self._metric = metric
+        label = core.upper() if core else "CPU"
+        suffix = "Usage" if metric == "busy" else metric.title()
+        self._attr_unique_id = f"{DOMAIN}_cpu_{metric}_{core or 'total'}_{coordinator.hostname}"
+        self._attr_name = f"{coordinator.hostname} {label} {suffix}"
+        self._attr_native_unit_of_measurement = PERCENTAGE
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_suggested_display_precision = 1
+        self._attr_icon = "mdi:cpu-64-bit"
+    
+    def _usage(self) -> Dict[str, float] | None:
+        """Quote di utilizzo della CPU o del core."""
+        if not self.coordinator.data or "cpu_usage" not in self.coordinator.data:
+            return None
+        cpu_usage = self.coordinator.data["cpu_usage"]
+        if self._core is None:
+            return cpu_usage.get("total")
+        return cpu_usage.get("cores", {}).get(self._core)
+    
+    @property
+    def native_value(self) -> float | None:
+        """Return CPU usage percentage."""
+        usage = self._usage()
+        return usage.get(self._metric) if usage else None
+    
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return dettaglio per stato CPU (softirq, irq, iowait...)."""
+        usage = self._usage()
+        if not usage or self._core is None:
+            return {}
+        return {field: value for field, value in usage.items() if field != "busy"}
+
 class OpenWrtMemorySensor(OpenWrtBaseSensor):
     """Sensor per memoria."""
     
@@ -110,21 +224,27 @@ class OpenWrtMemorySensor(OpenWrtBaseSensor):
         self._memory_type = memory_type
         self._attr_unique_id = f"{DOMAIN}_memory_{memory_type}_{coordinator.hostname}"
         self._attr_name = f"{coordinator.hostname} Memory {memory_type.title()}"
+        self._attr_device_class = SensorDeviceClass.DATA_SIZE
+        self._attr_native_unit_of_measurement = UnitOfInformation.BYTES
+        self._attr_suggested_unit_of_measurement = UnitOfInformation.MEBIBYTES
+        self._attr_suggested_display_precision = 1
         self._attr_state_class = SensorStateClass.MEASUREMENT
         self._attr_icon = "mdi:memory"
     
     @property
-    def native_value(self) -> str:
-        """Return memory info."""
+    def native_value(self) -> int | None:
+        """Return memory in bytes."""
         if not self.coordinator.data or "system_info" not in self.coordinator.data:
-            return "0 KB"
+            return None
         
         memory_info = self.coordinator.data["system_info"].get("memory", {})
-        return memory_info.get(self._memory_type, "0 KB")
+        return memory_info.get(self._memory_type)
 
-class OpenWrtWirelessNetworkSensor(CoordinatorEntity, SensorEntity):
+class OpenWrtWirelessNetworkSensor(OpenWrtEntity, SensorEntity):
     """Sensor per info rete wireless."""
     
+    _category = "wireless_networks"
+    
     def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, interface: str, network_info: dict):
         """Initialize wireless network sensor."""
         super().__init__(coordinator)
@@ -172,9 +292,11 @@ class OpenWrtWirelessNetworkSensor(CoordinatorEntity, SensorEntity):
             "disabled": network.get("disabled", False),
         }
 
-class OpenWrtConnectedDevicesSensor(CoordinatorEntity, SensorEntity):
+class OpenWrtConnectedDevicesSensor(OpenWrtEntity, SensorEntity):
     """Sensor per numero dispositivi connessi per interfaccia."""
     
+    _category = "wireless_info"
+    
     def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, interface: str):
         """Initialize connected devices sensor."""
         super().__init__(coordinator)
@@ -205,4 +327,336 @@ class OpenWrtConnectedDevicesSensor(CoordinatorEntity, SensorEntity):
             if device.get("interface") == self._interface and device.get("connected", False):
                 count += 1
         
-        return count
\ No newline at end of file
+        return count
+
+class OpenWrtInterfaceRateSensor(OpenWrtBaseSensor):
+    """Sensor per throughput interfaccia calcolato dai contatori."""
+    
+    _category = "network_devices"
+    
+    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, device: str, metric: str):
+        """Initialize interface rate sensor."""
+        super().__init__(coordinator)
+        self._device = device
+        self._metric = metric
+        direction, kind = metric.split("_")
+        
+        self._attr_unique_id = f"{DOMAIN}_{device}_{metric}_rate_{coordinator.hostname}"
+        self._attr_name = f"{coordinator.hostname} {device} {direction.upper()} {kind.title()} Rate"
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        if kind == "bytes":
+            self._attr_device_class = SensorDeviceClass.DATA_RATE
+            self._attr_native_unit_of_measurement = UnitOfDataRate.BYTES_PER_SECOND
+            self._attr_icon = "mdi:download-network" if direction == "rx" else "mdi:upload-network"
+        else:
+            self._attr_native_unit_of_measurement = "p/s"
+            self._attr_icon = "mdi:swap-vertical"
+    
+    def _stats(self) -> Dict[str, Any]:
+        """Return interface stats."""
+        if not self.coordinator.data or "interface_stats" not in self.coordinator.data:
+            return {}
+        return self.coordinator.data["interface_stats"].get(self._device, {})
+    
+    @property
+    def native_value(self) -> float | None:
+        """Return current rate."""
+        rate = self._stats().get(self._metric)
+        return round(rate, 1) if rate is not None else None
+    
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return moving average."""
+        average = self._stats().get(f"{self._metric}_avg")
+        return {
+            "interface": self._device,
+            "average": round(average, 1) if average is not None else None,
+        }
+
+
+class OpenWrtClientCountSensor(OpenWrtBaseSensor):
+    """Sensor per numero di client connessi al router (totale o senza entità)."""
+    
+    _category = "wireless_info"
+    
+    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, kind: str):
+        """Initialize client count sensor."""
+        super().__init__(coordinator)
+        self._kind = kind
+        self._attr_unique_id = f"{DOMAIN}_clients_{kind}_{coordinator.hostname}"
+        self._attr_name = f"{coordinator.hostname} {'Connected' if kind == 'total' else 'Untracked'} Clients"
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_icon = "mdi:account-group" if kind == "total" else "mdi:account-question"
+    
+    def _summary(self) -> Dict[str, Any]:
+        """Return client summary."""
+        if not self.coordinator.data or "client_summary" not in self.coordinator.data:
+            return {}
+        return self.coordinator.data["client_summary"]
+    
+    @property
+    def native_value(self) -> int | None:
+        """Return number of clients."""
+        return self._summary().get(self._kind)
+    
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return breakdown by connection type and interface."""
+        summary = self._summary()
+        if self._kind != "total":
+            return {"tracked": summary.get("tracked")}
+        return {
+            "wireless": summary.get("wireless"),
+            "wired": summary.get("wired"),
+            "tracked": summary.get("tracked"),
+            "untracked": summary.get("untracked"),
+            "interfaces": summary.get("interfaces", {}),
+        }
+
+
+class OpenWrtClientThroughputSensor(OpenWrtBaseSensor):
+    """Sensor per traffico totale dei client wireless, con i top talker."""
+    
+    _category = "wireless_info"
+    
+    # Classifica volatile: non salvata nel recorder
+    _unrecorded_attributes = frozenset({"top_talkers"})
+    
+    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator):
+        """Initialize client throughput sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{DOMAIN}_client_throughput_{coordinator.hostname}"
+        self._attr_name = f"{coordinator.hostname} Client Throughput"
+        self._attr_device_class = SensorDeviceClass.DATA_RATE
+        self._attr_native_unit_of_measurement = UnitOfDataRate.BYTES_PER_SECOND
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_icon = "mdi:account-network"
+    
+    def _throughput(self) -> Dict[str, Any]:
+        """Return client throughput summary."""
+        if not self.coordinator.data or "client_throughput" not in self.coordinator.data:
+            return {}
+        return self.coordinator.data["client_throughput"]
+    
+    @property
+    def native_value(self) -> float | None:
+        """Return RX + TX bytes per second of all clients."""
+        throughput = self._throughput()
+        if not throughput:
+            return None
+        return round(throughput["rx_bytes"] + throughput["tx_bytes"], 1)
+    
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return per-direction totals and top talkers."""
+        throughput = self._throughput()
+        return {
+            "rx_bytes": throughput.get("rx_bytes"),
+            "tx_bytes": throughput.get("tx_bytes"),
+            "clients": throughput.get("clients"),
+            "top_talkers": throughput.get("top_talkers", []),
+        }
+
+
+class OpenWrtRadioSensor(OpenWrtBaseSensor):
+    """Sensor per canale, rumore e utilizzo del canale di una radio."""
+    
+    _category = "radio_stats"
+    
+    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, radio: str, metric: str):
+        """Initialize radio sensor."""
+        super().__init__(coordinator)
+        self._radio = radio
+        self._metric = metric
+        label, unit, icon = RADIO_METRICS[metric]
+        
+        self._attr_unique_id = f"{DOMAIN}_{radio}_{metric}_{coordinator.hostname}"
+        self._attr_name = f"{coordinator.hostname} {radio} {label}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_icon = icon
+        if metric == "noise":
+            self._attr_device_class = SensorDeviceClass.SIGNAL_STRENGTH
+        if metric == "channel":
+            self._attr_state_class = None
+    
+    def _stats(self) -> Dict[str, Any]:
+        """Return radio stats."""
+        if not self.coordinator.data or "radio_stats" not in self.coordinator.data:
+            return {}
+        return self.coordinator.data["radio_stats"].get(self._radio, {})
+    
+    @property
+    def native_value(self) -> float | None:
+        """Return radio metric."""
+        return self._stats().get(self._metric)
+    
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return interfaccia e frequenza."""
+        stats = self._stats()
+        return {
+            "interface": stats.get("interface"),
+            "frequency": stats.get("frequency"),
+        }
+
+class OpenWrtClientMetricSensor(OpenWrtEntity, SensorEntity):
+    """Sensor dedicato per segnale o rate di un client wireless."""
+    
+    _category = "wireless_info"
+    
+    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, mac: str, device_info: dict, metric: str):
+        """Initialize client metric sensor."""
+        super().__init__(coordinator)
+        self._mac = mac
+        self._metric = metric
+        
+        self._attr_unique_id = f"{DOMAIN}_{metric}_{mac}"
+        self._attr_name = f"{device_info['display_name']} {metric.replace('_', ' ').title()}"
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        if metric == "signal":
+            self._attr_device_class = SensorDeviceClass.SIGNAL_STRENGTH
+            self._attr_native_unit_of_measurement = SIGNAL_STRENGTH_DECIBELS_MILLIWATT
+            self._attr_icon = "mdi:wifi"
+        else:
+            self._attr_device_class = SensorDeviceClass.DATA_RATE
+            self._attr_native_unit_of_measurement = UnitOfDataRate.KILOBITS_PER_SECOND
+            self._attr_icon = "mdi:speedometer"
+        
+        # Device info del client
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, f"device_{mac}")},
+            "name": device_info["display_name"],
+            "manufacturer": "Unknown",
+            "model": "Network Device",
+            "via_device": (DOMAIN, coordinator.hostname),
+        }
+        
+        self._attr_native_value = None
+        self._update_value()
+    
+    def _update_value(self) -> None:
+        """Aggiorna il valore applicando l'isteresi."""
+        if not self.coordinator.data or "processed_devices" not in self.coordinator.data:
+            return
+        
+        device = self.coordinator.data["processed_devices"].get(self._mac)
+        if not device:
+            return
+        
+        value = self.coordinator.client_metrics(device)[self._metric]
+        self._attr_native_value = self.coordinator.gate_client_metric(
+            self._metric, self._attr_native_value, value
+        )
+    
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_value()
+        super()._handle_coordinator_update()
+    
+    @property
+    def available(self) -> bool:
+        """Return if client is connected."""
+        if not super().available or not self.coordinator.data:
+            return False
+        device = self.coordinator.data.get("processed_devices", {}).get(self._mac)
+        return bool(device and device.get("connected", False))
+
+
+class OpenWrtHandshakesSensor(OpenWrtBaseSensor):
+    """Sensor per handshake TLS eseguiti nell'ultimo ciclo."""
+    
+    _category = None
+    
+    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator):
+        """Initialize handshakes sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{DOMAIN}_tls_handshakes_{coordinator.hostname}"
+        self._attr_name = f"{coordinator.hostname} TLS Handshakes"
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_icon = "mdi:handshake"
+    
+    @property
+    def native_value(self) -> int | None:
+        """Return full handshakes in the last cycle."""
+        if not self.coordinator.data or "transport" not in self.coordinator.data:
+            return None
+        return self.coordinator.data["transport"].get("handshakes")
+    
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return resumed and total handshakes."""
+        if not self.coordinator.data or "transport" not in self.coordinator.data:
+            return {}
+        transport = self.coordinator.data["transport"]
+        return {
+            "resumed_handshakes": transport.get("resumed_handshakes"),
+            "total_handshakes": transport.get("total_handshakes"),
+        }
+
+class OpenWrtSchedulerQueueSensor(OpenWrtBaseSensor):
+    """Sensor per picco di richieste in coda nell'ultimo ciclo."""
+    
+    _category = None
+    
+    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator):
+        """Initialize queue sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{DOMAIN}_request_queue_{coordinator.hostname}"
+        self._attr_name = f"{coordinator.hostname} Request Queue Peak"
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_icon = "mdi:tray-full"
+    
+    @property
+    def native_value(self) -> int | None:
+        """Return peak queue depth since the previous cycle."""
+        if not self.coordinator.data or "scheduler" not in self.coordinator.data:
+            return None
+        return self.coordinator.data["scheduler"].get("peak_queue_depth")
+    
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return in-flight limit."""
+        if not self.coordinator.data or "scheduler" not in self.coordinator.data:
+            return {}
+        return {"max_in_flight": self.coordinator.data["scheduler"].get("max_in_flight")}
+
+class OpenWrtSchedulerWaitSensor(OpenWrtBaseSensor):
+    """Sensor per attesa media in coda di una classe di priorità."""
+    
+    _category = None
+    
+    def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, priority: str):
+        """Initialize wait sensor."""
+        super().__init__(coordinator)
+        self._priority = priority
+        self._attr_unique_id = f"{DOMAIN}_request_wait_{priority}_{coordinator.hostname}"
+        self._attr_name = f"{coordinator.hostname} Request Wait {priority.title()}"
+        self._attr_device_class = SensorDeviceClass.DURATION
+        self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_icon = "mdi:timer-sand"
+    
+    def _waits(self) -> Dict[str, Any]:
+        """Return wait stats for the priority class."""
+        if not self.coordinator.data or "scheduler" not in self.coordinator.data:
+            return {}
+        return self.coordinator.data["scheduler"].get("priorities", {}).get(self._priority, {})
+    
+    @property
+    def native_value(self) -> float | None:
+        """Return average wait over recent requests."""
+        return self._waits().get("avg_wait_ms")
+    
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return max wait and request count."""
+        waits = self._waits()
+        return {
+            "max_wait_ms": waits.get("max_wait_ms"),
+            "requests": waits.get("requests"),
+        }
@@ -0,0 +1,257 @@
+"""Servizi per OpenWrt Ubus."""
+import asyncio
+import logging
+from typing import Dict, List
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.helpers import entity_registry as er
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+
+from .const import DOMAIN, DEFAULT_PROFILE_CYCLES
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_KICK_DEVICE = "kick_device"
+SERVICE_KICK_DEVICES = "kick_devices"
+SERVICE_RESTART_SERVICE = "restart_service"
+SERVICE_GET_CLIENT_HISTORY = "get_client_history"
+SERVICE_GET_CLIENT_RATES = "get_client_rates"
+SERVICE_GET_CLIENTS = "get_clients"
+SERVICE_PROFILE = "profile"
+
+ATTR_MAC_ADDRESS = "mac_address"
+ATTR_MAC_ADDRESSES = "mac_addresses"
+ATTR_SERVICE_NAME = "service_name"
+ATTR_CYCLES = "cycles"
+ATTR_HOSTNAME = "hostname"
+ATTR_CONNECTED_ONLY = "connected_only"
+
+KICK_DEVICE_SCHEMA = cv.make_entity_service_schema({
+    vol.Optional(ATTR_MAC_ADDRESS): cv.string,
+})
+
+KICK_DEVICES_SCHEMA = vol.Schema({
+    vol.Required(ATTR_MAC_ADDRESSES): vol.All(cv.ensure_list, [cv.string]),
+})
+
+RESTART_SERVICE_SCHEMA = cv.make_entity_service_schema({
+    vol.Optional(ATTR_SERVICE_NAME): vol.All(cv.ensure_list, [cv.string]),
+})
+
+GET_CLIENT_HISTORY_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_MAC_ADDRESS): cv.string,
+})
+
+GET_CLIENT_RATES_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_MAC_ADDRESS): cv.string,
+})
+
+GET_CLIENTS_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_MAC_ADDRESS): cv.string,
+    vol.Optional(ATTR_CONNECTED_ONLY, default=True): cv.boolean,
+})
+
+PROFILE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_CYCLES, default=DEFAULT_PROFILE_CYCLES): vol.All(
+        vol.Coerce(int), vol.Range(min=1, max=100)
+    ),
+    vol.Optional(ATTR_HOSTNAME): cv.string,
+})
+
+
+def _coordinators(hass: HomeAssistant) -> List:
+    """Ritorna i coordinator di tutti i router configurati."""
+    return list(hass.data.get(DOMAIN, {}).values())
+
+
+def _target_entries(hass: HomeAssistant, call: ServiceCall, prefix: str) -> List[er.RegistryEntry]:
+    """Risolvi le entità target con unique_id che inizia per prefix."""
+    selected = async_extract_referenced_entity_ids(hass, call)
+    registry = er.async_get(hass)
+    entries = []
+    for entity_id in selected.referenced | selected.indirectly_referenced:
+        entry = registry.async_get(entity_id)
+        if entry and entry.platform == DOMAIN and entry.unique_id.startswith(prefix):
+            entries.append(entry)
+    return entries
+
+
+async def _async_kick(hass: HomeAssistant, targets: Dict[str, List[str]]) -> None:
+    """Kick in parallelo su più router.
+
+    targets mappa config entry id -> lista MAC; la chiave None indica
+    MAC da disconnettere ovunque risultino associati.
+    """
+    jobs = []
+    for entry_id, coordinator in hass.data.get(DOMAIN, {}).items():
+        macs = list(dict.fromkeys(targets.get(entry_id, []) + targets.get(None, [])))
+        if macs:
+            jobs.append(coordinator.kick_devices(macs))
+
+    for result in await asyncio.gather(*jobs, return_exceptions=True):
+        if isinstance(result, Exception):
+            _LOGGER.error(f"Errore kick dispositivi: {result}")
+
+
+async def _async_restart(hass: HomeAssistant, targets: Dict[str, List[str]]) -> None:
+    """Riavvia in parallelo i servizi indicati per ogni router."""
+    coordinators = hass.data.get(DOMAIN, {})
+    jobs = [
+        coordinators[entry_id].control_services(services, "restart")
+        for entry_id, services in targets.items()
+        if entry_id in coordinators and services
+    ]
+
+    for result in await asyncio.gather(*jobs, return_exceptions=True):
+        if isinstance(result, Exception):
+            _LOGGER.error(f"Errore riavvio servizi: {result}")
+        else:
+            for service_name, confirmed in result.items():
+                if not confirmed:
+                    _LOGGER.warning(f"Riavvio {service_name} non confermato")
+
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Registra i servizi dell'integrazione."""
+    if hass.services.has_service(DOMAIN, SERVICE_KICK_DEVICE):
+        return
+
+    async def async_kick_device(call: ServiceCall) -> None:
+        """Gestisci servizio kick_device."""
+        targets: Dict[str, List[str]] = {}
+        for entry in _target_entries(hass, call, f"{DOMAIN}_kick_"):
+            mac = entry.unique_id[len(f"{DOMAIN}_kick_"):]
+            targets.setdefault(entry.config_entry_id, []).append(mac)
+
+        if ATTR_MAC_ADDRESS in call.data:
+            targets.setdefault(None, []).append(call.data[ATTR_MAC_ADDRESS].lower())
+
+        if not targets:
+            _LOGGER.error("kick_device richiede un pulsante target o un mac_address")
+            return
+
+        await _async_kick(hass, targets)
+
+    async def async_kick_devices(call: ServiceCall) -> None:
+        """Gestisci servizio kick_devices."""
+        macs = [mac.lower() for mac in call.data[ATTR_MAC_ADDRESSES]]
+        await _async_kick(hass, {None: macs})
+
+    async def async_restart_service(call: ServiceCall) -> None:
+        """Gestisci servizio restart_service."""
+        coordinators = hass.data.get(DOMAIN, {})
+        targets: Dict[str, List[str]] = {}
+        for entry in _target_entries(hass, call, f"{DOMAIN}_service_"):
+            coordinator = coordinators.get(entry.config_entry_id)
+            if coordinator is None:
+                continue
+            service_name = entry.unique_id[len(f"{DOMAIN}_service_"):-len(f"_{coordinator.hostname}")]
+            targets.setdefault(entry.config_entry_id, []).append(service_name)
+
+        # service_name si applica ai router selezionati, o a tutti se nessun target
+        for entry_id in list(targets) or list(coordinators):
+            for service_name in call.data.get(ATTR_SERVICE_NAME, []):
+                if service_name in coordinators[entry_id].managed_services:
+                    targets.setdefault(entry_id, []).append(service_name)
+
+        if not targets:
+            _LOGGER.error("restart_service richiede uno switch target o un service_name gestito")
+            return
+
+        await _async_restart(
+            hass, {entry_id: list(dict.fromkeys(names)) for entry_id, names in targets.items()}
+        )
+
+    async def async_get_client_history(call: ServiceCall) -> ServiceResponse:
+        """Gestisci servizio get_client_history."""
+        mac = call.data.get(ATTR_MAC_ADDRESS)
+        return {
+            "routers": {
+                coordinator.hostname: coordinator.get_client_history(mac)
+                for coordinator in _coordinators(hass)
+            }
+        }
+
+    async def async_get_client_rates(call: ServiceCall) -> ServiceResponse:
+        """Gestisci servizio get_client_rates."""
+        mac = call.data.get(ATTR_MAC_ADDRESS)
+        return {
+            "routers": {
+                coordinator.hostname: coordinator.get_client_rates(mac)
+                for coordinator in _coordinators(hass)
+            }
+        }
+
+    async def async_get_clients(call: ServiceCall) -> ServiceResponse:
+        """Gestisci servizio get_clients."""
+        coordinators = _coordinators(hass)
+        if not coordinators:
+            return {"clients": {}}
+        mac = call.data.get(ATTR_MAC_ADDRESS)
+        # Tabella condivisa da tutti i router
+        return {
+            "clients": coordinators[0].client_table.async_describe(
+                mac.lower() if mac else None, call.data[ATTR_CONNECTED_ONLY]
+            )
+        }
+
+    async def async_profile(call: ServiceCall) -> None:
+        """Gestisci servizio profile."""
+        hostname = call.data.get(ATTR_HOSTNAME)
+        for coordinator in _coordinators(hass):
+            if hostname is None or coordinator.hostname == hostname:
+                coordinator.async_start_profile(call.data[ATTR_CYCLES])
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_KICK_DEVICE, async_kick_device, schema=KICK_DEVICE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_KICK_DEVICES, async_kick_devices, schema=KICK_DEVICES_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RESTART_SERVICE, async_restart_service, schema=RESTART_SERVICE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_CLIENT_HISTORY,
+        async_get_client_history,
+        schema=GET_CLIENT_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_CLIENT_RATES,
+        async_get_client_rates,
+        schema=GET_CLIENT_RATES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_CLIENTS,
+        async_get_clients,
+        schema=GET_CLIENTS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
+
+
+def async_unload_services(hass: HomeAssistant) -> None:
+    """Rimuovi i servizi quando non ci sono più router configurati."""
+    if _coordinators(hass):
+        return
+
+    for service in (
+        SERVICE_KICK_DEVICE,
+        SERVICE_KICK_DEVICES,
+        SERVICE_RESTART_SERVICE,
+        SERVICE_GET_CLIENT_HISTORY,
+        SERVICE_GET_CLIENT_RATES,
+        SERVICE_GET_CLIENTS,
+        SERVICE_PROFILE,
+    ):
+        hass.services.async_remove(DOMAIN, service)
@@ -5,11 +5,12 @@ from typing import Any
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN, MANUFACTURER
+from .const import DOMAIN, MANUFACTURER, SIGNAL_SERVICE_UPDATED
 from .coordinator import OpenWrtDataUpdateCoordinator
+from .entity import OpenWrtEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,9 +31,11 @@ async def async_setup_entry(
     
     async_add_entities(entities)
 
-class OpenWrtServiceSwitch(CoordinatorEntity, SwitchEntity):
+class OpenWrtServiceSwitch(OpenWrtEntity, SwitchEntity):
     """Switch per controllare servizi sistema."""
     
+    _category = "services_status"
+    
     def __init__(self, coordinator: OpenWrtDataUpdateCoordinator, service_name: str):
         """Initialize service switch."""
         super().__init__(coordinator)
@@ -51,6 +54,17 @@ class OpenWrtServiceSwitch(CoordinatorEntity, SwitchEntity):
             "sw_version": coordinator.data.get("system_info", {}).get("kernel", "Unknown") if coordinator.data else "Unknown",
         }
     
+    async def async_added_to_hass(self) -> None:
+        """Registra aggiornamento mirato dopo start/stop/restart."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                f"{SIGNAL_SERVICE_UPDATED}_{self.coordinator.entry.entry_id}_{self._service_name}",
+                self.async_write_ha_state,
+            )
+        )
+    
     @property
     def is_on(self) -> bool:
         """Return if service is running."""
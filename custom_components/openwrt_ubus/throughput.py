@@ -0,0 +1,192 @@
+"""Tassi per client calcolati in blocco su array contigui."""
+import heapq
+from array import array
+from math import isnan, nan as NAN
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy opzionale: stessa logica sugli array della libreria standard
+    np = None
+
+
+class ClientRateTable:
+    """Contatori cumulativi dei client in array contigui indicizzati per slot.
+
+    Ogni MAC riceve uno slot stabile finché resta nel campione; contatori
+    precedenti, istante dell'ultimo campione e tassi stanno in matrici
+    slot x campo, così delta e tassi di tutti i client sono calcolati in
+    un solo passaggio (vettoriale con NumPy se disponibile). Gli slot dei
+    client spariti sono riutilizzati, la capacità raddoppia solo se serve.
+
+    Un contatore diminuito (riassociazione del client) o un campo assente
+    danno un tasso NaN fino al campione successivo.
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int = 64):
+        """Initialize table."""
+        self.fields = tuple(fields)
+        self.width = len(self.fields)
+        self.capacity = 0
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        if np is not None:
+            self._counters = np.empty((0, self.width))
+            self._rates = np.empty((0, self.width))
+            self._times = np.empty(0)
+        else:
+            self._counters = array("d")
+            self._rates = array("d")
+            self._times = array("d")
+        self._grow(capacity)
+
+    def __len__(self) -> int:
+        """Numero di client con uno slot."""
+        return len(self._slots)
+
+    def __contains__(self, mac: str) -> bool:
+        """Return if the client has a slot."""
+        return mac in self._slots
+
+    def macs(self) -> List[str]:
+        """Client con uno slot."""
+        return list(self._slots)
+
+    def _grow(self, capacity: int) -> None:
+        """Estendi le matrici fino a capacity slot (nuovi slot vuoti)."""
+        added = capacity - self.capacity
+        if np is not None:
+            self._counters = np.concatenate([self._counters, np.full((added, self.width), np.nan)])
+            self._rates = np.concatenate([self._rates, np.full((added, self.width), np.nan)])
+            self._times = np.concatenate([self._times, np.full(added, np.nan)])
+        else:
+            self._counters.extend(array("d", [NAN]) * (added * self.width))
+            self._rates.extend(array("d", [NAN]) * (added * self.width))
+            self._times.extend(array("d", [NAN]) * added)
+        # Slot liberi in ordine crescente di estrazione (pop dalla fine)
+        self._free.extend(reversed(range(self.capacity, capacity)))
+        self.capacity = capacity
+
+    def _slot(self, mac: str) -> int:
+        """Slot del client, assegnato al primo campione."""
+        slot = self._slots.get(mac)
+        if slot is None:
+            if not self._free:
+                self._grow(self.capacity * 2)
+            slot = self._slots[mac] = self._free.pop()
+        return slot
+
+    def _release(self, mac: str) -> None:
+        """Libera lo slot di un client non più presente."""
+        slot = self._slots.pop(mac)
+        if np is not None:
+            self._times[slot] = np.nan
+            self._rates[slot] = np.nan
+        else:
+            self._times[slot] = NAN
+            base = slot * self.width
+            for i in range(self.width):
+                self._rates[base + i] = NAN
+        self._free.append(slot)
+
+    def update(self, now: float, samples: Dict[str, Sequence[Optional[float]]]) -> None:
+        """Nuovo campione di contatori per tutti i client (None = campo assente).
+
+        I client assenti dal campione perdono lo slot e il valore di riferimento.
+        """
+        for mac in [mac for mac in self._slots if mac not in samples]:
+            self._release(mac)
+        if not samples:
+            return
+
+        slots = [self._slot(mac) for mac in samples]
+        values = [
+            NAN if value is None else float(value)
+            for sample in samples.values()
+            for value in sample
+        ]
+        if np is not None:
+            self._update_numpy(now, slots, values)
+        else:
+            self._update_array(now, slots, values)
+
+    def _update_numpy(self, now: float, slots: List[int], values: List[float]) -> None:
+        """Delta e tassi di tutti gli slot in un passaggio vettoriale."""
+        index = np.fromiter(slots, dtype=np.intp, count=len(slots))
+        current = np.asarray(values).reshape(len(slots), self.width)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            elapsed = (now - self._times[index])[:, None]
+            delta = current - self._counters[index]
+            rates = delta / elapsed
+            # Primo campione (elapsed NaN) o contatore ripartito: tasso non noto
+            rates[(delta < 0) | ~(elapsed > 0)] = np.nan
+        self._rates[index] = rates
+        self._counters[index] = current
+        self._times[index] = now
+
+    def _update_array(self, now: float, slots: List[int], values: List[float]) -> None:
+        """Come _update_numpy, in un solo ciclo sugli array piatti."""
+        width = self.width
+        counters, rates, times = self._counters, self._rates, self._times
+        for row, slot in enumerate(slots):
+            elapsed = now - times[slot]
+            known = elapsed > 0  # False anche con NaN (primo campione)
+            base = slot * width
+            for i in range(width):
+                value = values[row * width + i]
+                delta = value - counters[base + i]
+                rates[base + i] = delta / elapsed if known and delta >= 0 else NAN
+                counters[base + i] = value
+            times[slot] = now
+
+    def rates(self, mac: str) -> Optional[Dict[str, Optional[float]]]:
+        """Tassi al secondo di un client (None per i campi non noti)."""
+        slot = self._slots.get(mac)
+        if slot is None:
+            return None
+        base = slot * self.width
+        row = self._rates[slot] if np is not None else self._rates[base:base + self.width]
+        return {
+            field: None if isnan(value) else float(value)
+            for field, value in zip(self.fields, row)
+        }
+
+    def totals(self, fields: Sequence[str]) -> Dict[str, float]:
+        """Somma dei tassi noti su tutti i client."""
+        columns = [self.fields.index(field) for field in fields]
+        if np is not None:
+            index = np.fromiter(self._slots.values(), dtype=np.intp, count=len(self._slots))
+            sums = np.nansum(self._rates[index][:, columns], axis=0)
+            return {field: float(total) for field, total in zip(fields, sums)}
+
+        totals = dict.fromkeys(fields, 0.0)
+        for slot in self._slots.values():
+            base = slot * self.width
+            for field, column in zip(fields, columns):
+                value = self._rates[base + column]
+                if not isnan(value):
+                    totals[field] += value
+        return totals
+
+    def top(self, count: int, fields: Sequence[str]) -> List[Tuple[str, float]]:
+        """I count client con la somma più alta dei tassi indicati."""
+        if not self._slots or count <= 0:
+            return []
+        columns = [self.fields.index(field) for field in fields]
+        macs = list(self._slots)
+        if np is not None:
+            index = np.fromiter(self._slots.values(), dtype=np.intp, count=len(macs))
+            scores = self._rates[index][:, columns].sum(axis=1)
+            known = np.flatnonzero(~np.isnan(scores))
+            if len(known) > count:
+                known = known[np.argpartition(-scores[known], count - 1)[:count]]
+            order = known[np.argsort(-scores[known], kind="stable")]
+            return [(macs[i], float(scores[i])) for i in order]
+
+        scores = []
+        for mac, slot in self._slots.items():
+            base = slot * self.width
+            score = sum(self._rates[base + column] for column in columns)
+            if not isnan(score):
+                scores.append((mac, score))
+        return heapq.nlargest(count, scores, key=lambda item: item[1])
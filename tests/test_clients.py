@@ -0,0 +1,123 @@
+"""Test del merge dei client tra più router."""
+import pytest
+
+from custom_components.openwrt_ubus import clients as clients_module
+from custom_components.openwrt_ubus.clients import ClientTable
+from custom_components.openwrt_ubus.const import (
+    PRESENCE_CONNECTED,
+    PRESENCE_GRACE,
+    SIGNAL_CLIENT_UPDATED,
+)
+
+MAC = "aa:bb:cc:dd:ee:01"
+UPDATED = f"{SIGNAL_CLIENT_UPDATED}_{MAC}"
+
+
+def _device(signal=-60, **extra):
+    """Client wireless come in processed_devices."""
+    return {
+        "mac": MAC,
+        "interface": "phy0-ap0",
+        "connected": True,
+        "wireless": True,
+        "signal": signal,
+        "display_name": "Telefono",
+        "ipv4": ["192.168.1.10"],
+        "ipv6": [],
+        **extra,
+    }
+
+
+def _publish(published, device):
+    """Isteresi di 3 dB sul segnale, come l'opzione di default."""
+    signal = device.get("signal")
+    previous = published.get("signal")
+    if previous is not None and signal is not None and abs(signal - previous) < 3:
+        signal = previous
+    return {"signal": signal}
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """Tabella client senza timer di pulizia; i segnali sono registrati."""
+    signals = []
+    monkeypatch.setattr(clients_module, "async_track_time_interval", lambda *args: lambda: None)
+    monkeypatch.setattr(
+        clients_module, "async_dispatcher_send", lambda hass, signal, *args: signals.append(signal)
+    )
+    client_table = ClientTable(None)
+    client_table.signals = signals
+    return client_table
+
+
+def test_unchanged_client_is_not_notified(table):
+    """Stesso AP e stessi dati a ogni poll: nessun aggiornamento ai tracker."""
+    table.async_update_entry("a", "ap1", {MAC: _device()}, 100, _publish)
+    assert UPDATED in table.signals
+
+    table.signals.clear()
+    table.async_update_entry("a", "ap1", {MAC: _device()}, 130, _publish)
+    assert UPDATED not in table.signals
+
+
+def test_signal_within_hysteresis_is_not_notified(table):
+    """Piccole variazioni di segnale restano sotto l'isteresi."""
+    table.async_update_entry("a", "ap1", {MAC: _device(-60)}, 100, _publish)
+    table.signals.clear()
+
+    table.async_update_entry("a", "ap1", {MAC: _device(-61)}, 130, _publish)
+    assert UPDATED not in table.signals
+    assert table.clients[MAC].published == {"signal": -60}
+
+    table.async_update_entry("a", "ap1", {MAC: _device(-66)}, 160, _publish)
+    assert UPDATED in table.signals
+    assert table.clients[MAC].published == {"signal": -66}
+
+
+def test_published_field_change_is_notified(table):
+    """Un nuovo indirizzo IP va mostrato dal tracker."""
+    table.async_update_entry("a", "ap1", {MAC: _device()}, 100, _publish)
+    table.signals.clear()
+
+    table.async_update_entry("a", "ap1", {MAC: _device(ipv4=["192.168.1.20"])}, 130, _publish)
+    assert UPDATED in table.signals
+
+
+def test_roaming_to_better_ap(table):
+    """Segnale migliore oltre il margine su un altro AP: roaming."""
+    table.async_update_entry("a", "ap1", {MAC: _device(-75)}, 100, _publish)
+    table.async_update_entry("b", "ap2", {MAC: _device(-50)}, 101, _publish)
+
+    client = table.clients[MAC]
+    assert client.current_ap == "ap2"
+    assert client.roam_count == 1
+    assert client.access_points == ("ap1", "ap2")
+
+
+def test_small_signal_difference_keeps_current_ap(table):
+    """Sotto ROAM_SIGNAL_MARGIN l'AP corrente resta."""
+    table.async_update_entry("a", "ap1", {MAC: _device(-60)}, 100, _publish)
+    table.async_update_entry("b", "ap2", {MAC: _device(-58)}, 101, _publish)
+
+    assert table.clients[MAC].current_ap == "ap1"
+    assert table.clients[MAC].roam_count == 0
+
+
+def test_wired_sighting_does_not_replace_wireless(table):
+    """Il router principale vede in ARP anche i client degli altri AP."""
+    table.async_update_entry("b", "ap2", {MAC: _device(-70)}, 100, _publish)
+    table.async_update_entry(
+        "a", "main", {MAC: {"mac": MAC, "connected": True, "wireless": False, "interface": "br-lan"}}, 101
+    )
+
+    assert table.clients[MAC].current_ap == "ap2"
+
+
+def test_lost_client_goes_to_grace(table):
+    """Nessun AP lo vede più: grace, poi di nuovo connesso."""
+    table.async_update_entry("a", "ap1", {MAC: _device()}, 100, _publish)
+    table.async_update_entry("a", "ap1", {}, 130, _publish)
+    assert table.clients[MAC].presence == PRESENCE_GRACE
+
+    table.async_update_entry("a", "ap1", {MAC: _device()}, 160, _publish)
+    assert table.clients[MAC].presence == PRESENCE_CONNECTED
@@ -0,0 +1,104 @@
+"""Test della macchina di presenza oltre la capacità massima."""
+from custom_components.openwrt_ubus.const import (
+    PRESENCE_AWAY,
+    PRESENCE_CONNECTED,
+    PRESENCE_GRACE,
+    PRESENCE_KICKED,
+)
+from custom_components.openwrt_ubus.presence import PresenceMachine, TTLStore
+
+MACS = [f"aa:bb:cc:dd:ee:0{i}" for i in range(5)]
+
+
+def test_ttl_store_set_returns_evicted_key():
+    """Oltre max_keys set ritorna la chiave più vecchia scartata."""
+    store = TTLStore(10, 2)
+
+    assert store.set("a", 0) is None
+    assert store.set("b", 1) is None
+    assert store.set("a", 2) is None  # rinnovo, nessuna chiave in più
+    assert store.set("c", 3) == "b"
+    assert "b" not in store
+    assert len(store) == 2
+
+
+def test_grace_over_capacity_moves_oldest_to_away():
+    """Un MAC scartato da grace non resta in grace per sempre."""
+    presence = PresenceMachine(grace=100, ban=100, away_ttl=100, max_keys=3)
+    for mac in MACS:
+        presence.seen(mac, 0)
+    for now, mac in enumerate(MACS):
+        presence.lost(mac, now)
+
+    assert [presence.state(mac) for mac in MACS] == [
+        PRESENCE_AWAY, PRESENCE_AWAY, PRESENCE_GRACE, PRESENCE_GRACE, PRESENCE_GRACE
+    ]
+    changed, forgotten = presence.prune(5)
+    assert changed == MACS[:2]
+    assert forgotten == []
+
+    # Riportati una sola volta
+    assert presence.prune(6) == ([], [])
+
+
+def test_away_over_capacity_forgets_oldest():
+    """Un MAC scartato da away viene riportato come dimenticato."""
+    presence = PresenceMachine(grace=0, ban=100, away_ttl=100, max_keys=3)
+    for mac in MACS:
+        presence.seen(mac, 0)
+    for mac in MACS:
+        presence.lost(mac, 0)
+
+    changed, forgotten = presence.prune(1)
+    assert sorted(changed) == MACS
+    assert sorted(forgotten) == MACS[:2]
+    assert presence.prune(2) == ([], [])
+
+
+def test_kicked_over_capacity_moves_oldest_to_away():
+    """Un MAC scartato da kicked passa ad away prima della fine del ban."""
+    presence = PresenceMachine(grace=100, ban=100, away_ttl=100, max_keys=3)
+    for now, mac in enumerate(MACS):
+        presence.kick(mac, now)
+
+    assert presence.state(MACS[0]) == PRESENCE_AWAY
+    assert presence.state(MACS[4]) == PRESENCE_KICKED
+    changed, _ = presence.prune(5)
+    assert changed == MACS[:2]
+
+
+def test_evicted_mac_seen_again_is_not_forgotten():
+    """Un MAC scartato da away ma tornato connesso prima del prune resta."""
+    presence = PresenceMachine(grace=100, ban=100, away_ttl=100, max_keys=1)
+    for mac in MACS[:3]:
+        presence.seen(mac, 0)
+    for now, mac in enumerate(MACS[:3]):
+        presence.lost(mac, now)  # il terzo scarta il primo anche da away
+    presence.seen(MACS[0], 2)
+
+    changed, forgotten = presence.prune(3)
+    assert presence.state(MACS[0]) == PRESENCE_CONNECTED
+    assert changed == MACS[:2]
+    assert forgotten == []
+
+
+def test_seen_right_after_kick_keeps_kicked():
+    """hostapd elenca ancora il client subito dopo del_client: resta kicked."""
+    presence = PresenceMachine(grace=100, ban=60, away_ttl=100, max_keys=10, settle=30)
+    presence.seen(MACS[0], 0)
+    assert presence.kick(MACS[0], 10)
+
+    assert presence.seen(MACS[0], 11) is False
+    assert presence.state(MACS[0]) == PRESENCE_KICKED
+    assert presence.prune(20) == ([], [])
+
+
+def test_seen_after_settle_reconnects():
+    """Rivisto dopo il periodo di assestamento (es. su un altro AP): connected."""
+    presence = PresenceMachine(grace=100, ban=60, away_ttl=100, max_keys=10, settle=30)
+    presence.seen(MACS[0], 0)
+    presence.kick(MACS[0], 10)
+
+    assert presence.seen(MACS[0], 45) is True
+    assert presence.state(MACS[0]) == PRESENCE_CONNECTED
+    assert presence.prune(80) == ([], [])
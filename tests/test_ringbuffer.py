@@ -0,0 +1,117 @@
+"""Test dei ring buffer per contatori e grandezze istantanee."""
+import pytest
+
+from custom_components.openwrt_ubus.ringbuffer import (
+    COUNTER_32BIT,
+    BoundedBufferMap,
+    CounterRingBuffer,
+    GaugeRingBuffer,
+)
+
+
+def test_counter_rate_needs_two_samples():
+    """Con un solo campione il tasso non è disponibile."""
+    buffer = CounterRingBuffer(("rx",), 4)
+    buffer.append(0, [1000])
+
+    assert buffer.rate("rx") is None
+    buffer.append(10, [3000])
+    assert buffer.rate("rx") == pytest.approx(200)
+
+
+def test_counter_32bit_wrap_keeps_delta():
+    """Un contatore a 32 bit che riparte da zero nella metà alta è un wrap."""
+    buffer = CounterRingBuffer(("rx",), 4)
+    buffer.append(0, [COUNTER_32BIT - 1000])
+    buffer.append(10, [500])
+
+    assert buffer.rate("rx") == pytest.approx(150)
+
+
+def test_counter_reset_counts_from_zero():
+    """Ogni altra diminuzione è un reset: conta solo il nuovo valore."""
+    buffer = CounterRingBuffer(("rx",), 4)
+    buffer.append(0, [10_000])
+    buffer.append(10, [400])
+
+    assert buffer.rate("rx") == pytest.approx(40)
+
+
+def test_counter_64bit_decrease_is_reset_not_wrap():
+    """Un valore oltre il range a 32 bit che diminuisce non è un wrap."""
+    buffer = CounterRingBuffer(("rx",), 4)
+    buffer.append(0, [COUNTER_32BIT * 3])
+    buffer.append(10, [100])
+
+    assert buffer.rate("rx") == pytest.approx(10)
+
+
+def test_counter_average_over_wrapped_capacity():
+    """La media usa solo i campioni ancora nel buffer."""
+    buffer = CounterRingBuffer(("rx", "tx"), 3)
+    for second in range(6):
+        buffer.append(second * 10, [second * 100, second * 10 * second])
+
+    assert len(buffer) == 3
+    assert buffer.average_rate("rx") == pytest.approx(10)
+    # tx: campioni 3..5 -> 90, 160, 250
+    assert buffer.average_rate("tx") == pytest.approx((250 - 90) / 20)
+    assert buffer.average_rate("tx", samples=2) == pytest.approx((250 - 160) / 10)
+
+
+def test_counter_clear_and_equal_timestamps():
+    """Dopo clear il primo campione riparte da zero; dt nullo non dà tasso."""
+    buffer = CounterRingBuffer(("rx",), 4)
+    buffer.append(0, [100])
+    buffer.append(0, [200])
+    assert buffer.rate("rx") is None
+
+    buffer.clear()
+    assert len(buffer) == 0
+    buffer.append(20, [50])
+    buffer.append(30, [150])
+    assert buffer.rate("rx") == pytest.approx(10)
+
+
+def test_gauge_stats_skip_missing_values():
+    """I valori None non entrano nelle statistiche."""
+    buffer = GaugeRingBuffer(("signal", "noise"), 4)
+    buffer.append(0, [-60, None])
+    buffer.append(60, [None, None])
+    buffer.append(120, [-50, None])
+
+    stats = buffer.stats("signal")
+    assert stats["min"] == -60
+    assert stats["max"] == -50
+    assert stats["avg"] == -55
+    assert stats["last"] == -50
+    assert stats["samples"] == 2
+    assert stats["trend"] == pytest.approx(5)
+    assert buffer.stats("noise") is None
+
+
+def test_gauge_drops_oldest_sample():
+    """Oltre la capacità il campione più vecchio esce dalle statistiche."""
+    buffer = GaugeRingBuffer(("signal",), 2)
+    for now, value in enumerate([-90, -60, -60]):
+        buffer.append(now, [value])
+
+    stats = buffer.stats("signal")
+    assert stats["min"] == -60
+    assert stats["samples"] == 2
+    assert stats["trend"] == 0
+
+
+def test_bounded_map_evicts_least_recent():
+    """Oltre max_keys viene espulsa la chiave usata meno di recente."""
+    buffers = BoundedBufferMap(lambda: CounterRingBuffer(("rx",), 2), 2)
+    first = buffers.buffer("a")
+    buffers.buffer("b")
+
+    assert buffers.buffer("a") is first  # "a" diventa la più recente
+    buffers.buffer("c")
+
+    assert buffers.keys() == ["a", "c"]
+    assert "b" not in buffers
+    assert buffers.get("b") is None
+    assert len(buffers) == 2
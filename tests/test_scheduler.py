@@ -0,0 +1,128 @@
+"""Test dello scheduler delle richieste ubus."""
+import asyncio
+
+from custom_components.openwrt_ubus.const import (
+    PRIORITY_PRESENCE,
+    PRIORITY_STATS,
+    PRIORITY_USER,
+)
+from custom_components.openwrt_ubus.scheduler import (
+    RequestScheduler,
+    _priority,
+    request_priority,
+    user_request,
+)
+
+
+async def _settle():
+    """Lascia girare i task finché non sono tutti in coda."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _spawn(scheduler, priority, name, order):
+    """Avvia una richiesta con la priorità indicata che registra il suo turno."""
+    async def request():
+        order.append(name)
+        return name
+
+    with request_priority(priority):
+        return asyncio.ensure_future(scheduler.run(request))
+
+
+async def _hold(scheduler, release):
+    """Occupa uno slot finché release non viene impostato."""
+    await scheduler.run(release.wait)
+
+
+def test_queued_requests_run_by_priority():
+    """Liberato lo slot passano utente, poi presenza, poi statistiche."""
+    async def scenario():
+        scheduler = RequestScheduler(1)
+        release = asyncio.Event()
+        order = []
+        holder = asyncio.ensure_future(_hold(scheduler, release))
+        await _settle()
+
+        tasks = [
+            _spawn(scheduler, PRIORITY_STATS, "stats-1", order),
+            _spawn(scheduler, PRIORITY_PRESENCE, "presence", order),
+            _spawn(scheduler, PRIORITY_STATS, "stats-2", order),
+            _spawn(scheduler, PRIORITY_USER, "user", order),
+        ]
+        await _settle()
+        assert scheduler.queue_depth == 4
+        assert order == []
+
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        return scheduler, order
+
+    scheduler, order = asyncio.run(scenario())
+
+    assert order == ["user", "presence", "stats-1", "stats-2"]
+    metrics = scheduler.metrics()
+    assert metrics["in_flight"] == 0
+    assert metrics["queue_depth"] == 0
+    assert metrics["peak_queue_depth"] == 4
+    assert metrics["priorities"]["stats"]["requests"] == 3
+    assert metrics["priorities"]["user"]["requests"] == 1
+    assert scheduler.metrics()["peak_queue_depth"] == 0
+
+
+def test_fast_path_runs_up_to_max_in_flight():
+    """Sotto il limite le richieste partono subito, senza coda."""
+    async def scenario():
+        scheduler = RequestScheduler(2)
+        release = asyncio.Event()
+        holders = [asyncio.ensure_future(_hold(scheduler, release)) for _ in range(2)]
+        await _settle()
+        in_flight, depth = scheduler.metrics()["in_flight"], scheduler.queue_depth
+
+        release.set()
+        await asyncio.gather(*holders)
+        return in_flight, depth, scheduler.metrics()
+
+    in_flight, depth, metrics = asyncio.run(scenario())
+
+    assert (in_flight, depth) == (2, 0)
+    assert metrics["in_flight"] == 0
+    assert metrics["peak_queue_depth"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    """Una richiesta annullata in coda non trattiene lo slot."""
+    async def scenario():
+        scheduler = RequestScheduler(1)
+        release = asyncio.Event()
+        order = []
+        holder = asyncio.ensure_future(_hold(scheduler, release))
+        await _settle()
+
+        cancelled = _spawn(scheduler, PRIORITY_USER, "cancelled", order)
+        queued = _spawn(scheduler, PRIORITY_STATS, "stats", order)
+        await _settle()
+        cancelled.cancel()
+        release.set()
+        await asyncio.gather(holder, queued)
+        return scheduler, order, cancelled.cancelled()
+
+    scheduler, order, was_cancelled = asyncio.run(scenario())
+
+    assert was_cancelled
+    assert order == ["stats"]
+    assert scheduler.metrics()["in_flight"] == 0
+
+
+def test_request_priority_is_never_lowered():
+    """Dentro un blocco utente una richiesta in background resta utente."""
+    @user_request
+    async def action():
+        with request_priority(PRIORITY_STATS):
+            return _priority.get()
+
+    assert _priority.get() == PRIORITY_STATS
+    assert asyncio.run(action()) == PRIORITY_USER
+    with request_priority(PRIORITY_PRESENCE):
+        assert _priority.get() == PRIORITY_PRESENCE
+    assert _priority.get() == PRIORITY_STATS
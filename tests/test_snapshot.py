@@ -0,0 +1,165 @@
+"""Test della mappatura errori ubus e del fallback dello snapshot rpcd."""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from custom_components.openwrt_ubus.api import (
+    SnapshotStandIn,
+    UbusAccessDeniedError,
+    UbusError,
+    UbusNotFoundError,
+)
+from custom_components.openwrt_ubus.const import SNAPSHOT_API_VERSION, SNAPSHOT_OBJECT
+from custom_components.openwrt_ubus.coordinator import OpenWrtDataUpdateCoordinator
+
+
+class _FakeTransport:
+    """Trasporto con una risposta per oggetto.metodo (default: non trovato)."""
+
+    hostname = "router"
+    use_https = False
+
+    def __init__(self, responses):
+        """Initialize transport."""
+        self.responses = responses
+
+    def post(self, method, params):
+        """Risposta registrata per la chiamata."""
+        if method == "list":
+            return {"jsonrpc": "2.0", "id": 1, "result": {}}
+        key = f"{params[1]}.{params[2]}"
+        return self.responses.get(key, {"jsonrpc": "2.0", "id": 1, "result": [4]})
+
+
+def _snapshot_call(responses):
+    """Risposta di openwrt_ubus.snapshot composta dallo stand-in."""
+    transport = SnapshotStandIn(_FakeTransport(responses))
+    return transport.post("call", ["session", SNAPSHOT_OBJECT, "snapshot", {"services": []}])
+
+
+def _coordinator(call: AsyncMock) -> SimpleNamespace:
+    """Stato minimo usato da _get_snapshot."""
+    return SimpleNamespace(
+        capabilities={"snapshot": SNAPSHOT_API_VERSION},
+        managed_services=[],
+        _ethers_hash=None,
+        hostname="router",
+        _ubus_call=call,
+    )
+
+
+@pytest.mark.parametrize(
+    ("result", "error"),
+    [
+        ({"error": {"code": -32000, "message": "Object not found"}}, UbusNotFoundError),
+        ({"result": [3]}, UbusNotFoundError),
+        ({"result": [4]}, UbusNotFoundError),
+        ({"error": {"code": -32002, "message": "Access denied"}}, UbusAccessDeniedError),
+        ({"result": [6]}, UbusAccessDeniedError),
+        ({"result": [7]}, UbusError),
+    ],
+)
+def test_parse_call_result_errors(result, error):
+    """Oggetto o metodo assente diventano UbusNotFoundError."""
+    with pytest.raises(error):
+        OpenWrtDataUpdateCoordinator._parse_call_result(result, "openwrt_ubus.snapshot")
+
+
+def test_parse_call_result_ok():
+    """Stato 0: ritorna i dati della risposta."""
+    assert OpenWrtDataUpdateCoordinator._parse_call_result({"result": [0, {"a": 1}]}, "x.y") == {"a": 1}
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        {"error": {"code": -32000, "message": "Object not found"}},
+        {"result": [3]},
+        {"result": [4]},
+    ],
+)
+def test_snapshot_missing_plugin_disables_snapshot(result):
+    """Plugin rimosso: fallback permanente alle chiamate singole."""
+
+    async def call(object_name, method, params=None):
+        return OpenWrtDataUpdateCoordinator._parse_call_result(result, f"{object_name}.{method}")
+
+    coordinator = _coordinator(AsyncMock(side_effect=call))
+
+    assert asyncio.run(OpenWrtDataUpdateCoordinator._get_snapshot(coordinator)) is None
+    assert coordinator.capabilities["snapshot"] is None
+
+
+def test_snapshot_transient_error_keeps_snapshot():
+    """Errore temporaneo: fallback solo per questo ciclo."""
+    coordinator = _coordinator(AsyncMock(side_effect=UbusError("timeout")))
+
+    assert asyncio.run(OpenWrtDataUpdateCoordinator._get_snapshot(coordinator)) is None
+    assert coordinator.capabilities["snapshot"] == SNAPSHOT_API_VERSION
+
+
+def test_snapshot_version_mismatch_disables_snapshot():
+    """Versione del plugin non supportata: fallback permanente."""
+    coordinator = _coordinator(AsyncMock(return_value={"version": SNAPSHOT_API_VERSION + 1}))
+
+    assert asyncio.run(OpenWrtDataUpdateCoordinator._get_snapshot(coordinator)) is None
+    assert coordinator.capabilities["snapshot"] is None
+
+
+def test_snapshot_ok():
+    """Snapshot valido restituito così com'è."""
+    snapshot = {"version": SNAPSHOT_API_VERSION, "system": {}}
+    coordinator = _coordinator(AsyncMock(return_value=snapshot))
+
+    assert asyncio.run(OpenWrtDataUpdateCoordinator._get_snapshot(coordinator)) is snapshot
+    assert coordinator.capabilities["snapshot"] == SNAPSHOT_API_VERSION
+
+
+def test_stand_in_missing_objects_give_empty_parts():
+    """File od oggetti assenti: parti vuote, nessun errore."""
+    response = _snapshot_call({
+        "system.board": {"result": [0, {"hostname": "router"}]},
+        "system.info": {"result": [0, {"uptime": 10}]},
+    })
+    snapshot = OpenWrtDataUpdateCoordinator._parse_call_result(response, "openwrt_ubus.snapshot")
+
+    assert snapshot["system"]["board"] == {"hostname": "router"}
+    assert snapshot["leases"] == {}
+    assert snapshot["ethers"] == {"hash": None}
+    assert snapshot["clients"] == {}
+
+
+@pytest.mark.parametrize(
+    "denied",
+    [
+        {"result": [6]},
+        {"error": {"code": -32002, "message": "Access denied"}},
+    ],
+)
+def test_stand_in_access_denied_fails_whole_call(denied):
+    """Sessione scaduta: nessuno snapshot vuoto, errore come da uhttpd."""
+    response = _snapshot_call({
+        "system.board": {"result": [0, {"hostname": "router"}]},
+        "system.info": {"result": [0, {"uptime": 10}]},
+        "file.read": denied,
+    })
+
+    with pytest.raises(UbusAccessDeniedError):
+        OpenWrtDataUpdateCoordinator._parse_call_result(response, "openwrt_ubus.snapshot")
+
+
+def test_stand_in_other_errors_stay_in_part():
+    """Errore non di accesso: solo la parte interessata finisce in errors."""
+    snapshot = OpenWrtDataUpdateCoordinator._parse_call_result(
+        _snapshot_call({
+            "system.board": {"result": [0, {}]},
+            "system.info": {"result": [0, {}]},
+            "service.list": {"result": [5]},
+        }),
+        "openwrt_ubus.snapshot",
+    )
+
+    assert "services" in snapshot["errors"]
+    assert "system" in snapshot
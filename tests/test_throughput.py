@@ -0,0 +1,94 @@
+"""Test della tabella dei tassi per client, con e senza NumPy."""
+import pytest
+
+from custom_components.openwrt_ubus import throughput as throughput_module
+from custom_components.openwrt_ubus.throughput import ClientRateTable
+
+FIELDS = ("rx_bytes", "tx_bytes")
+
+
+@pytest.fixture(params=["numpy", "array"])
+def make_table(request, monkeypatch):
+    """Costruttore di tabelle per entrambe le implementazioni."""
+    if request.param == "numpy":
+        if throughput_module.np is None:
+            pytest.skip("NumPy non installato")
+    else:
+        monkeypatch.setattr(throughput_module, "np", None)
+    return lambda capacity=4: ClientRateTable(FIELDS, capacity)
+
+
+def test_rates_after_second_sample(make_table):
+    """Il primo campione fa da riferimento, il secondo dà il tasso."""
+    table = make_table()
+    table.update(0, {"a": [100, 1000]})
+    assert table.rates("a") == {"rx_bytes": None, "tx_bytes": None}
+
+    table.update(10, {"a": [600, 1500]})
+    assert table.rates("a") == {"rx_bytes": pytest.approx(50), "tx_bytes": pytest.approx(50)}
+    assert table.rates("b") is None
+
+
+def test_counter_decrease_and_missing_field_are_unknown(make_table):
+    """Contatore diminuito o campo assente: tasso non noto fino al campione dopo."""
+    table = make_table()
+    table.update(0, {"a": [1000, 1000]})
+    table.update(10, {"a": [10, None]})
+    assert table.rates("a") == {"rx_bytes": None, "tx_bytes": None}
+
+    table.update(20, {"a": [110, 1200]})
+    assert table.rates("a") == {"rx_bytes": pytest.approx(10), "tx_bytes": None}
+
+
+def test_absent_client_releases_slot(make_table):
+    """Un client sparito perde lo slot e riparte da zero al ritorno."""
+    table = make_table(capacity=2)
+    table.update(0, {"a": [0, 0], "b": [0, 0]})
+    table.update(10, {"b": [100, 100]})
+
+    assert "a" not in table
+    assert table.macs() == ["b"]
+
+    table.update(20, {"a": [500, 500], "b": [200, 200]})
+    assert table.capacity == 2  # slot di "a" riutilizzato
+    assert table.rates("a") == {"rx_bytes": None, "tx_bytes": None}
+    assert table.rates("b")["rx_bytes"] == pytest.approx(10)
+
+
+def test_grows_beyond_capacity(make_table):
+    """Oltre la capacità le matrici raddoppiano senza perdere i tassi."""
+    table = make_table(capacity=2)
+    macs = [f"aa:bb:cc:dd:ee:0{i}" for i in range(5)]
+    table.update(0, {mac: [0, 0] for mac in macs[:2]})
+    table.update(0, {mac: [0, 0] for mac in macs})
+    table.update(10, {mac: [i * 10, 0] for i, mac in enumerate(macs)})
+
+    assert table.capacity == 8
+    assert len(table) == 5
+    assert [table.rates(mac)["rx_bytes"] for mac in macs] == pytest.approx([0, 1, 2, 3, 4])
+
+
+def test_totals_and_top(make_table):
+    """Totali e classifica considerano solo i tassi noti."""
+    table = make_table()
+    table.update(0, {"a": [0, 0], "b": [0, 0], "c": [0, 0]})
+    table.update(1, {"a": [10, 5], "b": [30, 40], "c": [20, None]})
+
+    assert table.totals(["rx_bytes", "tx_bytes"]) == {
+        "rx_bytes": pytest.approx(60),
+        "tx_bytes": pytest.approx(45),
+    }
+    assert table.top(2, ["rx_bytes", "tx_bytes"]) == [("b", 70), ("a", 15)]
+    assert table.top(5, ["rx_bytes"]) == [("b", 30), ("c", 20), ("a", 10)]
+    assert table.top(0, ["rx_bytes"]) == []
+
+
+def test_empty_sample_releases_everything(make_table):
+    """Un campione vuoto libera tutti gli slot."""
+    table = make_table()
+    table.update(0, {"a": [0, 0]})
+    table.update(10, {})
+
+    assert len(table) == 0
+    assert table.top(3, ["rx_bytes"]) == []
+    assert table.totals(["rx_bytes"]) == {"rx_bytes": 0}
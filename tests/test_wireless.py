@@ -0,0 +1,93 @@
+"""Test del parsing di network.wireless status e della scelta delle radio."""
+from types import SimpleNamespace
+
+from custom_components.openwrt_ubus.coordinator import OpenWrtDataUpdateCoordinator
+
+# Forma reale di ubus call network.wireless status (OpenWrt 23.05)
+WIRELESS_STATUS = {
+    "radio0": {
+        "up": True,
+        "pending": False,
+        "autostart": True,
+        "disabled": False,
+        "retry_setup_failed": False,
+        "config": {"band": "2g", "channel": "1", "htmode": "HE20", "cell_density": 0},
+        "interfaces": [
+            {
+                "section": "default_radio0",
+                "ifname": "phy0-ap0",
+                "config": {"mode": "ap", "ssid": "Casa", "encryption": "psk2+ccmp", "network": ["lan"]},
+                "vlans": [],
+                "stations": [],
+            },
+            {
+                "section": "wifinet2",
+                "ifname": "phy0-ap1",
+                "config": {"mode": "ap", "ssid": "Ospiti", "encryption": "sae-mixed", "network": ["guest"]},
+                "vlans": [],
+                "stations": [],
+            },
+        ],
+    },
+    "radio1": {
+        "up": False,
+        "pending": False,
+        "autostart": True,
+        "disabled": True,
+        "retry_setup_failed": False,
+        "config": {"band": "5g", "channel": "36", "htmode": "HE80"},
+        "interfaces": [
+            {
+                "section": "default_radio1",
+                "config": {"mode": "ap", "ssid": "Casa", "encryption": "none", "network": ["lan"]},
+                "vlans": [],
+                "stations": [],
+            },
+        ],
+    },
+}
+
+
+def _coordinator() -> SimpleNamespace:
+    """Stato minimo usato dal parsing delle reti."""
+    coordinator = SimpleNamespace()
+    coordinator._format_encryption = lambda encryption: (
+        OpenWrtDataUpdateCoordinator._format_encryption(coordinator, encryption)
+    )
+    return coordinator
+
+
+def test_wireless_networks_from_status():
+    """interfaces è una lista; up viene dalla radio."""
+    networks = OpenWrtDataUpdateCoordinator._wireless_networks(_coordinator(), WIRELESS_STATUS)
+
+    assert set(networks) == {"phy0-ap0", "phy0-ap1", "default_radio1"}
+    assert networks["phy0-ap0"]["radio"] == "radio0"
+    assert networks["phy0-ap0"]["ssid"] == "Casa"
+    assert networks["phy0-ap0"]["channel"] == "1"
+    assert networks["phy0-ap0"]["encryption"] == "WPA2-PSK"
+    assert networks["phy0-ap1"]["encryption"] == "WPA2-PSK/WPA3-SAE"
+    assert networks["phy0-ap0"]["up"] is True
+    # Radio spenta: nessun ifname, rete giù
+    assert networks["default_radio1"]["up"] is False
+    assert networks["default_radio1"]["encryption"] == "Open"
+
+
+def test_wireless_networks_empty_status():
+    """Nessuna radio configurata."""
+    assert OpenWrtDataUpdateCoordinator._wireless_networks(_coordinator(), {}) == {}
+
+
+def test_radio_interfaces_one_per_radio():
+    """Una sola interfaccia attiva per radio, nessuna per le radio spente."""
+    networks = OpenWrtDataUpdateCoordinator._wireless_networks(_coordinator(), WIRELESS_STATUS)
+
+    assert OpenWrtDataUpdateCoordinator._radio_interfaces(networks, None) == {"radio0": "phy0-ap0"}
+
+
+def test_radio_interfaces_prefer_backend_interfaces():
+    """Preferite le interfacce viste da hostapd.* o iwinfo devices."""
+    networks = OpenWrtDataUpdateCoordinator._wireless_networks(_coordinator(), WIRELESS_STATUS)
+    wireless_info = {"phy0-ap1": {"interface": "phy0-ap1", "clients": {}, "client_count": 0}}
+
+    assert OpenWrtDataUpdateCoordinator._radio_interfaces(networks, wireless_info) == {"radio0": "phy0-ap1"}